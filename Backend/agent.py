@@ -1,21 +1,66 @@
 # agent.py
+import logging
+import uuid
+
 try:
-    from .memory import get_session
-    from .tools import find_route, book_ride
+    from .idempotency import IdempotencyCache
+    from .memory import get_session, save_session
+    from .tools import find_route, book_ride, release_ride
+    from .intents import classify
 except ImportError:
-    from memory import get_session
-    from tools import find_route, book_ride
+    from idempotency import IdempotencyCache
+    from memory import get_session, save_session
+    from tools import find_route, book_ride, release_ride
+    from intents import classify
+
+logger = logging.getLogger(__name__)
+
+# Bookings by (user, journey, step): a repeated "1"/"2" (double tap, a
+# redelivered message) replays the first booking instead of reserving
+# another driver.
+bookings = IdempotencyCache()
+
+
+def _book(user_id, ride, pickup):
+    booking = book_ride(user_id, ride, pickup)
+    return None if booking is None else {**booking, "ride": ride}
+
+
+def _booked_reply(booking):
+    return (
+        f"✅ {booking['ride']} booked!\n"
+        f"Driver: {booking['driver']}\n"
+        f"Arriving in {booking['eta']}"
+    )
+
+
+def _release_booking(session):
+    """Give back the driver held for the session's journey, if any."""
+    release_ride(session["ride_id"])
+    session["ride_id"] = None
+
 
 def agent_reply(user_id, message):
 
     session = get_session(user_id)
-    msg = message.lower()
+    intents = {match.name: match for match in classify(message)}
+
+    # ---- cancel: start over and free the driver ----
+    if "cancel" in intents and session["state"] != "idle":
+        _release_booking(session)
+        session["state"] = "idle"
+        save_session(user_id, session)
+        return "Cancelled. Tell me where you want to go when you're ready."
 
     # ---- STEP 1: destination detection ----
-    if "metro" in msg or "station" in msg:
+    if "metro" in intents:
+        # A new journey replaces the old one and its reservation.
+        _release_booking(session)
         session["destination"] = message
+        session["journey_id"] = uuid.uuid4().hex
         session["state"] = "await_pickup"
-        print("the session is - ", session)
+        save_session(user_id, session)
+        logger.debug("Awaiting pickup", extra={"user_id": user_id, "state": session["state"]})
         return "Please share your pickup location."
 
     # ---- STEP 2: pickup received ----
@@ -26,6 +71,7 @@ def agent_reply(user_id, message):
                            session["destination"])
 
         session["state"] = "choose_ride"
+        save_session(user_id, session)
 
         # return (
         #     f"Distance: {route['distance']}\n"
@@ -42,20 +88,27 @@ def agent_reply(user_id, message):
         )
 
     # ---- STEP 3: booking ----
+    booking_key = (user_id, session["journey_id"], "book")
+    if session["state"] == "ride_booked" and "ride_choice" in intents:
+        booking = bookings.get(booking_key)
+        if booking is not None:
+            return _booked_reply(booking)
+
     if session["state"] == "choose_ride":
-        if "1" not in msg and "2" not in msg:
+        choice = intents.get("ride_choice")
+        if choice is None:
             return "Please choose a ride by replying with 1 for Auto or 2 for Bike Taxi."
 
-        ride = "Auto" if "1" in msg else "Bike"
+        ride = choice.slots["ride"]
 
-        booking = book_ride(user_id, ride)
+        booking = bookings.run(booking_key, lambda: _book(user_id, ride, session["pickup"]))
+        if booking is None:
+            return f"Sorry, no {ride} is available near you right now. Reply 1 or 2 to try again."
 
         session["state"] = "ride_booked"
+        session["ride_id"] = booking["ride_id"]
+        save_session(user_id, session)
 
-        return (
-            f"✅ {ride} booked!\n"
-            f"Driver: {booking['driver']}\n"
-            f"Arriving in {booking['eta']}"
-        )
+        return _booked_reply(booking)
 
     return "Hi! Tell me where you want to go (e.g., Akurdi Metro)."
@@ -0,0 +1,222 @@
+# auth_tokens.py
+"""
+Local verification of Supabase access tokens.
+
+Tokens are checked against the project's JWT secret (HS256) or its
+published signing keys (JWKS), so a protected request costs a signature
+check instead of a round trip to Supabase auth.  Decoded claims are kept in
+an LRU keyed by a hash of the token until the token expires, which makes
+repeat requests with the same cookie a dict lookup.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import jwt
+
+try:
+    from .http_client import get_client
+except ImportError:
+    from http_client import get_client
+
+SUPABASE_URL = (os.getenv("SUPABASE_URL") or "").rstrip("/")
+# Legacy projects sign with a shared secret; newer ones publish keys at the JWKS URL.
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET") or None
+SUPABASE_JWKS_URL = os.getenv("SUPABASE_JWKS_URL") or (
+    f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json" if SUPABASE_URL else None
+)
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE", "authenticated")
+AUTH_JWT_ISSUER = os.getenv("AUTH_JWT_ISSUER") or (f"{SUPABASE_URL}/auth/v1" if SUPABASE_URL else None)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+AUTH_JWKS_TTL_SECONDS = float(os.getenv("AUTH_JWKS_TTL_SECONDS", "600"))
+# Clock skew tolerated between Supabase and this server.
+AUTH_LEEWAY_SECONDS = float(os.getenv("AUTH_LEEWAY_SECONDS", "30"))
+
+# An unknown key id triggers a JWKS refetch at most this often.
+_JWKS_MIN_REFETCH_SECONDS = 30
+# A full cache is swept for expired tokens at most this often; LRU otherwise.
+_SWEEP_SECONDS = 60
+
+_ASYMMETRIC = ("RS256", "RS384", "RS512", "ES256", "ES384", "ES512", "EdDSA")
+
+
+class TokenError(Exception):
+    """The token is missing, malformed, or fails verification."""
+
+
+class TokenExpired(TokenError):
+    """The token was valid but has expired; a refresh may fix it."""
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class TokenVerifier:
+    def __init__(self, secret: Optional[str] = SUPABASE_JWT_SECRET, jwks_url: Optional[str] = SUPABASE_JWKS_URL,
+                 audience: Optional[str] = AUTH_JWT_AUDIENCE, issuer: Optional[str] = AUTH_JWT_ISSUER,
+                 cache_size: int = AUTH_TOKEN_CACHE_SIZE, jwks_ttl: float = AUTH_JWKS_TTL_SECONDS,
+                 leeway: float = AUTH_LEEWAY_SECONDS, fetch_jwks=None, clock=time.time):
+        self.secret = secret
+        self.jwks_url = jwks_url
+        self.audience = audience
+        self.issuer = issuer
+        self.cache_size = cache_size
+        self.jwks_ttl = jwks_ttl
+        self.leeway = leeway
+        self._fetch_jwks = fetch_jwks or self._download_jwks
+        self._clock = clock
+
+        self._claims = OrderedDict()  # sha256(token) -> (claims, expires at)
+        self._next_sweep = 0.0
+        self._lock = threading.Lock()
+        self._keys = {}  # kid -> PyJWK
+        self._keys_fetched = None
+        self._keys_lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.jwks_fetches = 0
+
+    def __len__(self):
+        return len(self._claims)
+
+    def cached(self, token: str) -> Optional[dict]:
+        """Claims of a token verified earlier and not yet expired, else None."""
+        if not token:
+            return None
+        key = token_key(token)
+        now = self._clock()
+        with self._lock:
+            cached = self._claims.get(key)
+            if cached is not None:
+                if cached[1] > now:
+                    self._claims.move_to_end(key)
+                    self.hits += 1
+                    return cached[0]
+                del self._claims[key]
+            self.misses += 1
+        return None
+
+    def verify(self, token: str) -> dict:
+        """
+        Claims of a valid token; raises ``TokenExpired`` or ``TokenError``.
+        A cache miss may fetch the signing keys, so call it off the event loop.
+        """
+        if not token:
+            raise TokenError("missing token")
+        claims = self.cached(token)
+        if claims is not None:
+            return claims
+
+        claims = self._decode(token)
+        key = token_key(token)
+        now = self._clock()
+        expires = claims.get("exp", now) + self.leeway
+        if expires > now:
+            with self._lock:
+                self._claims[key] = (claims, expires)
+                self._evict(now)
+        return claims
+
+    def forget(self, token: str):
+        with self._lock:
+            self._claims.pop(token_key(token), None)
+
+    def stats(self) -> dict:
+        return {
+            "cached_tokens": len(self._claims),
+            "hits": self.hits,
+            "misses": self.misses,
+            "jwks_keys": len(self._keys),
+            "jwks_fetches": self.jwks_fetches,
+        }
+
+    # ---- internals ----
+
+    def _evict(self, now):
+        """Drop expired entries first, then least recently used ones (lock held)."""
+        if len(self._claims) <= self.cache_size:
+            return
+        if now >= self._next_sweep:
+            self._next_sweep = now + _SWEEP_SECONDS
+            for key in [k for k, (_, expires) in self._claims.items() if expires <= now]:
+                del self._claims[key]
+        while len(self._claims) > self.cache_size:
+            self._claims.popitem(last=False)
+
+    def _decode(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.PyJWTError as exc:
+            raise TokenError(str(exc)) from exc
+
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and self.secret:
+            key = self.secret
+        elif algorithm in _ASYMMETRIC and self.jwks_url:
+            key = self._signing_key(header.get("kid"))
+        else:
+            raise TokenError(f"unsupported token algorithm {algorithm!r}")
+
+        try:
+            return jwt.decode(
+                token, key, algorithms=[algorithm], audience=self.audience, issuer=self.issuer,
+                leeway=self.leeway, options={"require": ["exp", "sub"], "verify_aud": self.audience is not None},
+            )
+        except jwt.ExpiredSignatureError as exc:
+            raise TokenExpired("token expired") from exc
+        except jwt.PyJWTError as exc:
+            raise TokenError(str(exc)) from exc
+
+    def _signing_key(self, kid):
+        key = self._cached_key(kid)
+        if key is not None:
+            return key
+        # Keys are stale, or the kid is unknown because they were rotated.
+        # Unknown kids refetch at a bounded rate however many bad tokens arrive.
+        with self._keys_lock:
+            now = self._clock()
+            age = now - self._keys_fetched if self._keys_fetched is not None else float("inf")
+            if age >= self.jwks_ttl or (kid not in self._keys and age >= _JWKS_MIN_REFETCH_SECONDS):
+                self._load_keys(now)
+            key = self._keys.get(kid)
+        if key is None:
+            raise TokenError("unknown signing key")
+        return key.key
+
+    def _cached_key(self, kid):
+        if self._keys_fetched is None or self._clock() - self._keys_fetched >= self.jwks_ttl:
+            return None
+        key = self._keys.get(kid)
+        return None if key is None else key.key
+
+    def _load_keys(self, now):
+        try:
+            jwks = self._fetch_jwks(self.jwks_url)
+        except Exception as exc:
+            if not self._keys:
+                raise TokenError("signing keys unavailable") from exc
+            self._keys_fetched = now  # keep serving with the keys we have
+            return
+        keys = {}
+        for data in jwks.get("keys", []):
+            try:
+                keys[data.get("kid")] = jwt.PyJWK(data)
+            except jwt.PyJWTError:
+                continue
+        self._keys = keys
+        self._keys_fetched = now
+        self.jwks_fetches += 1
+
+    @staticmethod
+    def _download_jwks(url):
+        response = get_client().get(url)
+        response.raise_for_status()
+        return response.json()
+
+
+token_verifier = TokenVerifier()
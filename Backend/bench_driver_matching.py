@@ -0,0 +1,92 @@
+"""
+Driver matching at scale: k-nearest lookups, location pings and
+reserve/release on the grid index vs scanning every driver.
+
+    python -m Backend.bench_driver_matching --drivers 50000
+"""
+import argparse
+import random
+import time
+
+try:
+    from .driver_matching import PUNE, VEHICLE_TYPES, DriverIndex
+    from .geo import haversine
+except ImportError:
+    from driver_matching import PUNE, VEHICLE_TYPES, DriverIndex
+    from geo import haversine
+
+SPREAD = 0.15  # degrees around the city centre, ~33 km across
+
+
+def random_point(rng):
+    return PUNE[0] + rng.uniform(-SPREAD, SPREAD), PUNE[1] + rng.uniform(-SPREAD, SPREAD)
+
+
+def brute_force(index, lat, lng, vehicle_type, k):
+    drivers = [d for d in index._drivers.values() if d.status == "available" and d.vehicle_type == vehicle_type]
+    meters = haversine(lat, lng, [d.lat for d in drivers], [d.lng for d in drivers])
+    return sorted(zip(meters.tolist(), (d.driver_id for d in drivers)))[:k]
+
+
+def per_call_us(n, call):
+    started = time.perf_counter()
+    for _ in range(n):
+        call()
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    index = DriverIndex()
+    started = time.perf_counter()
+    for i in range(args.drivers):
+        lat, lng = random_point(rng)
+        index.update(f"d{i}", lat, lng, vehicle_type=VEHICLE_TYPES[i % len(VEHICLE_TYPES)])
+    print(f"load           {args.drivers} drivers in {time.perf_counter() - started:.2f}s")
+
+    queries = [(*random_point(rng), rng.choice(VEHICLE_TYPES)) for _ in range(args.queries)]
+    it = iter(queries)
+
+    def nearest():
+        lat, lng, vehicle_type = next(it)
+        index.nearest(lat, lng, vehicle_type, k=args.k)
+
+    grid_us = per_call_us(args.queries, nearest)
+
+    scan_n = max(1, args.queries // 20)
+    it = iter(queries)
+    scan_us = per_call_us(scan_n, lambda: brute_force(index, *next(it), args.k))
+
+    ids = [f"d{rng.randrange(args.drivers)}" for _ in range(args.queries)]
+    it = iter(zip(ids, queries))
+
+    def ping():
+        driver_id, (lat, lng, _) = next(it)
+        index.move(driver_id, lat, lng)
+
+    ping_us = per_call_us(args.queries, ping)
+
+    it = iter(enumerate(queries))
+
+    def book():
+        i, (lat, lng, vehicle_type) = next(it)
+        if index.reserve(lat, lng, f"ride-{i}", vehicle_type):
+            index.release(f"ride-{i}")
+
+    book_us = per_call_us(args.queries, book)
+
+    print(f"k={args.k} nearest    {grid_us:8.1f} us/query (grid)")
+    print(f"k={args.k} nearest    {scan_us:8.1f} us/query (scan all drivers)")
+    print(f"location ping  {ping_us:8.1f} us")
+    print(f"reserve+release {book_us:7.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Ride-estimate latency: providers called one after another vs the
+concurrent fan-out, with one provider slower than its deadline, plus
+repeat requests answered from the cache and the time to the first
+streamed result.
+
+    python -m Backend.bench_estimates --requests 20
+"""
+import argparse
+import asyncio
+import time
+
+try:
+    from .ride_estimates import EstimateAggregator, StubProvider
+except ImportError:
+    from ride_estimates import EstimateAggregator, StubProvider
+
+FARES = [("Mini", 55, 21), ("Prime", 85, 27)]
+
+
+def providers(slow_latency):
+    return [
+        StubProvider("Uber", FARES, latency=0.25),
+        StubProvider("Ola", FARES, latency=0.40),
+        StubProvider("Rapido", FARES, latency=0.15),
+        StubProvider("Meru", FARES, latency=slow_latency),
+    ]
+
+
+async def sequential(provider_list, source, destination):
+    rows = []
+    for provider in provider_list:
+        rows.extend(await provider.estimates(source, destination))
+    return rows
+
+
+async def timed(n, call):
+    started = time.perf_counter()
+    for i in range(n):
+        await call(f"18.{6000 + i * 20},73.8000", "Hinjewadi Phase 1")
+    return (time.perf_counter() - started) / n * 1000
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--slow-latency", type=float, default=3.0)
+    parser.add_argument("--deadline", type=float, default=1.0)
+    args = parser.parse_args()
+
+    provider_list = providers(args.slow_latency)
+    aggregator = EstimateAggregator(provider_list, deadline=args.deadline)
+
+    seq_ms = await timed(args.requests, lambda s, d: sequential(provider_list, s, d))
+    fan_ms = await timed(args.requests, aggregator.fetch)
+
+    healthy = EstimateAggregator(providers(args.slow_latency)[:3], deadline=args.deadline)
+    await timed(args.requests, healthy.fetch)
+    cached_ms = await timed(args.requests, healthy.fetch)
+
+    streaming = EstimateAggregator(providers(args.slow_latency), deadline=args.deadline)
+    started = time.perf_counter()
+    first_ms = None
+    async for _ in streaming.stream("18.5000,73.8000", "Hinjewadi Phase 1"):
+        if first_ms is None:
+            first_ms = (time.perf_counter() - started) * 1000
+    last_ms = (time.perf_counter() - started) * 1000
+
+    print(f"sequential        {seq_ms:8.1f} ms/request (waits for every provider)")
+    print(f"fan-out           {fan_ms:8.1f} ms/request (slow provider cut at {args.deadline:.1f}s)")
+    print(f"fan-out, cached   {cached_ms:8.3f} ms/request")
+    print(f"stream            {first_ms:8.1f} ms to first result, {last_ms:.1f} ms to summary")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,65 @@
+"""
+Per-request cost of the metrics middleware: the same trivial endpoint
+served in-process with and without ``MetricsMiddleware``.
+
+    python -m Backend.bench_metrics --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+try:
+    from .metrics import MetricsMiddleware, Registry
+except ImportError:
+    from metrics import MetricsMiddleware, Registry
+
+from fastapi import FastAPI
+
+
+def make_app(instrumented):
+    app = FastAPI()
+
+    @app.get("/rides/{ride_id}")
+    async def ride(ride_id: str):
+        return {"ride_id": ride_id}
+
+    if instrumented:
+        registry = Registry()
+        app.add_middleware(
+            MetricsMiddleware,
+            requests=registry.counter("requests", "", ("method", "route", "status")),
+            seconds=registry.histogram("seconds", "", ("method", "route")),
+        )
+    return app
+
+
+async def drive(app, n):
+    """Call the ASGI app directly, skipping any HTTP client overhead."""
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    started = time.perf_counter()
+    for i in range(n):
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+                 "scheme": "http", "path": f"/rides/r{i}", "raw_path": f"/rides/r{i}".encode(),
+                 "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80)}
+        await app(scope, receive, send)
+    return (time.perf_counter() - started) / n * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20_000)
+    args = parser.parse_args()
+
+    plain = asyncio.run(drive(make_app(False), args.requests))
+    instrumented = asyncio.run(drive(make_app(True), args.requests))
+    print(f"plain          {plain:8.1f} us/request")
+    print(f"instrumented   {instrumented:8.1f} us/request (+{instrumented - plain:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
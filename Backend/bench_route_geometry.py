@@ -0,0 +1,66 @@
+"""
+Route geometry costs on a long route: polyline encode/decode,
+simplification per zoom, and a tracking poll that sends the remaining
+route (cached suffix) vs re-encoding it in full.
+
+    python -m Backend.bench_route_geometry --points 20000
+"""
+import argparse
+import math
+import time
+
+try:
+    from .route_geometry import RouteGeometry, decode_polyline, encode_polyline
+except ImportError:
+    from route_geometry import RouteGeometry, decode_polyline, encode_polyline
+
+
+def per_call_ms(n, call):
+    started = time.perf_counter()
+    for _ in range(n):
+        call()
+    return (time.perf_counter() - started) / n * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--polls", type=int, default=2_000)
+    args = parser.parse_args()
+
+    n = args.points
+    # A winding ~40 km route sampled every ~2 m
+    points = [(18.45 + i * 0.00002 * math.cos(i / 900), 73.75 + i * 0.00002 * math.sin(i / 1300) + i * 0.00001)
+              for i in range(n)]
+    encoded = encode_polyline(points)
+    print(f"encode         {per_call_ms(5, lambda: encode_polyline(points)):8.2f} ms for {n} points")
+    print(f"decode         {per_call_ms(5, lambda: decode_polyline(encoded)):8.2f} ms ({len(encoded)} chars)")
+
+    route = RouteGeometry(points)
+    for zoom in (12, 15, 18):
+        started = time.perf_counter()
+        kept = route.kept_indices(zoom)
+        ms = (time.perf_counter() - started) * 1000
+        print(f"simplify z{zoom:<3}  {ms:8.2f} ms -> {len(kept)} points "
+              f"({len(route.encoded(zoom))} chars)")
+
+    # Driver moving along the route, one poll per step
+    step = max(1, n // args.polls)
+    positions = [points[i] for i in range(0, n, step)][:args.polls]
+    it = iter(positions)
+    cached = per_call_ms(len(positions), lambda: route.remaining(*next(it), zoom=15))
+
+    it = iter(positions)
+
+    def full():
+        segment, _, snapped, _ = route.locate(*next(it))
+        kept = route.kept_indices(15)
+        encode_polyline([snapped] + [points[i] for i in kept if i > segment])
+
+    uncached = per_call_ms(len(positions), full)
+    print(f"poll, cached   {cached:8.3f} ms (snap + encoded suffix)")
+    print(f"poll, full     {uncached:8.3f} ms (full snap + re-encode)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Routing costs on a synthetic grid city: graph build, A* on a cold cache,
+repeated origin/destination pairs from the cache, and the straight-line
+fallback for comparison.
+
+    python -m Backend.bench_routing --size 120 --queries 500
+"""
+import argparse
+import random
+import time
+
+try:
+    from .road_graph import RoadGraph
+    from .routing import RoutingEngine
+except ImportError:
+    from road_graph import RoadGraph
+    from routing import RoutingEngine
+
+
+def grid_city(n, step=0.001, origin=(18.45, 73.75)):
+    elements = [{"type": "node", "id": i * n + j + 1, "lat": origin[0] + i * step, "lon": origin[1] + j * step}
+                for i in range(n) for j in range(n)]
+    for i in range(n):
+        highway = "primary" if i % 10 == 0 else "residential"
+        elements.append({"type": "way", "id": 10 ** 7 + i, "tags": {"highway": highway},
+                         "nodes": [i * n + j + 1 for j in range(n)]})
+        elements.append({"type": "way", "id": 2 * 10 ** 7 + i, "tags": {"highway": highway},
+                         "nodes": [j * n + i + 1 for j in range(n)]})
+    return {"elements": elements}
+
+
+def per_call_ms(calls):
+    started = time.perf_counter()
+    for call in calls:
+        call()
+    return (time.perf_counter() - started) / len(calls) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=120, help="grid side, in junctions")
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    graph = RoadGraph.from_overpass(grid_city(args.size))
+    print(f"build          {(time.perf_counter() - started) * 1000:8.1f} ms "
+          f"({len(graph)} junctions, {graph.edge_count} edges)")
+
+    span = (args.size - 1) * 0.001
+    rng = random.Random(7)
+    pairs = [(18.45 + rng.random() * span, 73.75 + rng.random() * span,
+              18.45 + rng.random() * span, 73.75 + rng.random() * span) for _ in range(args.queries)]
+
+    engine = RoutingEngine(graph)
+    cold = per_call_ms([lambda p=p: engine.route(*p) for p in pairs])
+    warm = per_call_ms([lambda p=p: engine.route(*p) for p in pairs])
+    estimate = per_call_ms([lambda p=p: engine.estimate(*p) for p in pairs])
+    print(f"route, A*      {cold:8.3f} ms")
+    print(f"route, cached  {warm:8.3f} ms (hit rate {engine.hits / (engine.hits + engine.misses):.0%})")
+    print(f"estimate       {estimate:8.3f} ms (straight line x detour)")
+
+
+if __name__ == "__main__":
+    main()
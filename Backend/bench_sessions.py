@@ -0,0 +1,74 @@
+"""
+Memory per 10k sessions: the old dict-of-dicts vs the __slots__ Session store,
+plus get/save throughput for the in-memory and SQLite backends.
+
+    python -m Backend.bench_sessions --sessions 10000
+"""
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+try:
+    from .memory import InMemorySessionStore, Session, SQLiteSessionStore
+except ImportError:
+    from memory import InMemorySessionStore, Session, SQLiteSessionStore
+
+
+def measure(build):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, kept
+
+
+def dict_sessions(n):
+    sessions = {}
+    for i in range(n):
+        sessions[f"whatsapp:+9190000{i:05d}"] = {
+            "state": "idle",
+            "pickup": None,
+            "destination": None,
+            "ride_type": None,
+        }
+    return sessions
+
+
+def store_sessions(n):
+    store = InMemorySessionStore(maxsize=n * 2)
+    for i in range(n):
+        store.save(f"whatsapp:+9190000{i:05d}", Session())
+    return store
+
+
+def throughput(store, n):
+    started = time.perf_counter()
+    for i in range(n):
+        user = f"user-{i}"
+        store.save(user, Session(state="await_pickup", destination="Akurdi Metro"))
+        store.get(user)
+    return n / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    args = parser.parse_args()
+    n = args.sessions
+
+    old_bytes, _ = measure(lambda: dict_sessions(n))
+    new_bytes, _ = measure(lambda: store_sessions(n))
+    print(f"dict of dicts      {old_bytes / 1024:9.1f} KiB per {n} sessions ({old_bytes / n:6.1f} B each)")
+    print(f"slots store        {new_bytes / 1024:9.1f} KiB per {n} sessions ({new_bytes / n:6.1f} B each)")
+
+    print(f"memory get+save    {throughput(InMemorySessionStore(), n):9.0f} ops/s")
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SQLiteSessionStore(os.path.join(tmp, "sessions.db"))
+        print(f"sqlite get+save    {throughput(store, n):9.0f} ops/s")
+
+
+if __name__ == "__main__":
+    main()
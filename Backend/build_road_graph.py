@@ -0,0 +1,53 @@
+"""
+Build the offline road graph from OpenStreetMap data.
+
+Either downloads the drivable roads in a bounding box from Overpass, or
+reads an Overpass JSON export saved earlier, and writes the compact graph
+file the routing engine loads (ROAD_GRAPH_PATH).
+
+    python -m Backend.build_road_graph --bbox 18.40,73.70,18.70,74.00
+    python -m Backend.build_road_graph --input pune_roads.json --output Backend/data/pune_roads.graph
+"""
+import argparse
+import json
+import time
+
+try:
+    from .http_client import get_client
+    from .road_graph import RoadGraph, overpass_roads_query
+    from .routing import ROAD_GRAPH_PATH
+except ImportError:
+    from http_client import get_client
+    from road_graph import RoadGraph, overpass_roads_query
+    from routing import ROAD_GRAPH_PATH
+
+OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+PUNE_BBOX = (18.40, 73.70, 18.70, 74.00)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--bbox", help="south,west,north,east (default: Pune)")
+    parser.add_argument("--input", help="Overpass JSON file to build from instead of downloading")
+    parser.add_argument("--output", default=ROAD_GRAPH_PATH)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.input:
+        with open(args.input, encoding="utf-8") as fh:
+            data = json.load(fh)
+    else:
+        bbox = tuple(float(v) for v in args.bbox.split(",")) if args.bbox else PUNE_BBOX
+        response = get_client().post(OVERPASS_URL, data={"data": overpass_roads_query(bbox)},
+                                     idempotent=True, timeout=300)
+        response.raise_for_status()
+        data = response.json()
+
+    graph = RoadGraph.from_overpass(data)
+    graph.save(args.output)
+    print(f"{len(graph)} junctions, {graph.edge_count} edges, {len(graph.names)} named roads "
+          f"-> {args.output} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
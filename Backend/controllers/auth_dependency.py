@@ -0,0 +1,100 @@
+import asyncio
+import time
+
+from fastapi import HTTPException, Request, Response
+
+try:
+    from ..auth_tokens import TokenError, TokenExpired, token_key, token_verifier
+    from ..supabase_async import get_supabase_async
+    from .auth_cookie_utils import ACCESS_COOKIE_NAME, REFRESH_COOKIE_NAME, set_auth_cookies
+except ImportError:
+    from auth_tokens import TokenError, TokenExpired, token_key, token_verifier
+    from supabase_async import get_supabase_async
+    from controllers.auth_cookie_utils import ACCESS_COOKIE_NAME, REFRESH_COOKIE_NAME, set_auth_cookies
+
+# Parallel requests that arrive with the same expired cookie share one new
+# session for this long instead of each spending the refresh token.
+REFRESH_REUSE_SECONDS = 10
+
+
+async def _supabase_refresh(refresh_token):
+    return (await get_supabase_async().refresh_session(refresh_token)).session
+
+
+class SessionRefresher:
+    """
+    Exchanges a refresh token for a new session.  Supabase refresh tokens
+    are single use, so concurrent requests holding the same one wait on a
+    single exchange and reuse its result.
+    """
+
+    def __init__(self, refresh=_supabase_refresh, reuse_seconds=REFRESH_REUSE_SECONDS, clock=time.monotonic):
+        self._refresh = refresh
+        self.reuse_seconds = reuse_seconds
+        self._clock = clock
+        self._inflight = {}  # sha256(refresh token) -> Future of the session
+        self._recent = {}  # sha256(refresh token) -> (session, refreshed at)
+        self.refreshes = 0
+
+    async def refresh(self, refresh_token):
+        key = token_key(refresh_token)
+        now = self._clock()
+        recent = self._recent.get(key)
+        if recent is not None and now - recent[1] < self.reuse_seconds:
+            return recent[0]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            session = await self._refresh(refresh_token)
+        except Exception as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved: asyncio logs unread errors when nobody was waiting
+            raise
+        else:
+            future.set_result(session)
+            self.refreshes += 1
+            self._recent = {k: v for k, v in self._recent.items() if now - v[1] < self.reuse_seconds}
+            self._recent[key] = (session, now)
+            return session
+        finally:
+            del self._inflight[key]
+
+
+session_refresher = SessionRefresher()
+
+
+async def require_user(request: Request, response: Response) -> dict:
+    """
+    FastAPI dependency for protected routes: the claims of the access-token
+    cookie.  An expired (or missing) access token is replaced using the
+    refresh cookie, and the new cookies are set on the response.
+    """
+    access_token = request.cookies.get(ACCESS_COOKIE_NAME)
+    claims = token_verifier.cached(access_token)
+    if claims is not None:
+        return claims
+
+    if access_token:
+        try:
+            return await asyncio.to_thread(token_verifier.verify, access_token)
+        except TokenExpired:
+            pass
+        except TokenError:
+            raise HTTPException(status_code=401, detail="Invalid access token")
+
+    refresh_token = request.cookies.get(REFRESH_COOKIE_NAME)
+    if not refresh_token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    try:
+        session = await session_refresher.refresh(refresh_token)
+        claims = await asyncio.to_thread(token_verifier.verify, getattr(session, "access_token", None))
+    except Exception:
+        raise HTTPException(status_code=401, detail="Session expired, please log in again")
+
+    set_auth_cookies(response, session)
+    return claims
@@ -1,18 +1,24 @@
 # Backend/controllers/chatbot_controller.py
 
+try:
+    from ..intents import classify
+except ImportError:
+    from intents import classify
+
+RESPONSES = {
+    "greeting": "Hello! I am your Roadचल assistant. How can I help you today?",
+    "metro": "The Pune Metro is a great way to travel! Which station are you looking for?",
+    "fare": "Metro fares are affordable, starting from ₹10.",
+}
+
+
 def get_chat_response(user_message: str):
     """
     A dummy function to handle chatbot logic.
     In the future, this can be integrated with AI models.
     """
-    # Simple keyword-based dummy logic
-    msg = user_message.lower()
-    
-    if "hello" in msg or "hi" in msg:
-        return "Hello! I am your Roadचल assistant. How can I help you today?"
-    elif "metro" in msg:
-        return "The Pune Metro is a great way to travel! Which station are you looking for?"
-    elif "fare" in msg:
-        return "Metro fares are affordable, starting from ₹10."
-    else:
-        return f"You said: '{user_message}'. I'm still learning, but I'm here to help!"
+    # Highest-ranked intent that has a canned reply
+    for match in classify(user_message):
+        if match.name in RESPONSES:
+            return RESPONSES[match.name]
+    return f"You said: '{user_message}'. I'm still learning, but I'm here to help!"
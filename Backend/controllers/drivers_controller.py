@@ -0,0 +1,44 @@
+# Backend/controllers/drivers_controller.py
+import uuid
+
+try:
+    from ..driver_matching import driver_index
+except ImportError:
+    from driver_matching import driver_index
+
+# Rough city speed used to turn pickup distance into an ETA.
+PICKUP_SPEED_MPS = 6.0
+
+
+def pickup_eta(meters: float) -> str:
+    return f"{max(1, round(meters / PICKUP_SPEED_MPS / 60))} mins"
+
+
+def update_driver_location(driver_id: str, lat: float, lng: float, vehicle_type: str = None,
+                           name: str = None, status: str = None, profile: dict = None):
+    return driver_index.update(driver_id, lat, lng, vehicle_type, name, status, profile).to_dict()
+
+
+def nearby_drivers(lat: float, lng: float, vehicle_type: str = None, k: int = 5):
+    return [
+        {**driver.to_dict(), "distance_m": round(meters), "eta": pickup_eta(meters)}
+        for driver, meters in driver_index.nearest(lat, lng, vehicle_type, k)
+    ]
+
+
+def match_driver(lat: float, lng: float, vehicle_type: str = None, ride_id: str = None):
+    """
+    Reserve the nearest available driver.  Returns None when nobody is in
+    range.  Repeating a ride_id returns the driver already reserved for it.
+    """
+    ride_id = ride_id or str(uuid.uuid4())
+    match = driver_index.reserve(lat, lng, ride_id, vehicle_type)
+    if match is None:
+        return None
+    driver, meters = match
+    return {**driver.to_dict(), "distance_m": round(meters), "eta": pickup_eta(meters)}
+
+
+def release_driver(ride_id: str):
+    driver = driver_index.release(ride_id)
+    return driver.to_dict() if driver else None
@@ -1,8 +1,11 @@
+import asyncio
+from typing import Optional
+
 try:
-    from ..supabase_client import supabase
+    from ..supabase_async import AsyncSupabase, get_supabase_async
     from .auth_cookie_utils import set_auth_cookies
 except ImportError:
-    from supabase_client import supabase
+    from supabase_async import AsyncSupabase, get_supabase_async
     from controllers.auth_cookie_utils import set_auth_cookies
 from pydantic import BaseModel, EmailStr
 from fastapi import HTTPException, Response
@@ -13,12 +16,10 @@ class LoginRequest(BaseModel):
     password: str
 
 
-def login(request: LoginRequest, response: Response):
+async def login(request: LoginRequest, response: Response, supabase: Optional[AsyncSupabase] = None):
+    supabase = supabase or get_supabase_async()
     try:
-        res = supabase.auth.sign_in_with_password({
-            "email": request.email,
-            "password": request.password
-        })
+        res = await supabase.sign_in_with_password(request.email, request.password)
 
         if not res.user or not res.session:
             raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -32,6 +33,8 @@ def login(request: LoginRequest, response: Response):
         }
     except HTTPException as he:
         raise he
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Auth service timed out")
     except Exception as e:
         status_code = getattr(e, "status", None) or getattr(e, "status_code", 500)
         message = getattr(e, "message", None) or str(e)
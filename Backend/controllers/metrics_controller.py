@@ -0,0 +1,57 @@
+try:
+    from ..metrics import registry
+    from ..agent import bookings
+    from ..driver_matching import driver_index
+    from ..routing import routing_engine
+    from ..auth_tokens import token_verifier
+    from ..log_setup import DroppingQueueHandler
+    from .rides_controller import estimate_aggregator
+    from .tracking_controller import route_store, tracking_hub
+    from .whatsapp_controller import dispatcher
+except ImportError:
+    from metrics import registry
+    from agent import bookings
+    from driver_matching import driver_index
+    from routing import routing_engine
+    from auth_tokens import token_verifier
+    from log_setup import DroppingQueueHandler
+    from controllers.rides_controller import estimate_aggregator
+    from controllers.tracking_controller import route_store, tracking_hub
+    from controllers.whatsapp_controller import dispatcher
+
+# Subsystems already count what they do; these gauges and counters read them
+# at scrape time.
+registry.gauge("whatsapp_queue_depth", "WhatsApp messages waiting for a worker.", dispatcher.depth)
+registry.counter_callback(
+    "whatsapp_messages_total", "WhatsApp webhook messages by outcome since start.",
+    lambda: {k: v for k, v in dispatcher.stats().items() if k not in ("workers", "depth")}, ("outcome",),
+)
+registry.gauge("tracking_rides", "Rides with live tracking state.", lambda: tracking_hub.stats()["rides"])
+registry.gauge("tracking_subscribers", "Open tracking streams.", lambda: tracking_hub.stats()["subscribers"])
+registry.gauge("tracking_routes", "Ride routes held for tracking.", lambda: len(route_store))
+registry.gauge(
+    "drivers_available", "Available drivers by vehicle type.",
+    lambda: driver_index.stats()["available"], ("vehicle_type",),
+)
+registry.gauge("drivers_reserved", "Drivers reserved for a ride.", lambda: driver_index.stats()["reserved"])
+registry.counter_callback(
+    "cache_hits_total", "Cache hits since start.",
+    lambda: {"ride_estimates": estimate_aggregator.hits, "routing": routing_engine.hits,
+             "auth_tokens": token_verifier.hits},
+    ("cache",),
+)
+registry.counter_callback(
+    "cache_misses_total", "Cache misses since start.",
+    lambda: {"ride_estimates": estimate_aggregator.misses, "routing": routing_engine.misses,
+             "auth_tokens": token_verifier.misses},
+    ("cache",),
+)
+registry.counter_callback("booking_replays_total",
+                          "Repeated booking requests answered from the idempotency cache.",
+                          lambda: bookings.replays)
+registry.counter_callback("log_records_dropped_total", "Log records dropped because the log queue was full.",
+                          lambda: DroppingQueueHandler.dropped)
+
+
+def metrics_text() -> str:
+    return registry.render()
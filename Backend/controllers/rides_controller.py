@@ -1,10 +1,24 @@
+import json
+import logging
 import os
+import re
 from pydantic import BaseModel
 from typing import List, Optional
 from dotenv import load_dotenv
 
+try:
+    from ..ride_estimates import EstimateAggregator, default_providers
+    from ..driver_matching import driver_index
+    from ..routing import routing_engine
+except ImportError:
+    from ride_estimates import EstimateAggregator, default_providers
+    from driver_matching import driver_index
+    from routing import routing_engine
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 UBER_TOKEN = os.getenv("UBER_SERVER_TOKEN")
 OLA_KEY = os.getenv("OLA_API_KEY")
 
@@ -29,45 +43,73 @@ class RideEstimate(BaseModel):
     eta: str
     distance: str
 
-def get_mock_estimates(source: str, destination: str) -> List[RideEstimate]:
+estimate_aggregator = EstimateAggregator(default_providers(router=routing_engine.route_between))
+
+async def get_estimates(source: str, destination: str):
     """
-    Returns mock ride estimates for Uber and Ola.
-    Uses credentials: UBER_TOKEN, OLA_KEY
+    Estimates from every provider, fetched concurrently.  Providers that
+    time out or fail are left out and named in the second return value.
     """
-    print(f"Fetching estimates using UBER_TOKEN: {UBER_TOKEN[:5]}... and OLA_KEY: {OLA_KEY[:5]}...")
-    return [
-        RideEstimate(
-            ride_id="uber_123",
-            service_provider="Uber",
-            category="UberGo",
-            price="₹150",
-            eta="5 min",
-            distance="4.2 km"
-        ),
-        RideEstimate(
-            ride_id="ola_456",
-            service_provider="Ola",
-            category="Mini",
-            price="₹145",
-            eta="8 min",
-            distance="4.2 km"
-        ),
-        RideEstimate(
-            ride_id="uber_789",
-            service_provider="Uber",
-            category="Premier",
-            price="₹210",
-            eta="4 min",
-            distance="4.2 km"
-        )
-    ]
+    result = await estimate_aggregator.fetch(source, destination)
+    return [RideEstimate(**row) for row in result.estimates], result.missing
+
+def _leading_number(text: str) -> float:
+    m = re.search(r"\d+(?:\.\d+)?", text)
+    return float(m.group()) if m else float("inf")
+
+async def stream_estimate_events(source: str, destination: str):
+    """
+    Yields one event dict per estimate as soon as its provider answers, a
+    ``provider`` event per provider status, and a closing ``summary`` with
+    the cheapest and fastest rides.
+    """
+    received = []
+    missing = []
+    async for provider, status, rows in estimate_aggregator.stream(source, destination):
+        for row in rows:
+            estimate = RideEstimate(**row)
+            received.append(estimate)
+            yield {"type": "estimate", "estimate": estimate.model_dump()}
+        if status not in ("ok", "cached"):
+            missing.append(provider)
+        yield {"type": "provider", "provider": provider, "status": status}
+
+    cheapest = min(received, key=lambda e: _leading_number(e.price), default=None)
+    fastest = min(received, key=lambda e: _leading_number(e.eta), default=None)
+    yield {
+        "type": "summary",
+        "count": len(received),
+        "cheapest": cheapest.model_dump() if cheapest else None,
+        "fastest": fastest.model_dump() if fastest else None,
+        "missing": missing,
+    }
+
+def format_ndjson(event: dict) -> str:
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
 
 def get_mock_driver_details(ride_id: str) -> DriverDetails:
     """
-    Returns mock driver details based on the ride_id.
+    Details of the driver matched to ride_id, or mock details for rides
+    that were not matched here.
     Uses credentials: UBER_TOKEN, OLA_KEY
     """
-    print(f"Fetching details for {ride_id} using token auth...")
+    driver = driver_index.for_ride(ride_id)
+    if driver is not None:
+        profile = driver.profile
+        return DriverDetails(
+            name=driver.name,
+            rating=profile.get("rating", 4.8),
+            vehicle=profile.get("vehicle", driver.vehicle_type),
+            plate_number=profile.get("plate_number", ""),
+            experience=profile.get("experience", ""),
+            phone=profile.get("phone", ""),
+            location=Location(lat=driver.lat, lng=driver.lng),
+        )
+
+    logger.debug("Fetching driver details", extra={"ride_id": ride_id})
     if "uber" in ride_id.lower():
         return DriverDetails(
             name="Rajesh Kumar",
@@ -1,9 +1,12 @@
 
+import asyncio
+from typing import Optional
+
 try:
-    from ..supabase_client import supabase
+    from ..supabase_async import AsyncSupabase, get_supabase_async
     from .auth_cookie_utils import set_auth_cookies
 except ImportError:
-    from supabase_client import supabase
+    from supabase_async import AsyncSupabase, get_supabase_async
     from controllers.auth_cookie_utils import set_auth_cookies
 from pydantic import BaseModel
 from fastapi import HTTPException, Response
@@ -14,17 +17,12 @@ class SignupRequest(BaseModel):
     username: str
     password: str
 
-def signup(request: SignupRequest, response: Response):
+async def signup(request: SignupRequest, response: Response, supabase: Optional[AsyncSupabase] = None):
+    supabase = supabase or get_supabase_async()
     try:
-        res = supabase.auth.sign_up({
-            "email": request.email,
-            "password": request.password,
-            "options": {
-                "data": {
-                    "username": request.username
-                }
-            }
-        })
+        res = await supabase.sign_up(
+            request.email, request.password, {"username": request.username}
+        )
 
         if not res.user:
             raise HTTPException(status_code=400, detail="Signup failed")
@@ -45,6 +43,8 @@ def signup(request: SignupRequest, response: Response):
         }
     except HTTPException as he:
         raise he
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Auth service timed out")
     except Exception as e:
         status_code = getattr(e, "status", None) or getattr(e, "status_code", 500)
         message = getattr(e, "message", None) or str(e)
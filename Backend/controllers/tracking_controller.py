@@ -1,10 +1,47 @@
 # Backend/controllers/tracking_controller.py
 
-def get_gmap_tracking_data():
+try:
+    from ..tracking import TrackingHub
+    from ..driver_matching import driver_index
+    from ..route_geometry import DEFAULT_ZOOM, RouteGeometry, RouteStore
+    from ..routing import routing_engine
+except ImportError:
+    from tracking import TrackingHub
+    from driver_matching import driver_index
+    from route_geometry import DEFAULT_ZOOM, RouteGeometry, RouteStore
+    from routing import routing_engine
+
+tracking_hub = TrackingHub()
+route_store = RouteStore()
+
+
+def get_gmap_tracking_data(ride_id: str = None, zoom: int = None):
     """
-    Returns mock tracking data for Google Maps integration.
-    In a real scenario, this would call Google Maps API (Distance Matrix, Directions, etc.)
+    Map data for a ride: the driver's latest live position when the ride is
+    being tracked, otherwise mock data.  With a route set for the ride only
+    the part still ahead of the driver is sent, simplified for ``zoom``.
+    In a real scenario, eta/distance would come from the Google Maps API (Distance Matrix, Directions, etc.)
     """
+    ping = tracking_hub.latest(ride_id) if ride_id else None
+    if ping is not None:
+        data = {
+            "ride_id": ride_id,
+            "driver_location": {"lat": ping.lat, "lng": ping.lng},
+            "heading": ping.heading,
+            "speed": ping.speed,
+            "status": ping.status,
+            "updated_at": ping.ts,
+        }
+        route = route_store.get(ride_id)
+        if route is not None:
+            ahead = route.remaining(ping.lat, ping.lng, DEFAULT_ZOOM if zoom is None else zoom)
+            data["route_polyline"] = ahead.pop("polyline")
+            data.update(ahead)
+            if ahead["remaining_s"] is not None:
+                data["eta"] = f"{max(1, round(ahead['remaining_s'] / 60))} min"
+                data["distance"] = f"{ahead['remaining_m'] / 1000:.1f} km"
+        return data
+
     return {
         "eta": "15 min",
         "distance": "4.5 km",
@@ -12,3 +49,57 @@ def get_gmap_tracking_data():
         "status": "On time",
         "route_polyline": "..." # This could be encoded polyline from GMap API
     }
+
+
+def record_ping(ride_id: str, driver_id: str, lat: float, lng: float,
+                heading: float = None, speed: float = None, status: str = "on_trip"):
+    # Keep the matching index's position current too
+    driver_index.move(driver_id, lat, lng)
+    return tracking_hub.record(ride_id, driver_id, lat, lng, heading, speed, status)
+
+
+def ride_history(ride_id: str, limit: int = None):
+    return [ping.snapshot() for ping in tracking_hub.history_of(ride_id, limit)]
+
+
+def is_known_ride(ride_id: str) -> bool:
+    """A ride with pings, a route or a reserved driver."""
+    return (tracking_hub.latest(ride_id) is not None or route_store.get(ride_id) is not None
+            or driver_index.for_ride(ride_id) is not None)
+
+
+def subscribe(ride_id: str, min_interval: float = None):
+    """
+    Live updates for the ride, or None when nothing is known about it yet,
+    so made-up ride ids cannot fill the tracking hub.
+    """
+    if not is_known_ride(ride_id):
+        return None
+    return tracking_hub.subscribe(ride_id, min_interval=min_interval)
+
+
+def set_route(ride_id: str, polyline: str = None, points=None, origin=None, destination=None):
+    """
+    Set the ride's route from a polyline, explicit points, or by routing
+    ``origin`` to ``destination`` (``(lat, lng)`` pairs) on the road graph,
+    which also gives the tracking payload an ETA.
+    """
+    if polyline:
+        route = RouteGeometry.from_polyline(polyline)
+    elif points:
+        route = RouteGeometry(points)
+    elif origin and destination:
+        found = routing_engine.route(*origin, *destination, geometry=True)
+        route = RouteGeometry(found.points, duration_s=found.duration_s)
+    else:
+        raise ValueError("a route needs a polyline, points, or origin and destination")
+    route_store.set(ride_id, route)
+    return {"ride_id": ride_id, "points": len(route.points), "length_m": round(route.length),
+            "duration_s": None if route.duration_s is None else round(route.duration_s)}
+
+
+def end_ride(ride_id: str):
+    route_store.pop(ride_id)
+    # The ride is over, so its driver can take new bookings
+    released = driver_index.release(ride_id) is not None
+    return tracking_hub.end_ride(ride_id) or released
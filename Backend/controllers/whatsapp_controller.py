@@ -1,18 +1,92 @@
-from fastapi import FastAPI, Request, Form, Response
+import logging
+import os
+
+from fastapi import Response
+from fastapi.concurrency import run_in_threadpool
 from twilio.twiml.messaging_response import MessagingResponse
-from controllers.chatbot_controller import get_chat_response
 
+try:
+    from ..agent import agent_reply
+    from ..http_client import get_client
+    from ..webhook_queue import WebhookDispatcher, MessageDeduper
+    from .chatbot_controller import get_chat_response
+except ImportError:
+    from agent import agent_reply
+    from http_client import get_client
+    from webhook_queue import WebhookDispatcher, MessageDeduper
+    from controllers.chatbot_controller import get_chat_response
+
+logger = logging.getLogger(__name__)
+
+TWILIO_ACCOUNT_SID = os.getenv("TWILIO_ACCOUNT_SID")
+TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
+TWILIO_WHATSAPP_FROM = os.getenv("TWILIO_WHATSAPP_FROM")
+# Without REST credentials a reply can only go back in the webhook response.
+TWILIO_CONFIGURED = bool(TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN and TWILIO_WHATSAPP_FROM)
+
+# "chat" answers with get_chat_response(); "agent" runs the booking agent.
+WHATSAPP_HANDLER = os.getenv("WHATSAPP_HANDLER", "chat")
+WHATSAPP_WORKERS = int(os.getenv("WHATSAPP_WORKERS", "4"))
+WHATSAPP_QUEUE_SIZE = int(os.getenv("WHATSAPP_QUEUE_SIZE", "1000"))
+WHATSAPP_DEDUP_TTL_SECONDS = float(os.getenv("WHATSAPP_DEDUP_TTL_SECONDS", "600"))
+
+# Empty TwiML: the real reply is sent later through the REST API.
+EMPTY_TWIML = str(MessagingResponse())
 
-async def whatsapp_webhook(
-    request: Request,
-    Body: str = Form(...)
-):
-    print("User said:", Body)
 
+def twiml_reply(body: str) -> str:
     response = MessagingResponse()
-    msg = response.message()
+    response.message(body)
+    return str(response)
+
+
+def send_whatsapp(to: str, body: str):
+    if not TWILIO_CONFIGURED:
+        logger.info("WhatsApp reply (Twilio not configured)", extra={"to": to, "body": body})
+        return
+    get_client().post(
+        f"https://api.twilio.com/2010-04-01/Accounts/{TWILIO_ACCOUNT_SID}/Messages.json",
+        data={"From": TWILIO_WHATSAPP_FROM, "To": to, "Body": body},
+        auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+    ).raise_for_status()
+
+
+def reply_to(sender: str, body: str) -> str:
+    if WHATSAPP_HANDLER == "agent":
+        return agent_reply(sender, body)
+    return get_chat_response(body)
+
+
+def handle_message(sender: str, body: str):
+    send_whatsapp(sender, reply_to(sender, body))
+
+
+dispatcher = WebhookDispatcher(
+    handle_message,
+    workers=WHATSAPP_WORKERS,
+    maxsize=WHATSAPP_QUEUE_SIZE,
+    deduper=MessageDeduper(ttl=WHATSAPP_DEDUP_TTL_SECONDS),
+)
+
+
+async def whatsapp_webhook(body: str, sender: str = "", message_sid: str = ""):
+    """
+    Queue the message and acknowledge Twilio straight away.  Retries of a
+    MessageSid we already have are acknowledged without being queued again.
+
+    When the Twilio REST credentials are not set, the reply is computed
+    here and returned inline as TwiML instead.
+    """
+    if not TWILIO_CONFIGURED:
+        reply = await run_in_threadpool(reply_to, sender, body)
+        return Response(content=twiml_reply(reply), media_type="application/xml")
+
+    status = dispatcher.submit(sender, body, message_sid or None)
+    if status == "busy":
+        # Twilio retries on 5xx, and the MessageSid has been released for it.
+        return Response(content=EMPTY_TWIML, media_type="application/xml", status_code=503)
+    return Response(content=EMPTY_TWIML, media_type="application/xml")
 
-    reply = get_chat_response(Body)
-    msg.body(reply)
 
-    return Response(content=str(response), media_type="application/xml")
\ No newline at end of file
+def webhook_stats() -> dict:
+    return dispatcher.stats()
@@ -0,0 +1,337 @@
+# driver_matching.py
+"""
+Nearest-available-driver matching.
+
+Available drivers live in a grid keyed by (vehicle type, cell), so a
+location ping is an O(1) move between cell sets and a k-nearest query only
+looks at the rings of cells around the pickup, for the requested vehicle
+types.  ``reserve`` picks and takes a driver out of the grid under one lock,
+so two concurrent bookings can never get the same driver.
+
+A reservation nobody releases (an abandoned chat, a lost release call)
+expires after ``reservation_ttl`` and the driver becomes available again.
+Every reservation gets the same TTL, so reservation order is expiry order
+and expired ones are dropped from the front of ``_by_ride``.
+"""
+import heapq
+import math
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+import numpy as np
+
+try:
+    from .geo import METERS_PER_DEGREE, haversine
+except ImportError:
+    from geo import METERS_PER_DEGREE, haversine
+
+VEHICLE_TYPES = ("Auto", "Bike", "Mini", "Sedan")
+
+DRIVER_CELL_DEGREES = float(os.getenv("DRIVER_CELL_DEGREES", "0.01"))
+DRIVER_MATCH_RADIUS_METERS = float(os.getenv("DRIVER_MATCH_RADIUS_METERS", "10000"))
+# Demo drivers seeded around Pune so bookings work without a driver app; set to 0 in production.
+DRIVER_DEMO_COUNT = int(os.getenv("DRIVER_DEMO_COUNT", "200"))
+DRIVER_RESERVATION_TTL_SECONDS = float(os.getenv("DRIVER_RESERVATION_TTL_SECONDS", str(2 * 60 * 60)))
+
+PUNE = (18.5204, 73.8567)
+
+AVAILABLE = "available"
+RESERVED = "reserved"
+OFFLINE = "offline"
+# States a location ping may set; RESERVED is only entered through reserve().
+PING_STATUSES = (AVAILABLE, OFFLINE)
+
+
+class Driver:
+    __slots__ = ("driver_id", "name", "vehicle_type", "lat", "lng", "status", "ride_id", "updated", "cell",
+                 "profile", "reserved_until")
+
+    def __init__(self, driver_id, name, vehicle_type, lat, lng, status=AVAILABLE, profile=None):
+        self.driver_id = driver_id
+        self.name = name
+        self.vehicle_type = vehicle_type
+        self.lat = lat
+        self.lng = lng
+        self.status = status
+        self.ride_id = None
+        self.reserved_until = None
+        self.updated = 0.0
+        self.cell = None  # grid key while available, else None
+        self.profile = dict(profile or {})  # rating, vehicle, plate_number, phone, ...
+
+    def to_dict(self) -> dict:
+        return {
+            "driver_id": self.driver_id,
+            "name": self.name,
+            "vehicle_type": self.vehicle_type,
+            "lat": self.lat,
+            "lng": self.lng,
+            "status": self.status,
+            "ride_id": self.ride_id,
+            **self.profile,
+        }
+
+
+class DriverIndex:
+    def __init__(self, cell_degrees=DRIVER_CELL_DEGREES, reservation_ttl=DRIVER_RESERVATION_TTL_SECONDS,
+                 clock=time.time):
+        self.cell_degrees = cell_degrees
+        self.reservation_ttl = reservation_ttl
+        self._clock = clock
+        self._drivers = {}
+        self._by_ride = {}  # ride_id -> driver, in reservation (= expiry) order
+        self._cells = {}  # (vehicle_type, cx, cy) -> set of driver ids
+        self._available = dict.fromkeys(VEHICLE_TYPES, 0)
+        self._lock = threading.Lock()
+        self.expired_reservations = 0
+
+    def __len__(self):
+        return len(self._drivers)
+
+    # ---- updates ----
+
+    def update(self, driver_id, lat, lng, vehicle_type=None, name=None, status=None, profile=None) -> Driver:
+        """
+        Record a location ping, registering the driver on first sight.
+        ``status`` may switch a driver between available and offline; a
+        reserved driver stays reserved until ``release``.
+        """
+        if status is not None and status not in PING_STATUSES:
+            raise ValueError(f"Unknown driver status: {status!r}")
+        with self._lock:
+            driver = self._drivers.get(driver_id)
+            if driver is None:
+                if vehicle_type not in VEHICLE_TYPES:
+                    raise ValueError(f"Unknown vehicle type: {vehicle_type!r}")
+                driver = Driver(driver_id, name or driver_id, vehicle_type, lat, lng, status or AVAILABLE, profile)
+                self._drivers[driver_id] = driver
+            else:
+                if vehicle_type is not None and vehicle_type != driver.vehicle_type:
+                    if vehicle_type not in VEHICLE_TYPES:
+                        raise ValueError(f"Unknown vehicle type: {vehicle_type!r}")
+                    self._unplace(driver)
+                    driver.vehicle_type = vehicle_type
+                if name:
+                    driver.name = name
+                if profile:
+                    driver.profile.update(profile)
+                driver.lat, driver.lng = lat, lng
+                if status is not None and driver.status != RESERVED:
+                    driver.status = status
+
+            driver.updated = self._clock()
+            self._place(driver)
+            return driver
+
+    def move(self, driver_id, lat, lng) -> bool:
+        """Position-only ping for a known driver (e.g. from live tracking)."""
+        with self._lock:
+            driver = self._drivers.get(driver_id)
+            if driver is None:
+                return False
+            driver.lat, driver.lng = lat, lng
+            driver.updated = self._clock()
+            self._place(driver)
+            return True
+
+    def remove(self, driver_id) -> bool:
+        with self._lock:
+            driver = self._drivers.pop(driver_id, None)
+            if driver is None:
+                return False
+            self._unplace(driver)
+            self._by_ride.pop(driver.ride_id, None)
+            return True
+
+    # ---- queries ----
+
+    def get(self, driver_id) -> Optional[Driver]:
+        return self._drivers.get(driver_id)
+
+    def for_ride(self, ride_id) -> Optional[Driver]:
+        return self._by_ride.get(ride_id)
+
+    def nearest(self, lat, lng, vehicle_type=None, k=5, max_distance=DRIVER_MATCH_RADIUS_METERS):
+        """``[(driver, meters), ...]`` for up to ``k`` available drivers, nearest first."""
+        with self._lock:
+            self._expire_reservations()
+            return self._nearest(lat, lng, self._types(vehicle_type), k, max_distance)
+
+    # ---- booking ----
+
+    def reserve(self, lat, lng, ride_id, vehicle_type=None, max_distance=DRIVER_MATCH_RADIUS_METERS):
+        """
+        Atomically take the nearest available driver for ``ride_id``.
+        Returns ``(driver, meters)`` or None when nobody is in range.
+        """
+        with self._lock:
+            self._expire_reservations()
+            if ride_id in self._by_ride:
+                driver = self._by_ride[ride_id]
+                return driver, haversine(lat, lng, driver.lat, driver.lng)
+
+            found = self._nearest(lat, lng, self._types(vehicle_type), 1, max_distance)
+            if not found:
+                return None
+            driver, meters = found[0]
+            self._unplace(driver)
+            driver.status = RESERVED
+            driver.ride_id = ride_id
+            driver.reserved_until = self._clock() + self.reservation_ttl
+            self._by_ride[ride_id] = driver
+            return driver, meters
+
+    def release(self, ride_id) -> Optional[Driver]:
+        """Make the driver reserved for ``ride_id`` available again."""
+        with self._lock:
+            driver = self._by_ride.pop(ride_id, None)
+            if driver is None:
+                return None
+            self._free(driver)
+            return driver
+
+    def stats(self) -> dict:
+        return {
+            "drivers": len(self._drivers),
+            "reserved": len(self._by_ride),
+            "expired_reservations": self.expired_reservations,
+            "available": dict(self._available),
+            "cells": len(self._cells),
+        }
+
+    # ---- internals (lock held) ----
+
+    def _types(self, vehicle_type):
+        if vehicle_type is None:
+            return VEHICLE_TYPES
+        if vehicle_type not in VEHICLE_TYPES:
+            raise ValueError(f"Unknown vehicle type: {vehicle_type!r}")
+        return (vehicle_type,)
+
+    def _free(self, driver):
+        driver.status = AVAILABLE
+        driver.ride_id = None
+        driver.reserved_until = None
+        self._place(driver)
+
+    def _expire_reservations(self):
+        now = self._clock()
+        while self._by_ride:
+            ride_id, driver = next(iter(self._by_ride.items()))
+            if driver.reserved_until > now:
+                break
+            del self._by_ride[ride_id]
+            self._free(driver)
+            self.expired_reservations += 1
+
+    def _cell_of(self, lat, lng):
+        return int(math.floor(lat / self.cell_degrees)), int(math.floor(lng / self.cell_degrees))
+
+    def _place(self, driver):
+        if driver.status != AVAILABLE:
+            self._unplace(driver)
+            return
+        cx, cy = self._cell_of(driver.lat, driver.lng)
+        key = (driver.vehicle_type, cx, cy)
+        if key == driver.cell:
+            return
+        self._unplace(driver)
+        self._cells.setdefault(key, set()).add(driver.driver_id)
+        self._available[driver.vehicle_type] += 1
+        driver.cell = key
+
+    def _unplace(self, driver):
+        key = driver.cell
+        if key is None:
+            return
+        ids = self._cells.get(key)
+        if ids is not None:
+            ids.discard(driver.driver_id)
+            if not ids:
+                del self._cells[key]
+        self._available[key[0]] -= 1
+        driver.cell = None
+
+    def _nearest(self, lat, lng, types, k, max_distance):
+        types = [t for t in types if self._available[t]]
+        if not types or k <= 0:
+            return []
+
+        cx, cy = self._cell_of(lat, lng)
+        # Smallest side of any cell within reach, so ring r is at least
+        # (r - 1) cells of this size away from any point in the centre cell.
+        reach = abs(lat) + max_distance / METERS_PER_DEGREE + self.cell_degrees
+        cell_m = self.cell_degrees * METERS_PER_DEGREE * math.cos(math.radians(min(reach, 89.0)))
+        max_ring = int(max_distance // cell_m) + 2
+
+        found_ids, found_m = [], []
+        for ring in range(max_ring + 1):
+            drivers = [
+                self._drivers[driver_id]
+                for x, y in _ring_cells(cx, cy, ring)
+                for vehicle_type in types
+                for driver_id in self._cells.get((vehicle_type, x, y), ())
+            ]
+            if drivers:
+                # Every candidate in the ring is scored in one numpy pass.
+                meters = haversine(lat, lng, np.fromiter((d.lat for d in drivers), float, len(drivers)),
+                                   np.fromiter((d.lng for d in drivers), float, len(drivers)))
+                keep = np.flatnonzero(meters <= max_distance)
+                found_ids.extend(drivers[i].driver_id for i in keep)
+                found_m.extend(meters[keep].tolist())
+
+            # Anything outside the rings scanned so far is at least this far away.
+            if len(found_m) >= k and heapq.nsmallest(k, found_m)[-1] <= ring * cell_m:
+                break
+
+        best = heapq.nsmallest(k, zip(found_m, found_ids))
+        return [(self._drivers[driver_id], meters) for meters, driver_id in best]
+
+
+def _ring_cells(cx, cy, ring):
+    if ring == 0:
+        yield cx, cy
+        return
+    for x in range(cx - ring, cx + ring + 1):
+        yield x, cy - ring
+        yield x, cy + ring
+    for y in range(cy - ring + 1, cy + ring):
+        yield cx - ring, y
+        yield cx + ring, y
+
+
+def parse_lat_lng(text):
+    """``(lat, lng)`` from a "lat,lng" string, or None."""
+    try:
+        lat, lng = (float(part) for part in str(text).split(","))
+    except ValueError:
+        return None
+    if -90 <= lat <= 90 and -180 <= lng <= 180:
+        return lat, lng
+    return None
+
+
+def seed_demo_drivers(index, count, center=PUNE, spread_degrees=0.12, seed=42):
+    rng = random.Random(seed)
+    names = ["Ramesh", "Rahul", "Suresh", "Rajesh", "Amit", "Vikas", "Sanjay", "Prakash", "Mahesh", "Nitin"]
+    for i in range(count):
+        index.update(
+            f"demo-{i}",
+            center[0] + rng.uniform(-spread_degrees, spread_degrees),
+            center[1] + rng.uniform(-spread_degrees, spread_degrees),
+            vehicle_type=VEHICLE_TYPES[i % len(VEHICLE_TYPES)],
+            name=f"{names[i % len(names)]} {chr(65 + i % 26)}.",
+            profile={
+                "rating": round(rng.uniform(4.3, 5.0), 1),
+                "plate_number": f"MH 12 {chr(65 + i % 26)}{chr(65 + i // 26 % 26)} {1000 + i % 9000}",
+                "phone": f"+91 9{rng.randint(100000000, 999999999)}",
+            },
+        )
+
+
+driver_index = DriverIndex()
+if DRIVER_DEMO_COUNT:
+    seed_demo_drivers(driver_index, DRIVER_DEMO_COUNT)
@@ -0,0 +1,37 @@
+# geo.py
+"""
+Distance helpers shared by driver matching, routing and route geometry.
+
+``haversine`` is vectorized: pass arrays to score many candidates in one
+numpy pass, or scalars for a single distance.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS = 6371000  # meters
+METERS_PER_DEGREE = EARTH_RADIUS * math.pi / 180
+
+
+def haversine(lat1, lng1, lat2, lng2):
+    """
+    Great-circle distance in meters.
+
+    Arguments may be scalars or arrays and broadcast like any numpy
+    expression; a plain float is returned when every argument is a scalar.
+    """
+    p1 = np.radians(lat1)
+    p2 = np.radians(lat2)
+    dl = np.radians(np.subtract(lng2, lng1))
+
+    a = np.sin((p2 - p1) / 2) ** 2 + np.cos(p1) * np.cos(p2) * np.sin(dl / 2) ** 2
+    distance = 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+    return float(distance) if np.ndim(distance) == 0 else distance
+
+
+def path_length(points) -> float:
+    """Meters along a list of ``(lat, lng)`` points."""
+    if len(points) < 2:
+        return 0.0
+    lats, lngs = np.asarray(points, dtype=float).T
+    return float(haversine(lats[:-1], lngs[:-1], lats[1:], lngs[1:]).sum())
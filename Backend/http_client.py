@@ -0,0 +1,243 @@
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+try:
+    from .metrics import observe_upstream, upstream_name
+except ImportError:
+    from metrics import observe_upstream, upstream_name
+
+DEFAULT_TIMEOUT = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+DEFAULT_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "3"))
+DEFAULT_PER_HOST_LIMIT = int(os.getenv("HTTP_PER_HOST_LIMIT", "10"))
+DEFAULT_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+# 429/503 mean the upstream refused the request, so any method may retry;
+# gateway errors may have reached the upstream and only retry when idempotent.
+ALWAYS_RETRY_STATUSES = frozenset({429, 503})
+IDEMPOTENT_RETRY_STATUSES = frozenset({502, 504})
+
+# The request never left this process, so retrying cannot duplicate it.
+UNSENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+@dataclass
+class HostStats:
+    requests: int = 0
+    errors: int = 0
+    retries: int = 0
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+
+    @property
+    def mean_seconds(self) -> float:
+        return self.total_seconds / self.requests if self.requests else 0.0
+
+
+class OutboundClient:
+    """
+    Shared client for every outbound HTTP call.
+
+    Connections are pooled and kept alive, and each host is capped at
+    ``per_host_limit`` requests in flight so one slow upstream cannot hold the
+    whole pool.  Failed attempts are retried with exponential backoff when a
+    retry cannot duplicate a non-idempotent request.  Latency, errors and
+    retries are recorded per host in ``stats``, and each attempt is passed to
+    ``observe(host, seconds, failed)`` when one is given.
+    """
+
+    def __init__(
+        self,
+        timeout: float = DEFAULT_TIMEOUT,
+        connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+        retries: int = DEFAULT_RETRIES,
+        backoff: float = 0.2,
+        observe: Optional[Callable[[str, float, bool], None]] = None,
+    ):
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive,
+        )
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.observe = observe
+        self.stats = {}
+
+        self._lock = threading.Lock()
+        self._client = None
+        self._async_client = None
+        self._host_limits = {}
+        self._async_host_limits = {}
+
+    # ---- sync ----
+
+    def request(self, method: str, url: str, *, retries: Optional[int] = None,
+                idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        host = _host(url)
+        client = self._get_sync_client()
+        attempts = self._attempts(retries)
+
+        # The host slot is only held while a request is in flight, so a call
+        # backing off does not keep others to the same host waiting.
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            with self._host_limit(host):
+                started = time.perf_counter()
+                try:
+                    response = client.request(method, url, **kwargs)
+                except httpx.TransportError as exc:
+                    self._observe(host, started, failed=True)
+                    if last or not _retryable_error(method, idempotent, exc):
+                        raise
+                else:
+                    self._observe(host, started, failed=response.status_code >= 500)
+                    if last or not _retryable_status(method, idempotent, response.status_code):
+                        return response
+                    response.close()
+
+            self._record_retry(host)
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> httpx.Response:
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+
+    # ---- async ----
+
+    async def arequest(self, method: str, url: str, *, retries: Optional[int] = None,
+                       idempotent: Optional[bool] = None, **kwargs) -> httpx.Response:
+        host = _host(url)
+        client = self._get_async_client()
+        attempts = self._attempts(retries)
+
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            async with self._async_host_limit(host):
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, **kwargs)
+                except httpx.TransportError as exc:
+                    self._observe(host, started, failed=True)
+                    if last or not _retryable_error(method, idempotent, exc):
+                        raise
+                else:
+                    self._observe(host, started, failed=response.status_code >= 500)
+                    if last or not _retryable_status(method, idempotent, response.status_code):
+                        return response
+                    await response.aclose()
+
+            self._record_retry(host)
+            await asyncio.sleep(self.backoff * 2 ** attempt)
+
+    async def aget(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("GET", url, **kwargs)
+
+    async def apost(self, url: str, **kwargs) -> httpx.Response:
+        return await self.arequest("POST", url, **kwargs)
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+            self._async_host_limits.clear()
+
+    # ---- internals ----
+
+    def _attempts(self, retries):
+        return 1 + max(0, self.retries if retries is None else retries)
+
+    def _get_sync_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout, limits=self.limits)
+        return self._client
+
+    def _get_async_client(self):
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits)
+        return self._async_client
+
+    def _host_limit(self, host):
+        with self._lock:
+            semaphore = self._host_limits.get(host)
+            if semaphore is None:
+                semaphore = self._host_limits[host] = threading.BoundedSemaphore(self.per_host_limit)
+        return semaphore
+
+    def _async_host_limit(self, host):
+        semaphore = self._async_host_limits.get(host)
+        if semaphore is None:
+            semaphore = self._async_host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        return semaphore
+
+    def _observe(self, host, started, failed):
+        elapsed = time.perf_counter() - started
+        if self.observe is not None:
+            self.observe(host, elapsed, failed)
+        with self._lock:
+            stats = self.stats.setdefault(host, HostStats())
+            stats.requests += 1
+            stats.total_seconds += elapsed
+            stats.max_seconds = max(stats.max_seconds, elapsed)
+            if failed:
+                stats.errors += 1
+
+    def _record_retry(self, host):
+        with self._lock:
+            self.stats.setdefault(host, HostStats()).retries += 1
+
+
+def _host(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+def _is_idempotent(method: str, idempotent: Optional[bool]) -> bool:
+    if idempotent is not None:
+        return idempotent
+    return method.upper() in IDEMPOTENT_METHODS
+
+
+def _retryable_error(method, idempotent, exc) -> bool:
+    return _is_idempotent(method, idempotent) or isinstance(exc, UNSENT_ERRORS)
+
+
+def _retryable_status(method, idempotent, status) -> bool:
+    if status in ALWAYS_RETRY_STATUSES:
+        return True
+    return status in IDEMPOTENT_RETRY_STATUSES and _is_idempotent(method, idempotent)
+
+
+def observe_host(host: str, seconds: float, failed: bool):
+    observe_upstream(upstream_name(host), seconds, "error" if failed else "ok")
+
+
+_default_client = None
+
+
+def get_client() -> OutboundClient:
+    """Process-wide client shared by every module that talks HTTP; it feeds the upstream metrics."""
+    global _default_client
+    if _default_client is None:
+        _default_client = OutboundClient(observe=observe_host)
+    return _default_client
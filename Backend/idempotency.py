@@ -0,0 +1,103 @@
+# idempotency.py
+"""
+Replay of completed operations by idempotency key.
+
+A key names one step of one user's journey (e.g. ``(user, journey, "book")``)
+or is supplied by the client.  The first call with a key runs the
+operation and stores its result; later calls within ``ttl`` get the stored
+result back without running it, and calls made while it is still running
+wait for it instead of starting a second one.  A ``None`` result means
+nothing happened (e.g. no driver was free), so it is not stored and the
+next call tries again.
+
+Every entry lives for the same ``ttl``, so insertion order is expiry order:
+expired entries are dropped from the front of an ordered dict, and the
+oldest go first beyond ``maxsize``.  Lookups and stores are O(1).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(60 * 60)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+_MISSING = object()
+
+
+class IdempotencyCache:
+    def __init__(self, maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL_SECONDS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._results = OrderedDict()  # key -> (result, expires at)
+        self._inflight = {}  # key -> Event set when the running call finishes
+        self._lock = threading.Lock()
+
+        self.runs = 0
+        self.replays = 0
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, key, default=None):
+        with self._lock:
+            result = self._lookup(key)
+        return default if result is _MISSING else result
+
+    def run(self, key, operation):
+        """``operation()``'s result for ``key``, running it at most once per ``ttl``."""
+        while True:
+            with self._lock:
+                result = self._lookup(key)
+                if result is not _MISSING:
+                    self.replays += 1
+                    return result
+                running = self._inflight.get(key)
+                if running is None:
+                    running = self._inflight[key] = threading.Event()
+                    break
+            # A duplicate of a call in progress: wait, then replay its result
+            # (or run it ourselves if it stored nothing).
+            running.wait()
+
+        try:
+            result = operation()
+            with self._lock:
+                self.runs += 1
+                if result is not None:
+                    self._store(key, result)
+            return result
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            running.set()
+
+    def forget(self, key):
+        with self._lock:
+            self._results.pop(key, None)
+
+    def stats(self) -> dict:
+        return {"entries": len(self._results), "in_flight": len(self._inflight),
+                "runs": self.runs, "replays": self.replays}
+
+    # ---- internals (lock held) ----
+
+    def _lookup(self, key):
+        entry = self._results.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[1] <= self._clock():
+            del self._results[key]
+            return _MISSING
+        return entry[0]
+
+    def _store(self, key, result):
+        now = self._clock()
+        self._results.pop(key, None)
+        self._results[key] = (result, now + self.ttl)
+        while self._results:
+            oldest, (_, expires) = next(iter(self._results.items()))
+            if expires > now and len(self._results) <= self.maxsize:
+                break
+            del self._results[oldest]
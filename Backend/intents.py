@@ -0,0 +1,159 @@
+# intents.py
+"""
+Keyword/pattern intent classification shared by the WhatsApp agent and the
+chatbot.
+
+Every intent in ``INTENTS`` is compiled into one regex: all keywords go into
+a single prefix trie and each pattern becomes a named alternative, so a
+message is scanned once no matter how many intents there are.  Matches only
+count on word boundaries, so "hi" no longer fires inside "this".
+"""
+import re
+from typing import NamedTuple
+
+_WORD_START = r"(?<!\w)"
+_WORD_END = r"(?!\w)"
+_SLOT_GROUP = re.compile(r"\(\?P<(\w+)>")
+
+
+class Intent(NamedTuple):
+    """
+    ``keywords`` maps a phrase to the slots it fills (``{}`` for none).
+    ``patterns`` are regexes whose named groups become slots.  ``weight`` is
+    added to the intent's score for every hit.
+    """
+    name: str
+    keywords: dict = {}
+    patterns: tuple = ()
+    weight: float = 1.0
+
+
+class IntentMatch(NamedTuple):
+    name: str
+    score: float
+    slots: dict
+    start: int
+
+
+INTENTS = (
+    Intent("greeting", keywords=dict.fromkeys(
+        ("hi", "hii", "hello", "hey", "namaste", "good morning", "good evening"), {}), weight=0.5),
+    Intent("metro", keywords=dict.fromkeys(("metro", "station"), {})),
+    Intent("fare", keywords=dict.fromkeys(("fare", "fares", "price", "cost", "ticket"), {}), weight=2.0),
+    Intent("ride_choice", keywords={
+        "1": {"ride": "Auto"},
+        "auto": {"ride": "Auto"},
+        "rickshaw": {"ride": "Auto"},
+        "2": {"ride": "Bike"},
+        "bike": {"ride": "Bike"},
+        "bike taxi": {"ride": "Bike"},
+    }),
+    Intent("confirm", keywords=dict.fromkeys(("yes", "y", "ok", "okay", "confirm", "sure"), {})),
+    Intent("cancel", keywords=dict.fromkeys(("no", "cancel", "stop"), {})),
+)
+
+
+def _normalize(phrase):
+    return " ".join(phrase.lower().split())
+
+
+def _trie_regex(phrases):
+    """Prefix-factored alternation, e.g. {"bike", "bike taxi"} -> "bike(?:\\s+taxi)?"."""
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for ch in phrase:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        optional = "" in node
+        alternatives = [
+            (r"\s+" if ch == " " else re.escape(ch)) + emit(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else "(?:" + "|".join(alternatives) + ")"
+        if optional:
+            # Greedy, so the longest phrase is tried first.
+            return "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class IntentMatcher:
+    def __init__(self, intents=INTENTS):
+        self.intents = tuple(intents)
+        self._order = {intent.name: i for i, intent in enumerate(self.intents)}
+
+        # phrase -> [(intent, slots), ...]; several intents may share a phrase.
+        self._keywords = {}
+        for intent in self.intents:
+            for phrase, slots in intent.keywords.items():
+                self._keywords.setdefault(_normalize(phrase), []).append((intent, slots))
+
+        alternatives = []
+        if self._keywords:
+            alternatives.append("(?P<kw>" + _trie_regex(self._keywords) + ")")
+
+        # group name -> (intent, {prefixed slot group: slot name})
+        self._patterns = {}
+        for i, intent in enumerate(self.intents):
+            for j, pattern in enumerate(intent.patterns):
+                group = f"p{i}_{j}"
+                slot_groups = {}
+
+                def prefix(m, group=group, slot_groups=slot_groups):
+                    slot_groups[f"{group}__{m.group(1)}"] = m.group(1)
+                    return f"(?P<{group}__{m.group(1)}>"
+
+                alternatives.append(f"(?P<{group}>" + _SLOT_GROUP.sub(prefix, pattern) + ")")
+                self._patterns[group] = (intent, slot_groups)
+
+        self._regex = re.compile(
+            _WORD_START + "(?:" + "|".join(alternatives) + ")" + _WORD_END,
+            re.IGNORECASE,
+        ) if alternatives else None
+
+    def classify(self, text):
+        """
+        Return every intent found in ``text`` as ``IntentMatch`` tuples,
+        highest score first; ties go to the intent listed first in the table.
+        For each slot, the earliest match in the text wins.
+        """
+        if self._regex is None:
+            return []
+
+        found = {}
+        for m in self._regex.finditer(text):
+            if m.lastgroup == "kw":
+                hits = self._keywords.get(_normalize(m.group("kw")), ())
+            else:
+                intent, slot_groups = self._patterns[m.lastgroup]
+                slots = {name: m.group(g) for g, name in slot_groups.items() if m.group(g) is not None}
+                hits = ((intent, slots),)
+
+            for intent, slots in hits:
+                entry = found.get(intent.name)
+                if entry is None:
+                    found[intent.name] = entry = [0.0, {}, m.start()]
+                entry[0] += intent.weight
+                for name, value in slots.items():
+                    entry[1].setdefault(name, value)
+
+        matches = [IntentMatch(name, score, slots, start) for name, (score, slots, start) in found.items()]
+        matches.sort(key=lambda match: (-match.score, self._order[match.name]))
+        return matches
+
+    def top(self, text, among=None):
+        """Best match, optionally restricted to the intent names in ``among``."""
+        for match in self.classify(text):
+            if among is None or match.name in among:
+                return match
+        return None
+
+
+default_matcher = IntentMatcher()
+classify = default_matcher.classify
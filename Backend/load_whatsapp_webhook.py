@@ -0,0 +1,119 @@
+"""
+Replay recorded Twilio webhook payloads against /api/whatsapp.
+
+Every round of the replay gets fresh MessageSids, but the retries recorded
+within a round share the original's sid, so the run also checks that they
+are acknowledged without being handled twice.
+
+    python -m Backend.load_whatsapp_webhook --rounds 20 --concurrency 50
+    python -m Backend.load_whatsapp_webhook --url http://localhost:8000/api/whatsapp
+
+Without ``--url`` the route runs in-process and replies are not sent;
+``--reply-latency`` simulates a slow Twilio send.  With ``--url`` only
+acknowledgement latency is reported.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+try:
+    from .controllers import whatsapp_controller
+    from .routes import whatsapp_route
+except ImportError:
+    import controllers.whatsapp_controller as whatsapp_controller
+    from routes import whatsapp_route
+
+RECORDED_PAYLOADS = os.path.join(os.path.dirname(__file__), "data", "whatsapp_webhooks.jsonl")
+
+
+def load_payloads(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def replay_rounds(payloads, rounds):
+    for n in range(rounds):
+        for payload in payloads:
+            sid = f"{payload['MessageSid']}-{n}"
+            yield {**payload, "MessageSid": sid, "SmsMessageSid": sid, "SmsSid": sid}
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def replay(client, url, payloads, concurrency):
+    latencies = []
+    statuses = {}
+    limit = asyncio.Semaphore(concurrency)
+
+    async def post(payload):
+        async with limit:
+            started = time.perf_counter()
+            response = await client.post(url, data=payload)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(post(p) for p in payloads))
+    return time.perf_counter() - started, sorted(latencies), statuses
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--payloads", default=RECORDED_PAYLOADS)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--reply-latency", type=float, default=0.05,
+                        help="Seconds each simulated reply send takes (in-process only)")
+    args = parser.parse_args()
+
+    recorded = load_payloads(args.payloads)
+    payloads = list(replay_rounds(recorded, args.rounds))
+    unique = len({p["MessageSid"] for p in payloads})
+
+    if args.url:
+        client = httpx.AsyncClient(timeout=30)
+        url = args.url
+    else:
+        def simulated_send(to, body):
+            time.sleep(args.reply_latency)
+
+        whatsapp_controller.send_whatsapp = simulated_send
+        app = FastAPI()
+        app.include_router(whatsapp_route.router, prefix="/api")
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+        url = "/api/whatsapp"
+
+    async with client:
+        elapsed, latencies, statuses = await replay(client, url, payloads, args.concurrency)
+
+    print(f"requests     {len(payloads)} ({unique} unique MessageSids) in {elapsed:.2f}s "
+          f"= {len(payloads) / elapsed:.0f} req/s")
+    print(f"ack latency  p50 {percentile(latencies, 50) * 1000:.1f} ms  "
+          f"p95 {percentile(latencies, 95) * 1000:.1f} ms  "
+          f"p99 {percentile(latencies, 99) * 1000:.1f} ms  "
+          f"mean {statistics.mean(latencies) * 1000:.1f} ms")
+    print(f"status codes {statuses}")
+
+    if not args.url:
+        started = time.perf_counter()
+        await asyncio.to_thread(whatsapp_controller.dispatcher.join)
+        stats = whatsapp_controller.dispatcher.stats()
+        print(f"drained      in {time.perf_counter() - started:.2f}s after the last ack")
+        print(f"dispatcher   {stats}")
+        if stats["processed"] + stats["failed"] != unique - stats["rejected"]:
+            raise SystemExit("handled message count does not match the unique MessageSids")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
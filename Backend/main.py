@@ -1,18 +1,40 @@
 # main.py
 import os
+from contextlib import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from fastapi import FastAPI, Request, Form
 from fastapi.responses import Response
-from twilio.twiml.messaging_response import MessagingResponse
-app=FastAPI()
+from dotenv import load_dotenv
+
+# Before the app's own imports: several modules (auth_tokens, memory,
+# rides_controller, ...) read their configuration when imported.
+load_dotenv()
 
 try:
     from .agent import agent_reply
-    from .routes import chatbot_routes, tracking_routes, login_route, signup_route, whatsapp_route, rides_route
+    from .log_setup import configure_logging
+    from .metrics import MetricsMiddleware
+    from .supabase_async import close_supabase_async
+    from .routes import chatbot_routes, tracking_routes, login_route, signup_route, whatsapp_route, rides_route, drivers_route, metrics_route
 except ImportError:
     from agent import agent_reply
-    from routes import chatbot_routes, tracking_routes, login_route, signup_route, whatsapp_route, rides_route
+    from log_setup import configure_logging
+    from metrics import MetricsMiddleware
+    from supabase_async import close_supabase_async
+    from routes import chatbot_routes, tracking_routes, login_route, signup_route, whatsapp_route, rides_route, drivers_route, metrics_route
+
+configure_logging()
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # Clients are created on first use, so there is nothing to open here.
+    yield
+    await close_supabase_async()
+
+
+app=FastAPI(lifespan=lifespan)
 
 # Add CORS middleware to allow frontend communication
 cors_origins = [
@@ -28,7 +50,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Missing-Providers"],
 )
+# Added last so it is outermost and its timings include CORS handling.
+app.add_middleware(MetricsMiddleware)
 
 # Include Routes
 app.include_router(chatbot_routes.router, prefix="/api")
@@ -37,6 +62,9 @@ app.include_router(login_route.router, prefix="/api")
 app.include_router(signup_route.router, prefix="/api")
 app.include_router(whatsapp_route.router, prefix="/api")
 app.include_router(rides_route.router, prefix="/api")
+app.include_router(drivers_route.router, prefix="/api")
+# Scraped by Prometheus at the conventional path, outside /api.
+app.include_router(metrics_route.router)
 
 # # Define the request body schema
 # class WhatsAppPayload(BaseModel):
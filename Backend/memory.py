@@ -1,15 +1,225 @@
 # memory.py
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_TTL_SECONDS = float(os.getenv("SESSION_TTL_SECONDS", str(60 * 60 * 24)))
+SESSION_MAX_SIZE = int(os.getenv("SESSION_MAX_SIZE", "100000"))
+
+logger = logging.getLogger(__name__)
+
+
+class Session:
+    """
+    One user's conversation state.
+
+    Uses ``__slots__`` to keep per-session memory small, and supports
+    ``session["state"]`` style access so callers can treat it like the
+    dict it replaced.
+    """
+
+    FIELDS = ("state", "pickup", "destination", "ride_type", "journey_id", "ride_id")
+    __slots__ = FIELDS + ("last_seen",)
+
+    def __init__(self, state="idle", pickup=None, destination=None, ride_type=None, journey_id=None,
+                 ride_id=None):
+        self.state = state
+        self.pickup = pickup
+        self.destination = destination
+        self.ride_type = ride_type
+        self.journey_id = journey_id
+        self.ride_id = ride_id  # driver reservation held for this journey
+        self.last_seen = 0.0
+
+    def __getitem__(self, key):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __setitem__(self, key, value):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def __eq__(self, other):
+        return isinstance(other, Session) and self.to_tuple() == other.to_tuple()
+
+    def __repr__(self):
+        return f"Session({', '.join(f'{f}={getattr(self, f)!r}' for f in self.FIELDS)})"
+
+    def to_tuple(self):
+        return tuple(getattr(self, f) for f in self.FIELDS)
+
+
+class InMemorySessionStore:
+    """
+    Per-process store with LRU eviction beyond ``maxsize`` and a TTL that
+    expires sessions idle for ``ttl`` seconds.  The dict's insertion order is
+    the LRU order: touching a session re-inserts it at the end.
+    """
+
+    def __init__(self, maxsize=SESSION_MAX_SIZE, ttl=SESSION_TTL_SECONDS, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def get(self, user_id):
+        with self._lock:
+            session = self._sessions.pop(user_id, None)
+            if session is None:
+                return None
+            now = self._clock()
+            if now - session.last_seen > self.ttl:
+                return None
+            session.last_seen = now
+            self._sessions[user_id] = session
+            return session
+
+    def save(self, user_id, session):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+            session.last_seen = self._clock()
+            self._sessions[user_id] = session
+            self._evict()
+
+    def delete(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def _evict(self):
+        while len(self._sessions) > self.maxsize:
+            del self._sessions[next(iter(self._sessions))]
+
+        # Oldest entries are first, so expired ones can be dropped from the front.
+        now = self._clock()
+        while self._sessions:
+            oldest = next(iter(self._sessions))
+            if now - self._sessions[oldest].last_seen <= self.ttl:
+                break
+            del self._sessions[oldest]
+
+
+class SQLiteSessionStore:
+    """
+    Store backed by a SQLite file in WAL mode so several uvicorn workers on
+    one host share sessions and they survive restarts.  Each thread gets its
+    own connection.  Sessions idle longer than ``ttl`` are expired, and the
+    least recently used are removed beyond ``maxsize``.
+    """
+
+    def __init__(self, path=SESSION_DB_PATH, maxsize=SESSION_MAX_SIZE, ttl=SESSION_TTL_SECONDS,
+                 clock=time.time):
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " user_id TEXT PRIMARY KEY,"
+                " state TEXT, pickup TEXT, destination TEXT, ride_type TEXT,"
+                " last_seen REAL NOT NULL, journey_id TEXT, ride_id TEXT)"
+            )
+            # Files created by older versions lack the newer columns.
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}
+            for column in ("journey_id", "ride_id"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE sessions ADD COLUMN {column} TEXT")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_last_seen ON sessions (last_seen)")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def get(self, user_id):
+        conn = self._connect()
+        now = self._clock()
+        with conn:
+            row = conn.execute(
+                "SELECT state, pickup, destination, ride_type, journey_id, ride_id, last_seen FROM sessions"
+                " WHERE user_id = ?",
+                (user_id,),
+            ).fetchone()
+            if row is None:
+                return None
+            if now - row[6] > self.ttl:
+                conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+                return None
+            conn.execute("UPDATE sessions SET last_seen = ? WHERE user_id = ?", (now, user_id))
+        return Session(*row[:6])
+
+    def save(self, user_id, session):
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO sessions (user_id, state, pickup, destination, ride_type, journey_id, ride_id,"
+                " last_seen) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(user_id) DO UPDATE SET state = excluded.state,"
+                " pickup = excluded.pickup, destination = excluded.destination,"
+                " ride_type = excluded.ride_type, journey_id = excluded.journey_id,"
+                " ride_id = excluded.ride_id, last_seen = excluded.last_seen",
+                (user_id, *session.to_tuple(), self._clock()),
+            )
+        self._writes += 1
+        # Eviction scans the last_seen index, so amortise it over many writes.
+        if self._writes % 100 == 0:
+            self.evict()
+
+    def delete(self, user_id):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE user_id = ?", (user_id,))
+
+    def evict(self):
+        conn = self._connect()
+        with conn:
+            conn.execute("DELETE FROM sessions WHERE last_seen < ?", (self._clock() - self.ttl,))
+            conn.execute(
+                "DELETE FROM sessions WHERE user_id IN ("
+                " SELECT user_id FROM sessions ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def create_session_store(backend=SESSION_BACKEND):
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend == "memory":
+        return InMemorySessionStore()
+    raise ValueError(f"Unknown SESSION_BACKEND: {backend!r}")
+
+
+session_store = create_session_store()
 
-user_sessions = {}
 
 def get_session(user_id):
-    if user_id not in user_sessions:
-        user_sessions[user_id] = {
-            "state": "idle",
-            "pickup": None,
-            "destination": None,
-            "ride_type": None
-        }
-        print(f"New session created for user: {user_id}")
-        print(f"Current active sessions: {user_sessions}")
-    return user_sessions[user_id]
+    session = session_store.get(user_id)
+    if session is None:
+        session = Session()
+        session_store.save(user_id, session)
+        logger.info("New session created", extra={"user_id": user_id})
+    return session
+
+
+def save_session(user_id, session):
+    session_store.save(user_id, session)
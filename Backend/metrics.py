@@ -0,0 +1,299 @@
+# metrics.py
+"""
+In-process metrics with a Prometheus text exposition.
+
+A histogram is a fixed list of bucket bounds plus a count per bucket, so
+recording is a bisect and a few additions under a lock, and percentiles are
+estimated from the buckets when stats are read.  Counters and histograms
+are keyed by label values; gauges (and counters a subsystem already keeps,
+registered with ``counter_callback``) are callbacks read at scrape time, so
+the subsystems that already keep ``stats()`` cost nothing between scrapes.
+
+``MetricsMiddleware`` times every request against its route template (not
+the raw path, which would make a series per ride id).
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Seconds; roughly x2.5 steps from 1 ms to 10 s.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float, error: bool = False):
+        i = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.sum += seconds
+            if error:
+                self.errors += 1
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        error = False
+        try:
+            yield
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, error)
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (0..1)."""
+        with self._lock:
+            counts, count = list(self.counts), self.count
+        if not count:
+            return 0.0
+        rank = q * count
+        seen = 0
+        for i, n in enumerate(counts):
+            seen += n
+            if seen >= rank and n:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def stats(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "mean_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "p50_ms": self.percentile(0.50) * 1000,
+            "p95_ms": self.percentile(0.95) * 1000,
+            "p99_ms": self.percentile(0.99) * 1000,
+        }
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labelvalues, amount=1):
+        with self._lock:
+            self._values[labelvalues] = self._values.get(labelvalues, 0) + amount
+
+    def value(self, *labelvalues):
+        return self._values.get(labelvalues, 0)
+
+    def render(self, out):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} counter")
+        for labelvalues, value in sorted(self._values.items()):
+            out.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}")
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *labelvalues) -> LatencyHistogram:
+        child = self._children.get(labelvalues)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(labelvalues, LatencyHistogram(self.buckets))
+        return child
+
+    def observe(self, seconds, *labelvalues, error=False):
+        self.labels(*labelvalues).observe(seconds, error)
+
+    def render(self, out):
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} histogram")
+        names = self.labelnames + ("le",)
+        for labelvalues, child in sorted(self._children.items()):
+            with child._lock:
+                counts, count, total = list(child.counts), child.count, child.sum
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                out.append(f"{self.name}_bucket{_labels(names, labelvalues + (le,))} {cumulative}")
+            labels = _labels(self.labelnames, labelvalues)
+            out.append(f"{self.name}_sum{labels} {_number(total)}")
+            out.append(f"{self.name}_count{labels} {count}")
+
+
+class Gauge:
+    """Read at scrape time from ``read()``: a number, or ``{label values: number}``."""
+
+    type = "gauge"
+
+    def __init__(self, name, help, read, labelnames=()):
+        self.name = name
+        self.help = help
+        self.read = read
+        self.labelnames = tuple(labelnames)
+
+    def render(self, out):
+        values = self.read()
+        if not isinstance(values, dict):
+            values = {(): values}
+        out.append(f"# HELP {self.name} {self.help}")
+        out.append(f"# TYPE {self.name} {self.type}")
+        for labelvalues, value in sorted(values.items()):
+            if not isinstance(labelvalues, tuple):
+                labelvalues = (labelvalues,)
+            out.append(f"{self.name}{_labels(self.labelnames, labelvalues)} {_number(value)}")
+
+
+class CallbackCounter(Gauge):
+    """A ``Gauge`` whose value only grows, exposed as a counter."""
+
+    type = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def _replace(self, metric):
+        with self._lock:
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help, labelnames=()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets))
+
+    def gauge(self, name, help, read, labelnames=()) -> Gauge:
+        """Register (or replace) a gauge read from ``read`` at scrape time."""
+        return self._replace(Gauge(name, help, read, labelnames))
+
+    def counter_callback(self, name, help, read, labelnames=()) -> CallbackCounter:
+        """Register (or replace) a counter kept elsewhere, read from ``read`` at scrape time."""
+        return self._replace(CallbackCounter(name, help, read, labelnames))
+
+    def render(self) -> str:
+        out = []
+        for metric in list(self._metrics.values()):
+            lines = []
+            try:
+                metric.render(lines)
+            except Exception:
+                # One broken gauge must not take the whole scrape down.
+                logger.warning("Skipping metric %s: reading it failed", metric.name, exc_info=True)
+                continue
+            out.extend(lines)
+        return "\n".join(out) + "\n"
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+registry = Registry()
+
+HTTP_REQUESTS = registry.counter(
+    "http_requests_total", "HTTP requests handled, by route template and status.", ("method", "route", "status"))
+HTTP_SECONDS = registry.histogram(
+    "http_request_duration_seconds", "Time to handle an HTTP request.", ("method", "route"))
+UPSTREAM_REQUESTS = registry.counter(
+    "upstream_requests_total", "Outbound calls by upstream and outcome.", ("upstream", "outcome"))
+UPSTREAM_SECONDS = registry.histogram(
+    "upstream_request_duration_seconds", "Outbound call latency by upstream.", ("upstream",))
+
+# Hosts we call, by the name used in the upstream label.
+UPSTREAM_HOSTS = {
+    "supabase.co": "supabase",
+    "overpass-api.de": "overpass",
+    "api.twilio.com": "whatsapp",
+    "maps.googleapis.com": "google_maps",
+}
+
+
+def upstream_name(url_or_host: str) -> str:
+    host = urlsplit(url_or_host).hostname if "//" in url_or_host else url_or_host.split(":")[0]
+    host = host or url_or_host
+    for suffix, name in UPSTREAM_HOSTS.items():
+        if host == suffix or host.endswith("." + suffix):
+            return name
+    return host
+
+
+def observe_upstream(upstream: str, seconds: float, outcome: str = "ok"):
+    UPSTREAM_REQUESTS.inc(upstream, outcome)
+    UPSTREAM_SECONDS.observe(seconds, upstream, error=outcome != "ok")
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware, so it adds no per-request task or body copying."""
+
+    def __init__(self, app, requests=HTTP_REQUESTS, seconds=HTTP_SECONDS):
+        self.app = app
+        self.requests = requests
+        self.seconds = seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            self.requests.inc(method, template, str(status))
+            self.seconds.observe(elapsed, method, template, error=status >= 500)
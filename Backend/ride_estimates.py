@@ -0,0 +1,235 @@
+# ride_estimates.py
+"""
+Fan-out of one estimate request to every ride provider.
+
+Each provider implements ``EstimateProvider.estimates`` and returns a list
+of estimate dicts (the fields of ``RideEstimate``).  ``EstimateAggregator``
+calls all providers concurrently, gives each one its own deadline and
+returns whatever arrived in time, with a status per provider.  Complete
+answers are cached per (source cell, destination cell, time bucket).
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional
+
+try:
+    from .driver_matching import parse_lat_lng
+    from .metrics import observe_upstream
+except ImportError:
+    from driver_matching import parse_lat_lng
+    from metrics import observe_upstream
+
+logger = logging.getLogger(__name__)
+
+RIDE_PROVIDER_DEADLINE_SECONDS = float(os.getenv("RIDE_PROVIDER_DEADLINE_SECONDS", "2"))
+RIDE_ESTIMATE_BUCKET_SECONDS = float(os.getenv("RIDE_ESTIMATE_BUCKET_SECONDS", "120"))
+RIDE_ESTIMATE_CACHE_SIZE = int(os.getenv("RIDE_ESTIMATE_CACHE_SIZE", "10000"))
+RIDE_STUB_LATENCY_MS = float(os.getenv("RIDE_STUB_LATENCY_MS", "0"))
+
+# ~550 m: pickups this close together share cached estimates.
+CELL_DEGREES = 0.005
+
+
+def location_cell(location: str):
+    """
+    Cache cell for a location: a grid cell for "lat,lng" strings, otherwise
+    the place name with case and spacing normalised.
+    """
+    point = parse_lat_lng(location)
+    if point is not None:
+        lat, lng = point
+        return (round(lat / CELL_DEGREES), round(lng / CELL_DEGREES))
+    return " ".join(location.lower().split())
+
+
+class EstimateProvider:
+    name = "provider"
+    deadline: Optional[float] = None  # falls back to the aggregator's deadline
+
+    async def estimates(self, source: str, destination: str) -> List[dict]:
+        raise NotImplementedError
+
+
+class StubProvider(EstimateProvider):
+    """
+    Local provider that prices rides from a fixed fare table.  Trip distance
+    comes from ``router(source, destination)`` (a ``RouteResult`` or None)
+    when given; otherwise distance and pickup ETA are derived from a hash of
+    the route so answers are stable.  ``latency`` (seconds) simulates the
+    provider's response time.
+    """
+
+    def __init__(self, name: str, categories, latency: float = 0.0, fail: bool = False,
+                 deadline: Optional[float] = None, router=None):
+        self.name = name
+        self.categories = categories  # [(category, base fare, fare per km), ...]
+        self.latency = latency
+        self.fail = fail
+        self.deadline = deadline
+        self.router = router
+        self.calls = 0
+
+    async def estimates(self, source, destination):
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError(f"{self.name} is unavailable")
+
+        route_hash = zlib.crc32(f"{location_cell(source)}|{location_cell(destination)}".encode())
+        distance_km = 2 + (route_hash % 130) / 10
+        if self.router is not None:
+            route = await asyncio.to_thread(self.router, source, destination)
+            if route is not None:
+                distance_km = route.distance_m / 1000
+        pickup_minutes = 2 + (route_hash >> 8) % 8
+        prefix = self.name.lower()
+        return [
+            {
+                "ride_id": f"{prefix}_{route_hash % 1000:03d}{i}",
+                "service_provider": self.name,
+                "category": category,
+                "price": f"₹{round(base + per_km * distance_km)}",
+                "eta": f"{pickup_minutes + i} min",
+                "distance": f"{distance_km:.1f} km",
+            }
+            for i, (category, base, per_km) in enumerate(self.categories)
+        ]
+
+
+def default_providers(latency: float = RIDE_STUB_LATENCY_MS / 1000, router=None):
+    return [
+        StubProvider("Uber", [("UberGo", 60, 21), ("Premier", 90, 28)], latency=latency, router=router),
+        StubProvider("Ola", [("Mini", 55, 21), ("Prime", 85, 27)], latency=latency, router=router),
+    ]
+
+
+class EstimateResult(NamedTuple):
+    estimates: List[dict]
+    statuses: dict  # provider name -> "ok" | "timeout" | "error" | "cached"
+
+    @property
+    def complete(self) -> bool:
+        return all(status in ("ok", "cached") for status in self.statuses.values())
+
+    @property
+    def missing(self) -> List[str]:
+        return [name for name, status in self.statuses.items() if status not in ("ok", "cached")]
+
+
+class EstimateAggregator:
+    def __init__(self, providers, deadline: float = RIDE_PROVIDER_DEADLINE_SECONDS,
+                 bucket_seconds: float = RIDE_ESTIMATE_BUCKET_SECONDS,
+                 cache_size: int = RIDE_ESTIMATE_CACHE_SIZE, clock=time.time):
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.bucket_seconds = bucket_seconds
+        self.cache_size = cache_size
+        self._clock = clock
+        # The key carries the time bucket, so stale answers are never hit and
+        # simply age out of the LRU.
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def cache_key(self, source: str, destination: str):
+        return (location_cell(source), location_cell(destination),
+                int(self._clock() // self.bucket_seconds))
+
+    async def fetch(self, source: str, destination: str) -> EstimateResult:
+        estimates = {}
+        statuses = {}
+        async for name, status, rows in self.stream(source, destination):
+            statuses[name] = status
+            estimates[name] = rows
+
+        # Report in provider order, not arrival order.
+        order = [p.name for p in self.providers]
+        return EstimateResult(
+            [row for name in order for row in estimates.get(name, [])],
+            {name: statuses[name] for name in order if name in statuses},
+        )
+
+    async def stream(self, source: str, destination: str):
+        """
+        Yield ``(provider name, status, estimates)`` for each provider as
+        soon as it answers, times out or fails.
+        """
+        key = self.cache_key(source, destination)
+        cached = self._cache_get(key)
+        if cached is not None:
+            for provider in self.providers:
+                yield provider.name, "cached", list(cached.get(provider.name, []))
+            return
+
+        tasks = {
+            asyncio.ensure_future(self._call(provider, source, destination)): provider
+            for provider in self.providers
+        }
+        by_provider = {}
+        complete = True
+        try:
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    provider = tasks[task]
+                    status, rows = task.result()
+                    by_provider[provider.name] = rows
+                    complete = complete and status == "ok"
+                    yield provider.name, status, rows
+        finally:
+            # The consumer stopped early (e.g. the client disconnected).
+            for task in tasks:
+                task.cancel()
+
+        # Partial answers are not cached so the next request asks again.
+        if complete:
+            self._cache_set(key, by_provider)
+
+    async def _call(self, provider, source, destination):
+        deadline = provider.deadline if provider.deadline is not None else self.deadline
+        started = time.perf_counter()
+        status, rows = "ok", []
+        try:
+            rows = await asyncio.wait_for(provider.estimates(source, destination), deadline)
+        except asyncio.TimeoutError:
+            logger.warning("%s gave no estimates within %.1fs", provider.name, deadline)
+            status = "timeout"
+        except Exception:
+            logger.exception("%s estimates failed", provider.name)
+            status = "error"
+        observe_upstream(f"ride_provider:{provider.name}", time.perf_counter() - started, status)
+        return status, rows
+
+    def _cache_get(self, key):
+        with self._lock:
+            rows = self._cache.get(key)
+            if rows is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return rows
+
+    def _cache_set(self, key, rows):
+        with self._lock:
+            self._cache[key] = rows
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "providers": [p.name for p in self.providers],
+            "cache_size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,258 @@
+# road_graph.py
+"""
+Compact, array-backed road graph built from an OSM (Overpass) extract.
+
+Ways are split at junctions, so the graph has one node per junction and one
+edge per road segment between junctions.  Adjacency is stored CSR-style in
+flat ``array`` columns (offsets/targets/lengths/times) and the segment
+shapes in a separate flat geometry array, which keeps a city-sized graph in
+a few megabytes and makes loading a single read per column.
+"""
+import json
+import math
+import struct
+from array import array
+
+try:
+    from .geo import METERS_PER_DEGREE, haversine, path_length
+except ImportError:
+    from geo import METERS_PER_DEGREE, haversine, path_length
+
+_MAGIC = b"ROADGRAPH1\n"
+
+# Free-flow city speeds (km/h) per OSM highway class.
+HIGHWAY_SPEEDS = {
+    "motorway": 80, "motorway_link": 50,
+    "trunk": 60, "trunk_link": 40,
+    "primary": 45, "primary_link": 35,
+    "secondary": 35, "secondary_link": 30,
+    "tertiary": 30, "tertiary_link": 25,
+    "unclassified": 25, "residential": 20,
+    "living_street": 10, "service": 15,
+}
+
+OVERPASS_ROADS_QUERY = """
+[out:json][timeout:180];
+way["highway"~"^({classes})$"]({south},{west},{north},{east});
+(._;>;);
+out body;
+"""
+
+# Graph column name -> array typecode, in file order.
+_COLUMNS = (
+    ("lat", "d"), ("lng", "d"),
+    ("offsets", "q"), ("targets", "q"),
+    ("lengths", "f"), ("times", "f"),
+    ("geom_offsets", "q"), ("geom_lat", "d"), ("geom_lng", "d"),
+)
+
+
+def overpass_roads_query(bbox) -> str:
+    south, west, north, east = bbox
+    return OVERPASS_ROADS_QUERY.format(
+        classes="|".join(HIGHWAY_SPEEDS), south=south, west=west, north=north, east=east
+    )
+
+
+def _oneway(tags):
+    value = tags.get("oneway", "")
+    if value in ("yes", "true", "1"):
+        return 1
+    if value == "-1":
+        return -1
+    if tags.get("junction") in ("roundabout", "circular") or tags.get("highway") == "motorway":
+        return 1
+    return 0
+
+
+def _speed_mps(tags):
+    maxspeed = tags.get("maxspeed", "")
+    if maxspeed.split(" ")[0].isdigit():
+        kmh = int(maxspeed.split(" ")[0])
+    else:
+        kmh = HIGHWAY_SPEEDS.get(tags.get("highway"), 20)
+    return kmh / 3.6
+
+
+class RoadGraph:
+    def __init__(self, columns, names=None, cell_degrees=0.005):
+        for name, typecode in _COLUMNS:
+            setattr(self, name, columns.get(name, array(typecode)))
+        self.names = names or {}  # normalised road name -> node id
+        self.cell_degrees = cell_degrees
+        self.max_speed = max(self.speeds(), default=HIGHWAY_SPEEDS["motorway"] / 3.6)
+        self._grid = None
+
+    def __len__(self):
+        return len(self.lat)
+
+    @property
+    def edge_count(self):
+        return len(self.targets)
+
+    def speeds(self):
+        return (length / time for length, time in zip(self.lengths, self.times) if time > 0)
+
+    def edges(self, node):
+        """``(edge id, target, length m, time s)`` for edges leaving ``node``."""
+        for e in range(self.offsets[node], self.offsets[node + 1]):
+            yield e, self.targets[e], self.lengths[e], self.times[e]
+
+    def edge_shape(self, edge):
+        start, stop = self.geom_offsets[edge], self.geom_offsets[edge + 1]
+        return list(zip(self.geom_lat[start:stop], self.geom_lng[start:stop]))
+
+    # ---- snapping ----
+
+    def nearest_node(self, lat, lng, max_distance=2000.0):
+        """``(node, meters)`` of the closest junction, or None beyond ``max_distance``."""
+        if self._grid is None:
+            self._build_grid()
+        size = self.cell_degrees
+        cx, cy = int(math.floor(lat / size)), int(math.floor(lng / size))
+        cell_m = size * METERS_PER_DEGREE * math.cos(math.radians(min(89.0, abs(lat) + 1)))
+        best = None
+        for ring in range(int(max_distance // cell_m) + 2):
+            nodes = [
+                node
+                for x in range(cx - ring, cx + ring + 1)
+                for y in range(cy - ring, cy + ring + 1)
+                if max(abs(x - cx), abs(y - cy)) == ring
+                for node in self._grid.get((x, y), ())
+            ]
+            if nodes:
+                meters = haversine(lat, lng, [self.lat[n] for n in nodes], [self.lng[n] for n in nodes])
+                i = int(meters.argmin())
+                if meters[i] <= max_distance and (best is None or meters[i] < best[1]):
+                    best = (nodes[i], float(meters[i]))
+            if best is not None and best[1] <= ring * cell_m:
+                break
+        return best
+
+    def _build_grid(self):
+        grid = {}
+        size = self.cell_degrees
+        for node, (lat, lng) in enumerate(zip(self.lat, self.lng)):
+            grid.setdefault((int(math.floor(lat / size)), int(math.floor(lng / size))), []).append(node)
+        self._grid = grid
+
+    # ---- building ----
+
+    @classmethod
+    def from_overpass(cls, data: dict):
+        """Build from Overpass JSON holding highway ways and their nodes."""
+        coords = {}
+        ways = []
+        for element in data.get("elements", []):
+            if element.get("type") == "node":
+                coords[element["id"]] = (element["lat"], element["lon"])
+            elif element.get("type") == "way" and element.get("tags", {}).get("highway") in HIGHWAY_SPEEDS:
+                ways.append(element)
+
+        # Junctions: way endpoints and nodes shared by more than one way.
+        uses = {}
+        for way in ways:
+            refs = [ref for ref in way.get("nodes", []) if ref in coords]
+            way["_refs"] = refs
+            for ref in refs:
+                uses[ref] = uses.get(ref, 0) + 1
+        junctions = set()
+        for way in ways:
+            refs = way["_refs"]
+            if len(refs) >= 2:
+                junctions.update((refs[0], refs[-1]))
+                junctions.update(ref for ref in refs[1:-1] if uses[ref] > 1)
+
+        node_ids = {}
+        lat, lng = array("d"), array("d")
+
+        def node_of(ref):
+            node = node_ids.get(ref)
+            if node is None:
+                node = node_ids[ref] = len(lat)
+                lat.append(coords[ref][0])
+                lng.append(coords[ref][1])
+            return node
+
+        raw_edges = []  # (source, target, meters, seconds, shape)
+        names = {}
+        for way in ways:
+            refs = way["_refs"]
+            if len(refs) < 2:
+                continue
+            tags = way.get("tags", {})
+            speed = _speed_mps(tags)
+            oneway = _oneway(tags)
+            start = 0
+            for i in range(1, len(refs)):
+                if refs[i] not in junctions and i != len(refs) - 1:
+                    continue
+                segment = refs[start:i + 1]
+                shape = [coords[ref] for ref in segment]
+                meters = path_length(shape)
+                a, b = node_of(segment[0]), node_of(segment[-1])
+                if oneway >= 0:
+                    raw_edges.append((a, b, meters, meters / speed, shape))
+                if oneway <= 0:
+                    raw_edges.append((b, a, meters, meters / speed, shape[::-1]))
+                start = i
+
+            name = tags.get("name")
+            if name:
+                names.setdefault(" ".join(name.lower().split()), node_of(refs[0]))
+
+        return cls(_pack(len(lat), lat, lng, raw_edges), names)
+
+    # ---- storage ----
+
+    def save(self, path):
+        header = json.dumps({"names": self.names, "cell_degrees": self.cell_degrees}).encode()
+        with open(path, "wb") as fh:
+            fh.write(_MAGIC)
+            fh.write(struct.pack("<Q", len(header)))
+            fh.write(header)
+            for name, typecode in _COLUMNS:
+                column = getattr(self, name)
+                fh.write(struct.pack("<Q", len(column)))
+                column.tofile(fh)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as fh:
+            if fh.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a road graph file")
+            (size,) = struct.unpack("<Q", fh.read(8))
+            header = json.loads(fh.read(size))
+            columns = {}
+            for name, typecode in _COLUMNS:
+                (count,) = struct.unpack("<Q", fh.read(8))
+                column = array(typecode)
+                column.fromfile(fh, count)
+                columns[name] = column
+        return cls(columns, header.get("names"), header.get("cell_degrees", 0.005))
+
+
+def _pack(node_count, lat, lng, raw_edges):
+    raw_edges.sort(key=lambda edge: edge[0])
+    offsets = array("q", [0] * (node_count + 1))
+    for source, *_ in raw_edges:
+        offsets[source + 1] += 1
+    for i in range(node_count):
+        offsets[i + 1] += offsets[i]
+
+    targets, lengths, times = array("q"), array("f"), array("f")
+    geom_offsets, geom_lat, geom_lng = array("q", [0]), array("d"), array("d")
+    for _, target, meters, seconds, shape in raw_edges:
+        targets.append(target)
+        lengths.append(meters)
+        times.append(seconds)
+        for point_lat, point_lng in shape:
+            geom_lat.append(point_lat)
+            geom_lng.append(point_lng)
+        geom_offsets.append(len(geom_lat))
+
+    return {
+        "lat": lat, "lng": lng, "offsets": offsets, "targets": targets,
+        "lengths": lengths, "times": times,
+        "geom_offsets": geom_offsets, "geom_lat": geom_lat, "geom_lng": geom_lng,
+    }
@@ -0,0 +1,302 @@
+# route_geometry.py
+"""
+Route geometry for tracking: Google encoded polylines, Douglas-Peucker
+simplification per map zoom, and snapping a driver onto the route so only
+the part still ahead has to be sent.
+
+Points are ``(lat, lng)`` tuples.  Distances use a local equirectangular
+projection around the route, which is accurate to well under a metre at
+city scale.
+"""
+import math
+import os
+import threading
+from collections import OrderedDict
+
+try:
+    from .geo import METERS_PER_DEGREE as _METERS_PER_DEGREE
+except ImportError:
+    from geo import METERS_PER_DEGREE as _METERS_PER_DEGREE
+# Web-mercator ground resolution at zoom 0 on the equator, in metres per pixel.
+_METERS_PER_PIXEL_Z0 = 156543.03392
+
+ROUTE_CACHE_SIZE = int(os.getenv("ROUTE_CACHE_SIZE", "10000"))
+DEFAULT_ZOOM = int(os.getenv("ROUTE_DEFAULT_ZOOM", "15"))
+# A snap further than this from the route near the last position triggers a full search.
+OFF_ROUTE_METERS = 50
+
+
+# ---- polyline encoding ----
+
+def _encode_value(value, out):
+    value = ~(value << 1) if value < 0 else value << 1
+    while value >= 0x20:
+        out.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    out.append(chr(value + 63))
+
+
+def _encode_deltas(points, factor, prev_lat=0, prev_lng=0):
+    out = []
+    for lat, lng in points:
+        ilat = round(lat * factor)
+        ilng = round(lng * factor)
+        _encode_value(ilat - prev_lat, out)
+        _encode_value(ilng - prev_lng, out)
+        prev_lat, prev_lng = ilat, ilng
+    return "".join(out)
+
+
+def encode_polyline(points, precision=5) -> str:
+    return _encode_deltas(points, 10 ** precision)
+
+
+def decode_polyline(encoded: str, precision=5):
+    factor = 10 ** precision
+    points = []
+    append = points.append
+    index = 0
+    length = len(encoded)
+    lat = lng = 0
+    while index < length:
+        for coordinate in (0, 1):
+            shift = result = 0
+            while True:
+                byte = ord(encoded[index]) - 63
+                index += 1
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            delta = ~(result >> 1) if result & 1 else result >> 1
+            if coordinate == 0:
+                lat += delta
+            else:
+                lng += delta
+        append((lat / factor, lng / factor))
+    return points
+
+
+# ---- simplification ----
+
+def tolerance_for_zoom(zoom, lat=0.0, pixels=1.0) -> float:
+    """Metres covered by ``pixels`` screen pixels at ``zoom`` and latitude."""
+    return pixels * _METERS_PER_PIXEL_Z0 * math.cos(math.radians(lat)) / (2 ** zoom)
+
+
+def _lng_scale(points):
+    """Metres per degree of longitude around the middle of ``points``."""
+    lat0 = sum(p[0] for p in points) / len(points) if points else 0.0
+    return _METERS_PER_DEGREE * math.cos(math.radians(lat0))
+
+
+def _project(points, kx=None):
+    kx = _lng_scale(points) if kx is None else kx
+    return [p[1] * kx for p in points], [p[0] * _METERS_PER_DEGREE for p in points]
+
+
+def _segment_distance(px, py, ax, ay, bx, by):
+    dx, dy = bx - ax, by - ay
+    length2 = dx * dx + dy * dy
+    if length2 == 0:
+        return math.hypot(px - ax, py - ay), 0.0
+    t = max(0.0, min(1.0, ((px - ax) * dx + (py - ay) * dy) / length2))
+    return math.hypot(px - ax - t * dx, py - ay - t * dy), t
+
+
+def simplify_indices(xs, ys, tolerance):
+    """Indices kept by Douglas-Peucker, iterative so long routes can't hit the recursion limit."""
+    n = len(xs)
+    if n < 3:
+        return list(range(n))
+    keep = [False] * n
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        ax, ay, bx, by = xs[first], ys[first], xs[last], ys[last]
+        worst, worst_i = tolerance, -1
+        for i in range(first + 1, last):
+            d, _ = _segment_distance(xs[i], ys[i], ax, ay, bx, by)
+            if d > worst:
+                worst, worst_i = d, i
+        if worst_i >= 0:
+            keep[worst_i] = True
+            stack.append((first, worst_i))
+            stack.append((worst_i, last))
+    return [i for i in range(n) if keep[i]]
+
+
+def simplify(points, tolerance_m):
+    xs, ys = _project(points)
+    return [points[i] for i in simplify_indices(xs, ys, tolerance_m)]
+
+
+# ---- routes ----
+
+class RouteGeometry:
+    """
+    One ride's route, with per-zoom simplified versions and encoded
+    suffixes cached so each tracking poll encodes only a couple of points.
+    """
+
+    def __init__(self, points, precision=5, duration_s=None):
+        if len(points) < 2:
+            raise ValueError("a route needs at least two points")
+        self.points = [(float(lat), float(lng)) for lat, lng in points]
+        self.precision = precision
+        self.duration_s = duration_s  # whole-route travel time, when known
+        self._factor = 10 ** precision
+        self._kx = _lng_scale(self.points)
+        self._xs, self._ys = _project(self.points, self._kx)
+
+        cumulative = [0.0]
+        for i in range(1, len(self.points)):
+            cumulative.append(cumulative[-1] + math.hypot(self._xs[i] - self._xs[i - 1], self._ys[i] - self._ys[i - 1]))
+        self.cumulative = cumulative
+        self.length = cumulative[-1]
+
+        self._kept = {}  # zoom -> kept vertex indices
+        # zoom -> (position in kept, encoded deltas after that vertex).  Only the
+        # latest is kept: the driver moves forward, so older ones go stale.
+        self._tails = {}
+        self._lock = threading.Lock()
+        self.last_segment = 0
+
+    @classmethod
+    def from_polyline(cls, encoded, precision=5):
+        return cls(decode_polyline(encoded, precision), precision)
+
+    def kept_indices(self, zoom):
+        kept = self._kept.get(zoom)
+        if kept is None:
+            mid_lat = self.points[len(self.points) // 2][0]
+            kept = simplify_indices(self._xs, self._ys, tolerance_for_zoom(zoom, mid_lat))
+            self._kept[zoom] = kept
+        return kept
+
+    def encoded(self, zoom=None):
+        if zoom is None:
+            return encode_polyline(self.points, self.precision)
+        return encode_polyline([self.points[i] for i in self.kept_indices(zoom)], self.precision)
+
+    def locate(self, lat, lng, hint=None, window=50):
+        """
+        Snap a position onto the route.  Returns ``(segment, along_m,
+        (lat, lng), off_route_m)``.  With ``hint`` (the last known segment)
+        only the next ``window`` segments are searched first, since drivers
+        move forward; the whole route is searched if that fit is poor.
+        """
+        x = lng * self._kx
+        y = lat * _METERS_PER_DEGREE
+        last = len(self.points) - 1
+
+        def best_in(start, stop):
+            best = (math.inf, 0, 0.0)
+            for i in range(start, stop):
+                d, t = _segment_distance(x, y, self._xs[i], self._ys[i], self._xs[i + 1], self._ys[i + 1])
+                if d < best[0]:
+                    best = (d, i, t)
+            return best
+
+        if hint is not None:
+            start = max(0, min(hint, last - 1))
+            best = best_in(start, min(last, start + window))
+            if best[0] > OFF_ROUTE_METERS:
+                best = min(best, best_in(0, last))
+        else:
+            best = best_in(0, last)
+
+        off, segment, t = best
+        a, b = self.points[segment], self.points[segment + 1]
+        snapped = (a[0] + t * (b[0] - a[0]), a[1] + t * (b[1] - a[1]))
+        along = self.cumulative[segment] + t * (self.cumulative[segment + 1] - self.cumulative[segment])
+        return segment, along, snapped, off
+
+    def remaining(self, lat, lng, zoom=DEFAULT_ZOOM):
+        """
+        The route still ahead of a driver at ``(lat, lng)``: encoded polyline
+        starting at the snapped position, plus progress figures.
+        """
+        segment, along, snapped, off = self.locate(lat, lng, hint=self.last_segment)
+        self.last_segment = segment
+
+        kept = self.kept_indices(zoom)
+        # First kept vertex strictly ahead of the driver.
+        position = _first_after(kept, segment)
+        next_point = self.points[kept[position]]
+
+        factor = self._factor
+        slat, slng = round(snapped[0] * factor), round(snapped[1] * factor)
+        head = []
+        _encode_value(slat, head)
+        _encode_value(slng, head)
+        _encode_value(round(next_point[0] * factor) - slat, head)
+        _encode_value(round(next_point[1] * factor) - slng, head)
+
+        remaining = self.length - along
+        return {
+            "polyline": "".join(head) + self._tail(zoom, kept, position),
+            "remaining_m": round(remaining),
+            "remaining_s": round(self.duration_s * remaining / self.length) if self.duration_s and self.length else None,
+            "progress": round(along / self.length, 4) if self.length else 1.0,
+            "off_route_m": round(off),
+            "snapped": {"lat": snapped[0], "lng": snapped[1]},
+        }
+
+    def _tail(self, zoom, kept, position):
+        cached = self._tails.get(zoom)
+        if cached is not None and cached[0] == position:
+            return cached[1]
+        first = self.points[kept[position]]
+        tail = _encode_deltas(
+            (self.points[i] for i in kept[position + 1:]),
+            self._factor,
+            round(first[0] * self._factor),
+            round(first[1] * self._factor),
+        )
+        with self._lock:
+            self._tails[zoom] = (position, tail)
+        return tail
+
+
+def _first_after(kept, segment):
+    lo, hi = 0, len(kept) - 1
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if kept[mid] > segment:
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
+class RouteStore:
+    """LRU of ``RouteGeometry`` per ride id."""
+
+    def __init__(self, maxsize=ROUTE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._routes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._routes)
+
+    def set(self, ride_id, route: RouteGeometry):
+        with self._lock:
+            self._routes[ride_id] = route
+            self._routes.move_to_end(ride_id)
+            while len(self._routes) > self.maxsize:
+                self._routes.popitem(last=False)
+        return route
+
+    def get(self, ride_id):
+        with self._lock:
+            route = self._routes.get(ride_id)
+            if route is not None:
+                self._routes.move_to_end(ride_id)
+            return route
+
+    def pop(self, ride_id):
+        with self._lock:
+            return self._routes.pop(ride_id, None)
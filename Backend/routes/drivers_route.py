@@ -0,0 +1,69 @@
+# Backend/routes/drivers_route.py
+from typing import Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel
+
+try:
+    from ..controllers.drivers_controller import (
+        update_driver_location, nearby_drivers, match_driver, release_driver,
+    )
+    from ..driver_matching import driver_index
+except ImportError:
+    from controllers.drivers_controller import (
+        update_driver_location, nearby_drivers, match_driver, release_driver,
+    )
+    from driver_matching import driver_index
+
+router = APIRouter()
+
+class DriverLocation(BaseModel):
+    lat: float
+    lng: float
+    vehicle_type: Optional[str] = None
+    name: Optional[str] = None
+    status: Optional[str] = None  # "available" | "offline"
+    profile: Optional[dict] = None
+
+class MatchRequest(BaseModel):
+    lat: float
+    lng: float
+    vehicle_type: Optional[str] = None
+    ride_id: Optional[str] = None
+
+@router.post("/drivers/{driver_id}/location")
+async def driver_location(driver_id: str, ping: DriverLocation):
+    try:
+        return update_driver_location(driver_id, ping.lat, ping.lng, ping.vehicle_type,
+                                      ping.name, ping.status, ping.profile)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/drivers/nearby")
+async def drivers_nearby(lat: float, lng: float, vehicle_type: Optional[str] = None,
+                         k: int = Query(5, ge=1, le=50)):
+    try:
+        return nearby_drivers(lat, lng, vehicle_type, k)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/drivers/match")
+async def drivers_match(request: MatchRequest):
+    try:
+        driver = match_driver(request.lat, request.lng, request.vehicle_type, request.ride_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if driver is None:
+        raise HTTPException(status_code=404, detail="No driver available nearby")
+    return driver
+
+@router.post("/drivers/release/{ride_id}")
+async def drivers_release(ride_id: str):
+    driver = release_driver(ride_id)
+    if driver is None:
+        raise HTTPException(status_code=404, detail="No driver reserved for this ride")
+    return driver
+
+@router.get("/drivers/stats")
+async def drivers_stats():
+    return driver_index.stats()
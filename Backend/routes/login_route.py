@@ -1,12 +1,29 @@
-from fastapi import APIRouter,Response
+from fastapi import APIRouter, Depends, Response
 
 try:
     from ..controllers.login_controller import login, LoginRequest
+    from ..controllers.auth_dependency import require_user
+    from ..supabase_async import AsyncSupabase, get_supabase_async
 except ImportError:
     from controllers.login_controller import login, LoginRequest
+    from controllers.auth_dependency import require_user
+    from supabase_async import AsyncSupabase, get_supabase_async
 
 router = APIRouter()
 
 @router.post("/login")
-async def login_route(request: LoginRequest,response: Response):
-    return login(request, response)
+async def login_route(request: LoginRequest, response: Response,
+                      supabase: AsyncSupabase = Depends(get_supabase_async)):
+    return await login(request, response, supabase)
+
+
+@router.get("/me")
+async def me_route(claims: dict = Depends(require_user)):
+    metadata = claims.get("user_metadata") or {}
+    return {
+        "user_id": claims["sub"],
+        "email": claims.get("email"),
+        "username": metadata.get("username"),
+        "role": claims.get("role"),
+        "expires_at": claims.get("exp"),
+    }
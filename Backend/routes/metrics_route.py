@@ -0,0 +1,17 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+try:
+    from ..controllers.metrics_controller import metrics_text
+except ImportError:
+    from controllers.metrics_controller import metrics_text
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_route():
+    return PlainTextResponse(metrics_text(), media_type=CONTENT_TYPE)
@@ -1,12 +1,13 @@
 # Backend/routes/rides_route.py
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import List
 
 try:
-    from ..controllers.rides_controller import get_mock_estimates, get_mock_driver_details, RideEstimate, DriverDetails
+    from ..controllers.rides_controller import get_estimates, stream_estimate_events, format_ndjson, format_sse, get_mock_driver_details, RideEstimate, DriverDetails
 except ImportError:
-    from controllers.rides_controller import get_mock_estimates, get_mock_driver_details, RideEstimate, DriverDetails
+    from controllers.rides_controller import get_estimates, stream_estimate_events, format_ndjson, format_sse, get_mock_driver_details, RideEstimate, DriverDetails
 
 router = APIRouter()
 
@@ -15,8 +16,31 @@ class EstimateRequest(BaseModel):
     destination: str
 
 @router.post("/rides/estimates", response_model=List[RideEstimate])
-async def rides_estimates(request: EstimateRequest):
-    return get_mock_estimates(request.source, request.destination)
+async def rides_estimates(request: EstimateRequest, response: Response):
+    estimates, missing = await get_estimates(request.source, request.destination)
+    if missing:
+        # Partial answer: tell the client which providers were left out
+        response.headers["X-Missing-Providers"] = ",".join(missing)
+    return estimates
+
+@router.post("/rides/estimates/stream")
+async def rides_estimates_stream(request: EstimateRequest, http_request: Request):
+    """
+    Same estimates, streamed as each provider answers: NDJSON by default,
+    Server-Sent Events when the client accepts text/event-stream.
+    """
+    if "text/event-stream" in http_request.headers.get("accept", ""):
+        media_type, fmt = "text/event-stream", format_sse
+    else:
+        media_type, fmt = "application/x-ndjson", format_ndjson
+
+    async def body():
+        async for event in stream_estimate_events(request.source, request.destination):
+            yield fmt(event)
+
+    # no-transform/X-Accel-Buffering keep proxies from holding events back
+    return StreamingResponse(body(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
 
 @router.get("/rides/driver/{ride_id}", response_model=DriverDetails)
 async def ride_driver_details(ride_id: str):
@@ -1,12 +1,15 @@
-from fastapi import APIRouter, Response
+from fastapi import APIRouter, Depends, Response
 
 try:
     from ..controllers.signup_controller import signup, SignupRequest
+    from ..supabase_async import AsyncSupabase, get_supabase_async
 except ImportError:
     from controllers.signup_controller import signup, SignupRequest
+    from supabase_async import AsyncSupabase, get_supabase_async
 
 router = APIRouter()
 
 @router.post("/signup")
-async def signup_route(request: SignupRequest, response: Response):
-    return signup(request, response)
+async def signup_route(request: SignupRequest, response: Response,
+                       supabase: AsyncSupabase = Depends(get_supabase_async)):
+    return await signup(request, response, supabase)
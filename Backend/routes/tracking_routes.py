@@ -1,14 +1,112 @@
 # Backend/routes/tracking_routes.py
-from fastapi import APIRouter
+import asyncio
+import json
+from typing import List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
 
 try:
-    from ..controllers.tracking_controller import get_gmap_tracking_data
+    from ..controllers.tracking_controller import (
+        get_gmap_tracking_data, record_ping, ride_history, subscribe, end_ride, set_route, tracking_hub,
+    )
 except ImportError:
-    from controllers.tracking_controller import get_gmap_tracking_data
+    from controllers.tracking_controller import (
+        get_gmap_tracking_data, record_ping, ride_history, subscribe, end_ride, set_route, tracking_hub,
+    )
 
 router = APIRouter()
 
+class LocationPingRequest(BaseModel):
+    driver_id: str
+    lat: float
+    lng: float
+    heading: Optional[float] = None
+    speed: Optional[float] = None
+    status: str = "on_trip"
+
+class RouteRequest(BaseModel):
+    polyline: Optional[str] = None  # Google encoded polyline
+    points: Optional[List[Tuple[float, float]]] = None  # or [[lat, lng], ...]
+    origin: Optional[Tuple[float, float]] = None  # or route origin -> destination on the road graph
+    destination: Optional[Tuple[float, float]] = None
+
 @router.get("/tracking/map-data")
-async def tracking_map_data():
-    data = get_gmap_tracking_data()
+async def tracking_map_data(ride_id: Optional[str] = None, zoom: Optional[int] = Query(None, ge=0, le=22)):
+    data = get_gmap_tracking_data(ride_id, zoom)
     return data
+
+@router.put("/tracking/{ride_id}/route")
+async def tracking_route(ride_id: str, route: RouteRequest):
+    try:
+        return set_route(ride_id, route.polyline, route.points, route.origin, route.destination)
+    except (ValueError, IndexError):
+        raise HTTPException(status_code=400,
+                            detail="Route needs a valid polyline, at least two points, or origin and destination")
+
+@router.get("/tracking/stats")
+async def tracking_stats():
+    return tracking_hub.stats()
+
+@router.post("/tracking/{ride_id}/ping")
+async def tracking_ping(ride_id: str, ping: LocationPingRequest):
+    recorded = record_ping(ride_id, ping.driver_id, ping.lat, ping.lng, ping.heading, ping.speed, ping.status)
+    return {"ok": True, "ts": recorded.ts}
+
+@router.get("/tracking/{ride_id}/history")
+async def tracking_history(ride_id: str, limit: Optional[int] = Query(None, ge=1)):
+    return ride_history(ride_id, limit)
+
+@router.delete("/tracking/{ride_id}")
+async def tracking_end(ride_id: str):
+    if not end_ride(ride_id):
+        raise HTTPException(status_code=404, detail="Ride is not being tracked")
+    return {"ok": True}
+
+@router.get("/tracking/{ride_id}/stream")
+async def tracking_stream(ride_id: str, min_interval: Optional[float] = Query(None, ge=0)):
+    subscription = subscribe(ride_id, min_interval)
+    if subscription is None:
+        raise HTTPException(status_code=404, detail="Ride is not being tracked")
+
+    async def events():
+        try:
+            async for update in subscription:
+                yield f"event: {update['type']}\ndata: {json.dumps(update)}\n\n"
+        finally:
+            await subscription.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"})
+
+@router.websocket("/tracking/{ride_id}/ws")
+async def tracking_ws(websocket: WebSocket, ride_id: str, min_interval: Optional[float] = None):
+    subscription = subscribe(ride_id, min_interval)
+    if subscription is None:
+        # Closing before accept() rejects the handshake.
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Ride is not being tracked")
+        return
+    await websocket.accept()
+
+    async def watch_disconnect():
+        # Riders never send anything, so receive() only returns once they
+        # leave; end the subscription then instead of at the next update.
+        try:
+            while (await websocket.receive())["type"] != "websocket.disconnect":
+                pass
+        finally:
+            subscription.close()
+
+    watcher = asyncio.create_task(watch_disconnect())
+    try:
+        async for update in subscription:
+            await websocket.send_json(update)
+        if not watcher.done():
+            watcher.cancel()
+            await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        watcher.cancel()
+        await subscription.aclose()
@@ -1,6 +1,11 @@
-from fastapi import APIRouter,Form,Request
-import controllers.whatsapp_controller as whatsapp_controller
+from fastapi import APIRouter, Form
 from pydantic import BaseModel
+
+try:
+    from ..controllers import whatsapp_controller
+except ImportError:
+    import controllers.whatsapp_controller as whatsapp_controller
+
 router = APIRouter()
 
 class WhatsAppPayload(BaseModel):
@@ -8,5 +13,13 @@ class WhatsAppPayload(BaseModel):
     message: str
 
 @router.post("/whatsapp")
-def whatsapp_webhook(request: Request, Body: str = Form(...)):
-    return whatsapp_controller.whatsapp_webhook(request, Body)
\ No newline at end of file
+async def whatsapp_webhook(
+    Body: str = Form(...),
+    From: str = Form(""),
+    MessageSid: str = Form(""),
+):
+    return await whatsapp_controller.whatsapp_webhook(Body, From, MessageSid)
+
+@router.get("/whatsapp/stats")
+async def whatsapp_stats():
+    return whatsapp_controller.webhook_stats()
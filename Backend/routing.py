@@ -0,0 +1,227 @@
+# routing.py
+"""
+Offline distance/ETA between two points.
+
+``RoutingEngine`` snaps both ends to the road graph, runs A* on travel time
+and caches answers per (origin node, destination node), so repeated trips
+between popular spots cost a dict lookup.  Without a road graph (or when an
+end can't be snapped) it falls back to a straight-line estimate with a
+detour factor, and says so in ``RouteResult.source``.
+"""
+import heapq
+import logging
+import math
+import os
+import threading
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple
+
+try:
+    from .driver_matching import parse_lat_lng
+    from .geo import METERS_PER_DEGREE, haversine
+    from .road_graph import RoadGraph
+except ImportError:
+    from driver_matching import parse_lat_lng
+    from geo import METERS_PER_DEGREE, haversine
+    from road_graph import RoadGraph
+
+logger = logging.getLogger(__name__)
+
+ROAD_GRAPH_PATH = os.getenv(
+    "ROAD_GRAPH_PATH", os.path.join(os.path.dirname(__file__), "data", "pune_roads.graph")
+)
+ROUTING_CACHE_SIZE = int(os.getenv("ROUTING_CACHE_SIZE", "50000"))
+# Straight-line fallback: roads are ~30% longer than the crow flies in Pune.
+DETOUR_FACTOR = float(os.getenv("ROUTE_DETOUR_FACTOR", "1.3"))
+FALLBACK_SPEED_KMH = float(os.getenv("ROUTE_FALLBACK_SPEED_KMH", "22"))
+# Ends further than this from any junction are not snapped.
+SNAP_METERS = float(os.getenv("ROUTE_SNAP_METERS", "1500"))
+
+
+_MISSING = object()
+
+
+class RouteResult(NamedTuple):
+    distance_m: float
+    duration_s: float
+    source: str  # "graph" | "estimate"
+    points: Optional[List[Tuple[float, float]]] = None
+
+    @property
+    def distance_text(self) -> str:
+        return f"{self.distance_m / 1000:.1f} km"
+
+    @property
+    def duration_text(self) -> str:
+        return f"{max(1, round(self.duration_s / 60))} mins"
+
+
+class RoutingEngine:
+    def __init__(self, graph: Optional[RoadGraph] = None, path: Optional[str] = ROAD_GRAPH_PATH,
+                 cache_size: int = ROUTING_CACHE_SIZE):
+        self._graph = graph
+        self._path = path
+        self._loaded = graph is not None
+        self.cache_size = cache_size
+        self._cache = OrderedDict()  # (source node, target node) -> (meters, seconds, edges) or None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def graph(self) -> Optional[RoadGraph]:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if self._path and os.path.exists(self._path):
+                        self._graph = RoadGraph.load(self._path)
+                        logger.info("Loaded road graph: %d nodes, %d edges", len(self._graph), self._graph.edge_count)
+                    else:
+                        logger.warning("No road graph at %s; using straight-line estimates", self._path)
+                    self._loaded = True
+        return self._graph
+
+    # ---- lookups ----
+
+    def geocode(self, text: str) -> Optional[Tuple[float, float]]:
+        """Coordinates for a "lat,lng" string or a road name in the graph."""
+        point = parse_lat_lng(text)
+        if point is not None:
+            return point
+        graph = self.graph
+        if graph is not None and text:
+            node = graph.names.get(" ".join(text.lower().split()))
+            if node is not None:
+                return graph.lat[node], graph.lng[node]
+        return None
+
+    def route_between(self, origin: str, destination: str, geometry=False) -> Optional[RouteResult]:
+        """Route between two place strings, or None if either can't be located."""
+        start = self.geocode(origin)
+        end = self.geocode(destination)
+        if start is None or end is None:
+            return None
+        return self.route(*start, *end, geometry=geometry)
+
+    def route(self, lat1, lng1, lat2, lng2, geometry=False) -> RouteResult:
+        graph = self.graph
+        snapped = None
+        if graph is not None:
+            start = graph.nearest_node(lat1, lng1, SNAP_METERS)
+            end = graph.nearest_node(lat2, lng2, SNAP_METERS)
+            if start is not None and end is not None:
+                snapped = start, end
+
+        if snapped is None:
+            return self.estimate(lat1, lng1, lat2, lng2, geometry)
+
+        (source, source_gap), (target, target_gap) = snapped
+        found = self._shortest(source, target)
+        if found is None:
+            return self.estimate(lat1, lng1, lat2, lng2, geometry)
+
+        meters, seconds, edges = found
+        # Getting on and off the road network at the fallback speed.
+        gap = source_gap + target_gap
+        meters += gap
+        seconds += gap / (FALLBACK_SPEED_KMH / 3.6)
+
+        points = None
+        if geometry:
+            points = [(lat1, lng1)]
+            for edge in edges:
+                shape = graph.edge_shape(edge)
+                points.extend(shape[1:] if points[-1] == shape[0] else shape)
+            points.append((lat2, lng2))
+        return RouteResult(meters, seconds, "graph", points)
+
+    def estimate(self, lat1, lng1, lat2, lng2, geometry=False) -> RouteResult:
+        meters = haversine(lat1, lng1, lat2, lng2) * DETOUR_FACTOR
+        points = [(lat1, lng1), (lat2, lng2)] if geometry else None
+        return RouteResult(meters, meters / (FALLBACK_SPEED_KMH / 3.6), "estimate", points)
+
+    def stats(self) -> dict:
+        graph = self.graph
+        return {
+            "graph_nodes": len(graph) if graph is not None else 0,
+            "graph_edges": graph.edge_count if graph is not None else 0,
+            "cache_size": len(self._cache),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    # ---- search ----
+
+    def _shortest(self, source, target):
+        key = (source, target)
+        with self._lock:
+            cached = self._cache.get(key, _MISSING)
+            if cached is not _MISSING:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached
+            self.misses += 1
+
+        found = astar(self.graph, source, target)
+
+        # Unreachable pairs are cached too (as None), so they don't rerun a
+        # search that explores the whole reachable component every time.
+        with self._lock:
+            self._cache[key] = found
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return found
+
+
+def astar(graph: RoadGraph, source: int, target: int):
+    """
+    Fastest path by travel time.  The heuristic is the straight-line
+    distance at the graph's top speed, which never overestimates.
+    Returns ``(meters, seconds, [edge ids])`` or None if unreachable.
+    """
+    if source == target:
+        return 0.0, 0.0, []
+
+    lat, lng = graph.lat, graph.lng
+    offsets, targets, lengths, times = graph.offsets, graph.targets, graph.lengths, graph.times
+    t_lat, t_lng = lat[target], lng[target]
+    # Equirectangular metres, shrunk 1% so it stays below the haversine distance.
+    ky = METERS_PER_DEGREE * 0.99
+    kx = ky * math.cos(math.radians(t_lat))
+    inv_speed = 1.0 / graph.max_speed
+
+    def h(node):
+        return math.hypot((lng[node] - t_lng) * kx, (lat[node] - t_lat) * ky) * inv_speed
+
+    best = {source: 0.0}
+    via = {}  # node -> (previous node, edge id)
+    heap = [(h(source), 0.0, source)]
+    closed = set()
+    while heap:
+        _, cost, node = heapq.heappop(heap)
+        if node in closed:
+            continue
+        if node == target:
+            break
+        closed.add(node)
+        for e in range(offsets[node], offsets[node + 1]):
+            nxt = targets[e]
+            new_cost = cost + times[e]
+            if new_cost < best.get(nxt, math.inf):
+                best[nxt] = new_cost
+                via[nxt] = (node, e)
+                heapq.heappush(heap, (new_cost + h(nxt), new_cost, nxt))
+    else:
+        return None
+
+    edges = []
+    node = target
+    while node != source:
+        node, e = via[node]
+        edges.append(e)
+    edges.reverse()
+    return sum(lengths[e] for e in edges), best[target], edges
+
+
+routing_engine = RoutingEngine()
@@ -0,0 +1,90 @@
+"""
+Drive thousands of simulated moving drivers through the tracking hub.
+
+Each driver is its own task that random-walks around Pune and pings every
+``--interval`` seconds; a share of the rides also has a rider subscribed.
+Reports ping throughput, updates delivered and how stale they were.
+
+    python -m Backend.simulate_tracking --drivers 10000 --seconds 10
+"""
+import argparse
+import asyncio
+import math
+import random
+import resource
+import time
+
+try:
+    from .tracking import TrackingHub
+except ImportError:
+    from tracking import TrackingHub
+
+PUNE = (18.5204, 73.8567)
+
+
+async def drive(hub, ride_id, interval, stop_at, rng):
+    lat = PUNE[0] + rng.uniform(-0.1, 0.1)
+    lng = PUNE[1] + rng.uniform(-0.1, 0.1)
+    heading = rng.uniform(0, 360)
+    await asyncio.sleep(rng.uniform(0, interval))
+    while time.time() < stop_at:
+        speed = rng.uniform(3, 15)  # m/s
+        heading = (heading + rng.gauss(0, 20)) % 360
+        step = speed * interval / 111_320
+        lat += step * math.cos(math.radians(heading))
+        lng += step * math.sin(math.radians(heading)) / math.cos(math.radians(lat))
+        hub.record(ride_id, f"driver-{ride_id}", lat, lng, heading, speed)
+        await asyncio.sleep(interval)
+    hub.end_ride(ride_id)
+
+
+async def watch(hub, ride_id, lags):
+    async for update in hub.subscribe(ride_id):
+        lags.append(time.time() - update["ts"])
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--drivers", type=int, default=10_000)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between pings per driver")
+    parser.add_argument("--watched", type=float, default=0.5, help="Share of rides with a subscriber")
+    parser.add_argument("--throttle", type=float, default=2.0, help="Min seconds between updates per subscriber")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    hub = TrackingHub(min_interval=args.throttle)
+    stop_at = time.time() + args.seconds
+    lags = []
+
+    watchers = [
+        asyncio.create_task(watch(hub, f"ride-{i}", lags))
+        for i in range(args.drivers) if rng.random() < args.watched
+    ]
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        drive(hub, f"ride-{i}", args.interval, stop_at, random.Random(rng.random()))
+        for i in range(args.drivers)
+    ))
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*watchers)
+
+    lags.sort()
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"drivers      {args.drivers} pinging every {args.interval:.1f}s for {elapsed:.1f}s")
+    print(f"pings        {hub.pings} ({hub.pings / elapsed:.0f}/s)")
+    print(f"subscribers  {len(watchers)} throttled to one update per {args.throttle:.1f}s")
+    print(f"updates      {len(lags)} ({len(lags) / max(1, hub.pings):.0%} of pings reached a rider)")
+    print(f"update age   p50 {percentile(lags, 50) * 1000:.0f} ms  p99 {percentile(lags, 99) * 1000:.0f} ms")
+    print(f"peak RSS     {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+# supabase_async.py
+"""
+Async access to Supabase auth for the request path.
+
+One pooled ``httpx.AsyncClient`` is shared by every call, each operation
+has a hard deadline, and latencies are kept per operation.  The GoTrue
+client is stateless here (no persisted session, no auto-refresh timer), so
+concurrent requests for different users can share it safely.
+
+Nothing is created at import: ``get_supabase_async()`` builds the client
+from the environment on first use, and routes take it as a FastAPI
+dependency so tests can swap it with ``app.dependency_overrides``.
+"""
+import asyncio
+import os
+import time
+from typing import Optional
+
+import httpx
+
+try:
+    from .metrics import LatencyHistogram, observe_upstream
+except ImportError:
+    from metrics import LatencyHistogram, observe_upstream
+
+SUPABASE_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_TIMEOUT_SECONDS", "10"))
+SUPABASE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("SUPABASE_CONNECT_TIMEOUT_SECONDS", "3"))
+SUPABASE_MAX_CONNECTIONS = int(os.getenv("SUPABASE_MAX_CONNECTIONS", "20"))
+
+
+class AsyncSupabase:
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None,
+                 timeout: float = SUPABASE_TIMEOUT_SECONDS, max_connections: int = SUPABASE_MAX_CONNECTIONS):
+        self.url = (url or "").rstrip("/")
+        self.key = key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.latency = {}  # operation -> LatencyHistogram
+        self._http = None
+        self._auth = None
+        self._loop = None
+
+    @classmethod
+    def from_env(cls):
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        return cls(os.getenv("SUPABASE_URL"), os.getenv("SUPABASE_KEY") or os.getenv("SUPABASE_ANON_KEY"))
+
+    @property
+    def auth(self):
+        """GoTrue client bound to the running event loop's connection pool."""
+        if not self.url or not self.key:
+            raise RuntimeError("Missing SUPABASE_URL or SUPABASE_KEY/SUPABASE_ANON_KEY in environment")
+        loop = asyncio.get_running_loop()
+        if self._auth is None or self._loop is not loop:
+            self._retire_pool()
+            # Imported here: the auth SDK and its models are slow to import
+            # and only needed once somebody logs in.
+            from supabase_auth import AsyncGoTrueClient
+
+            # Pooled connections belong to one loop; a new loop (e.g. tests) gets a new pool.
+            # The per-operation deadline in _call bounds everything but connecting.
+            self._http = httpx.AsyncClient(
+                timeout=httpx.Timeout(None, connect=SUPABASE_CONNECT_TIMEOUT_SECONDS),
+                limits=httpx.Limits(max_connections=self.max_connections,
+                                    max_keepalive_connections=self.max_connections),
+            )
+            self._auth = AsyncGoTrueClient(
+                url=f"{self.url}/auth/v1",
+                headers={"apiKey": self.key, "Authorization": f"Bearer {self.key}"},
+                auto_refresh_token=False,
+                persist_session=False,
+                http_client=self._http,
+            )
+            self._loop = loop
+        return self._auth
+
+    async def sign_in_with_password(self, email: str, password: str):
+        return await self._call("sign_in_with_password", self.auth.sign_in_with_password(
+            {"email": email, "password": password}
+        ))
+
+    async def sign_up(self, email: str, password: str, data: Optional[dict] = None):
+        return await self._call("sign_up", self.auth.sign_up(
+            {"email": email, "password": password, "options": {"data": data or {}}}
+        ))
+
+    async def refresh_session(self, refresh_token: str):
+        return await self._call("refresh_session", self.auth.refresh_session(refresh_token))
+
+    def stats(self) -> dict:
+        return {operation: histogram.stats() for operation, histogram in self.latency.items()}
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+        self._http = self._auth = self._loop = None
+
+    def _retire_pool(self):
+        """Close the pool built on a previous loop, on that loop."""
+        http, loop = self._http, self._loop
+        self._http = self._auth = self._loop = None
+        if http is None:
+            return
+        if loop.is_closed():
+            # Nothing can run on it any more; its sockets go with the client.
+            return
+        asyncio.run_coroutine_threadsafe(http.aclose(), loop)
+
+    async def _call(self, operation, awaitable):
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency.setdefault(operation, LatencyHistogram())
+        outcome = "ok"
+        started = time.perf_counter()
+        try:
+            return await asyncio.wait_for(awaitable, self.timeout)
+        except asyncio.TimeoutError:
+            outcome = "timeout"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            histogram.observe(elapsed, error=outcome != "ok")
+            observe_upstream("supabase", elapsed, outcome)
+
+
+_default_client = None
+
+
+def get_supabase_async() -> AsyncSupabase:
+    """Process-wide client, configured from the environment on first use."""
+    global _default_client
+    if _default_client is None:
+        _default_client = AsyncSupabase.from_env()
+    return _default_client
+
+
+async def close_supabase_async():
+    global _default_client
+    if _default_client is not None:
+        await _default_client.aclose()
+        _default_client = None
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+
+from Backend.auth_tokens import TokenError, TokenExpired, TokenVerifier
+from Backend.controllers import auth_dependency
+from Backend.controllers.auth_cookie_utils import ACCESS_COOKIE_NAME, REFRESH_COOKIE_NAME
+
+SECRET = "test-secret-with-enough-bytes-for-hs256"
+
+
+class Clock:
+    # PyJWT checks "exp" against the real time, so start from it.
+    def __init__(self):
+        self.now = time.time()
+
+    def __call__(self):
+        return self.now
+
+
+def hs256(sub, exp, **claims):
+    return jwt.encode({"sub": sub, "exp": exp, "aud": "authenticated", **claims}, SECRET, algorithm="HS256")
+
+
+def verifier(clock, **kwargs):
+    return TokenVerifier(secret=SECRET, jwks_url=None, issuer=None, leeway=0, clock=clock, **kwargs)
+
+
+def test_caches_claims_until_expiry_and_evicts():
+    clock = Clock()
+    v = verifier(clock, cache_size=2)
+    token = hs256("alice", clock.now + 60)
+    assert v.verify(token)["sub"] == "alice"
+    assert v.verify(token)["sub"] == "alice"
+    assert v.hits == 1 and v.misses == 1
+
+    for name in ("bob", "carol"):
+        v.verify(hs256(name, clock.now + 60))
+    assert len(v) == 2 and v.cached(token) is None
+
+    bob = hs256("bob", clock.now + 60)
+    assert v.cached(bob)["sub"] == "bob"
+    clock.now += 61
+    assert v.cached(bob) is None and len(v) == 1
+    with pytest.raises(TokenExpired):
+        v.verify(hs256("dave", time.time() - 1))
+    with pytest.raises(TokenError):
+        v.verify(token[:-2] + "xx")
+    with pytest.raises(TokenError):
+        v.verify(jwt.encode({"sub": "x", "exp": clock.now + 60, "aud": "authenticated"}, "other-secret-of-32-bytes-minimum!!"))
+
+
+def test_jwks_keys_are_fetched_once_and_refetched_for_rotation():
+    clock = Clock()
+    keys = {kid: rsa.generate_private_key(public_exponent=65537, key_size=2048) for kid in ("k1", "k2")}
+    published = ["k1"]
+    fetches = []
+
+    def fetch(url):
+        fetches.append(url)
+        return {"keys": [{**json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(keys[kid].public_key())),
+                          "kid": kid, "alg": "RS256"} for kid in published]}
+
+    v = TokenVerifier(secret=None, jwks_url="https://auth/jwks", issuer=None, fetch_jwks=fetch, clock=clock)
+
+    def rs256(kid, sub):
+        return jwt.encode({"sub": sub, "exp": clock.now + 600, "aud": "authenticated"}, keys[kid],
+                          algorithm="RS256", headers={"kid": kid})
+
+    assert v.verify(rs256("k1", "a"))["sub"] == "a"
+    assert v.verify(rs256("k1", "b"))["sub"] == "b"
+    assert len(fetches) == 1
+
+    published.append("k2")
+    with pytest.raises(TokenError):  # unknown kid right after a fetch is not refetched yet
+        v.verify(rs256("k2", "c"))
+    clock.now += 31
+    assert v.verify(rs256("k2", "d"))["sub"] == "d"
+    assert len(fetches) == 2
+
+
+def test_dependency_refreshes_expired_cookie_once(monkeypatch):
+    clock = Clock()
+    v = verifier(clock)
+    calls = []
+
+    class Session:
+        def __init__(self):
+            self.access_token = hs256("alice", clock.now + 3600)
+            self.refresh_token = "refresh-2"
+            self.expires_in = 3600
+
+    async def refresh(token):
+        calls.append(token)
+        return Session()
+
+    monkeypatch.setattr(auth_dependency, "token_verifier", v)
+    monkeypatch.setattr(auth_dependency, "session_refresher", auth_dependency.SessionRefresher(refresh))
+
+    app = FastAPI()
+
+    @app.get("/me")
+    async def me(claims: dict = Depends(auth_dependency.require_user)):
+        return {"sub": claims["sub"]}
+
+    client = TestClient(app)
+    assert client.get("/me").status_code == 401
+
+    client.cookies.set(ACCESS_COOKIE_NAME, hs256("alice", clock.now + 60))
+    assert client.get("/me").json() == {"sub": "alice"}
+
+    client.cookies.set(ACCESS_COOKIE_NAME, hs256("alice", clock.now - 10))
+    client.cookies.set(REFRESH_COOKIE_NAME, "refresh-1")
+    response = client.get("/me")
+    assert response.json() == {"sub": "alice"} and calls == ["refresh-1"]
+    assert ACCESS_COOKIE_NAME in response.cookies
+
+    client.cookies.clear()
+    client.cookies.set(ACCESS_COOKIE_NAME, "garbage")
+    assert client.get("/me").status_code == 401
+
+
+def test_concurrent_refreshes_share_one_exchange():
+    calls = []
+
+    async def refresh(token):
+        calls.append(token)
+        await asyncio.sleep(0.05)
+        return "session"
+
+    refresher = auth_dependency.SessionRefresher(refresh)
+
+    async def main():
+        return await asyncio.gather(*(refresher.refresh("r") for _ in range(5)))
+
+    assert asyncio.run(main()) == ["session"] * 5
+    assert calls == ["r"]
@@ -0,0 +1,94 @@
+import random
+import threading
+
+import pytest
+
+from Backend.driver_matching import VEHICLE_TYPES, DriverIndex, parse_lat_lng
+from Backend.geo import haversine
+
+
+def build(n=2000, seed=5):
+    rng = random.Random(seed)
+    index = DriverIndex(cell_degrees=0.01)
+    for i in range(n):
+        index.update(f"d{i}", 18.52 + rng.uniform(-0.2, 0.2), 73.85 + rng.uniform(-0.2, 0.2),
+                     vehicle_type=VEHICLE_TYPES[i % 4])
+    return index, rng
+
+
+def test_nearest_matches_brute_force_per_vehicle_type():
+    index, rng = build()
+    for _ in range(50):
+        lat, lng = 18.52 + rng.uniform(-0.25, 0.25), 73.85 + rng.uniform(-0.25, 0.25)
+        vehicle_type = rng.choice(VEHICLE_TYPES)
+        expected = sorted(
+            (haversine(lat, lng, d.lat, d.lng), d.driver_id)
+            for d in index._drivers.values() if d.vehicle_type == vehicle_type
+        )
+        expected = [driver_id for meters, driver_id in expected if meters <= 10_000][:5]
+        found = index.nearest(lat, lng, vehicle_type, k=5, max_distance=10_000)
+        assert [d.driver_id for d, _ in found] == expected
+        assert all(d.vehicle_type == vehicle_type for d, _ in found)
+
+
+def test_pings_move_drivers_and_reserved_drivers_are_hidden():
+    index = DriverIndex()
+    index.update("a", 18.50, 73.80, vehicle_type="Auto")
+    index.update("b", 18.60, 73.90, vehicle_type="Auto")
+    assert index.nearest(18.60, 73.90, "Auto", k=1)[0][0].driver_id == "b"
+
+    index.move("a", 18.6001, 73.9001)
+    driver, _ = index.reserve(18.6001, 73.9001, "ride-1", "Auto")
+    assert driver.driver_id == "a"
+    assert index.reserve(18.6001, 73.9001, "ride-1", "Auto")[0] is driver
+    assert [d.driver_id for d, _ in index.nearest(18.6001, 73.9001, "Auto")] == ["b"]
+    assert index.for_ride("ride-1") is driver
+
+    index.release("ride-1")
+    assert index.nearest(18.6001, 73.9001, "Auto", k=1)[0][0].driver_id == "a"
+    assert index.stats()["available"]["Auto"] == 2
+    assert parse_lat_lng("18.6, 73.9") == (18.6, 73.9) and parse_lat_lng("Akurdi") is None
+
+
+def test_concurrent_reservations_never_share_a_driver():
+    index, _ = build(n=400)
+    results = []
+    lock = threading.Lock()
+
+    def book(worker):
+        for i in range(50):
+            match = index.reserve(18.52, 73.85, f"ride-{worker}-{i}", "Bike", max_distance=50_000)
+            if match:
+                with lock:
+                    results.append(match[0].driver_id)
+
+    threads = [threading.Thread(target=book, args=(w,)) for w in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 100  # every Bike driver, each exactly once
+    assert len(set(results)) == len(results)
+
+
+def test_unreleased_reservations_expire_and_statuses_are_checked():
+    now = [1000.0]
+    index = DriverIndex(reservation_ttl=60, clock=lambda: now[0])
+    index.update("a", 18.60, 73.90, vehicle_type="Auto")
+    index.update("b", 18.61, 73.91, vehicle_type="Auto")
+    index.reserve(18.60, 73.90, "ride-1", "Auto")
+    now[0] += 30
+    index.reserve(18.60, 73.90, "ride-2", "Auto")
+    assert index.reserve(18.60, 73.90, "ride-3", "Auto") is None
+
+    now[0] += 31  # ride-1 is past its TTL, ride-2 is not
+    assert index.reserve(18.60, 73.90, "ride-3", "Auto")[0].driver_id == "a"
+    assert index.for_ride("ride-1") is None and index.for_ride("ride-2").driver_id == "b"
+    assert index.stats()["expired_reservations"] == 1
+
+    with pytest.raises(ValueError):
+        index.update("c", 18.60, 73.90, vehicle_type="Auto", status="busy")
+    with pytest.raises(ValueError):
+        index.update("a", 18.60, 73.90, status="reserved")
+    assert index.get("c") is None
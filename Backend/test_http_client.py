@@ -0,0 +1,32 @@
+import threading
+import time
+
+import httpx
+
+from Backend.http_client import OutboundClient
+
+
+def test_backoff_releases_the_host_slot_and_observes_attempts():
+    statuses, observed = [503], []
+
+    def upstream(request):
+        return httpx.Response(statuses.pop(0) if statuses else 200)
+
+    client = OutboundClient(per_host_limit=1, retries=1, backoff=0.5,
+                            observe=lambda host, seconds, failed: observed.append((host, failed)))
+    client._client = httpx.Client(transport=httpx.MockTransport(upstream))
+
+    retrying = threading.Thread(target=client.get, args=("http://upstream/",))
+    retrying.start()
+    while not observed:
+        time.sleep(0.005)
+
+    # The first call is sleeping through its backoff, not holding the slot.
+    started = time.perf_counter()
+    assert client.get("http://upstream/").status_code == 200
+    assert time.perf_counter() - started < 0.4
+    retrying.join()
+    client.close()
+
+    assert sorted(observed) == [("upstream", False), ("upstream", False), ("upstream", True)]
+    assert client.stats["upstream"].retries == 1
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from Backend import agent
+from Backend.idempotency import IdempotencyCache
+from Backend.memory import InMemorySessionStore, Session
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_replays_until_ttl_and_skips_none():
+    clock = FakeClock()
+    cache = IdempotencyCache(ttl=60, clock=clock)
+    calls = []
+
+    def book():
+        calls.append(1)
+        return {"ride_id": f"r{len(calls)}"}
+
+    assert cache.run("k", book) == {"ride_id": "r1"}
+    assert cache.run("k", book) == {"ride_id": "r1"}
+    assert cache.replays == 1 and len(calls) == 1
+
+    clock.now += 61
+    assert cache.run("k", book) == {"ride_id": "r2"}
+
+    assert cache.run("none", lambda: None) is None
+    assert cache.get("none") is None and cache.run("none", book) == {"ride_id": "r3"}
+
+
+def test_bounded_oldest_first():
+    cache = IdempotencyCache(maxsize=2, ttl=60)
+    for key in "abc":
+        cache.run(key, lambda: key)
+    assert len(cache) == 2 and cache.get("a") is None and cache.get("c") == "c"
+
+
+def test_concurrent_duplicates_run_once():
+    cache = IdempotencyCache()
+    calls = []
+
+    def slow_book():
+        calls.append(1)
+        time.sleep(0.05)
+        return "booked"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.run("k", slow_book))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == ["booked"] * 8 and len(calls) == 1
+
+
+def test_agent_double_tap_books_once(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(agent, "get_session", lambda user: store.get(user) or Session())
+    monkeypatch.setattr(agent, "save_session", store.save)
+    monkeypatch.setattr(agent, "find_route", lambda pickup, destination: "Route")
+    monkeypatch.setattr(agent, "bookings", IdempotencyCache())
+    booked = []
+
+    def book_ride(user_id, ride_type, pickup=None):
+        booked.append(ride_type)
+        return {"ride_id": f"ride-{len(booked)}", "driver": "Ravi", "vehicle": ride_type, "eta": "4 mins"}
+
+    monkeypatch.setattr(agent, "book_ride", book_ride)
+
+    agent.agent_reply("u1", "take me to Akurdi metro")
+    agent.agent_reply("u1", "18.52,73.85")
+    first = agent.agent_reply("u1", "1")
+    assert agent.agent_reply("u1", "1") == first
+    assert agent.agent_reply("u1", "2") == first  # still the Auto booked first
+    assert booked == ["Auto"]
+
+    # A new journey books again.
+    agent.agent_reply("u1", "take me to Akurdi metro")
+    agent.agent_reply("u1", "18.52,73.85")
+    agent.agent_reply("u1", "2")
+    assert booked == ["Auto", "Bike"]
+
+
+def test_agent_frees_the_driver_on_a_new_journey_or_cancel(monkeypatch):
+    store = InMemorySessionStore()
+    monkeypatch.setattr(agent, "get_session", lambda user: store.get(user) or Session())
+    monkeypatch.setattr(agent, "save_session", store.save)
+    monkeypatch.setattr(agent, "find_route", lambda pickup, destination: "Route")
+    monkeypatch.setattr(agent, "bookings", IdempotencyCache())
+    monkeypatch.setattr(agent, "book_ride", lambda user_id, ride_type, pickup=None: {
+        "ride_id": f"ride-{ride_type}", "driver": "Ravi", "vehicle": ride_type, "eta": "4 mins"})
+    released = []
+    monkeypatch.setattr(agent, "release_ride", lambda ride_id: ride_id and released.append(ride_id))
+
+    agent.agent_reply("u1", "take me to Akurdi metro")
+    agent.agent_reply("u1", "18.52,73.85")
+    agent.agent_reply("u1", "1")
+    agent.agent_reply("u1", "take me to Akurdi metro")
+    assert released == ["ride-Auto"]
+
+    agent.agent_reply("u1", "18.52,73.85")
+    agent.agent_reply("u1", "2")
+    assert agent.agent_reply("u1", "cancel").startswith("Cancelled")
+    assert released == ["ride-Auto", "ride-Bike"]
+    assert store.get("u1").state == "idle" and store.get("u1").ride_id is None
@@ -0,0 +1,36 @@
+from Backend.intents import Intent, IntentMatcher, classify
+from Backend.controllers.chatbot_controller import get_chat_response
+
+
+def names(text):
+    return [match.name for match in classify(text)]
+
+
+def test_keywords_match_on_word_boundaries_only():
+    assert names("which one is this") == []
+    assert names("Hi there") == ["greeting"]
+    assert names("take me to Akurdi Metro station") == ["metro"]
+
+
+def test_ranking_and_keyword_slots():
+    matches = classify("hi, what is the metro fare")
+    assert [m.name for m in matches] == ["fare", "metro", "greeting"]
+
+    choice = classify("bike   taxi please")[0]
+    assert choice.name == "ride_choice" and choice.slots == {"ride": "Bike"}
+    assert classify("1️⃣")[0].slots == {"ride": "Auto"}
+
+
+def test_patterns_extract_slots():
+    matcher = IntentMatcher([
+        Intent("pnr", patterns=(r"pnr\s*(?P<pnr>\d{6})",)),
+        Intent("eta", keywords={"eta": {}}, patterns=(r"in (?P<minutes>\d+) min",)),
+    ])
+    matches = matcher.classify("PNR 123456, eta? arriving in 5 min")
+    assert {m.name: m.slots for m in matches} == {"pnr": {"pnr": "123456"}, "eta": {"minutes": "5"}}
+    assert matcher.top("eta", among={"pnr"}) is None
+
+
+def test_chat_response_uses_ranked_intent():
+    assert get_chat_response("which line is this").startswith("You said")
+    assert get_chat_response("hello, metro fare?") == "Metro fares are affordable, starting from ₹10."
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREDENTIALS = ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_ANON_KEY")
+
+
+def test_app_imports_without_credentials_or_the_supabase_sdk():
+    env = {k: v for k, v in os.environ.items() if k not in CREDENTIALS}
+    code = ("import sys, Backend.main; "
+            "print(sorted(m for m in ('supabase', 'supabase_auth', 'postgrest') if m in sys.modules))")
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "[]"
+
+
+def test_settings_in_a_dotenv_file_reach_the_token_verifier(tmp_path):
+    (tmp_path / ".env").write_text("SUPABASE_URL=https://demo.supabase.co\nSUPABASE_JWT_SECRET=sekret\n")
+    env = {k: v for k, v in os.environ.items()
+           if k not in CREDENTIALS + ("SUPABASE_JWT_SECRET", "SUPABASE_JWKS_URL", "AUTH_JWT_ISSUER")}
+    env["PYTHONPATH"] = ROOT
+    code = ("import time, jwt, Backend.main; from Backend.auth_tokens import token_verifier as v; "
+            "token = jwt.encode({'sub': 'u1', 'aud': 'authenticated', 'iss': 'https://demo.supabase.co/auth/v1', "
+            "'exp': int(time.time()) + 60}, 'sekret', algorithm='HS256'); "
+            "print(v.secret, v.jwks_url, v.verify(token)['sub'])")
+    out = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.split() == ["sekret", "https://demo.supabase.co/auth/v1/.well-known/jwks.json", "u1"]
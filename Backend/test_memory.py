@@ -0,0 +1,66 @@
+import sqlite3
+
+from Backend.memory import InMemorySessionStore, Session, SQLiteSessionStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_store_evicts_lru_and_expired():
+    clock = FakeClock()
+    store = InMemorySessionStore(maxsize=2, ttl=60, clock=clock)
+
+    store.save("a", Session())
+    store.save("b", Session())
+    store.get("a")
+    store.save("c", Session())
+    assert store.get("b") is None
+    assert store.get("a") is not None
+
+    clock.now += 61
+    assert store.get("a") is None
+    assert len(store) == 1
+    store.save("d", Session())
+    assert len(store) == 1
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    worker_1 = SQLiteSessionStore(path)
+    worker_2 = SQLiteSessionStore(path)
+
+    session = Session(state="ride_booked", destination="Akurdi Metro", journey_id="j1", ride_id="r1")
+    worker_1.save("whatsapp:+911", session)
+
+    assert worker_2.get("whatsapp:+911") == session
+    assert worker_2.get("whatsapp:+912") is None
+
+
+def test_sqlite_store_ttl_and_max_size(tmp_path):
+    clock = FakeClock()
+    store = SQLiteSessionStore(str(tmp_path / "sessions.db"), maxsize=2, ttl=60, clock=clock)
+
+    for user in ("a", "b", "c"):
+        clock.now += 1
+        store.save(user, Session())
+    store.evict()
+    assert store.get("a") is None
+    assert len(store) == 2
+
+    clock.now += 61
+    assert store.get("b") is None
+
+
+def test_sqlite_store_adds_columns_to_older_files(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE sessions (user_id TEXT PRIMARY KEY, state TEXT, pickup TEXT,"
+                     " destination TEXT, ride_type TEXT, last_seen REAL NOT NULL)")
+    store = SQLiteSessionStore(path)
+    store.save("a", Session(state="ride_booked", ride_id="r1"))
+    assert store.get("a").ride_id == "r1"
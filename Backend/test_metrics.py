@@ -0,0 +1,108 @@
+import io
+import json
+import logging
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+from Backend.http_client import get_client
+from Backend.log_setup import JsonFormatter
+from Backend.metrics import UPSTREAM_REQUESTS, LatencyHistogram, MetricsMiddleware, Registry, upstream_name
+
+
+def test_histogram_percentiles_and_exposition(caplog):
+    histogram = LatencyHistogram(buckets=(0.01, 0.1, 1.0))
+    for seconds in [0.005] * 90 + [0.05] * 9 + [5.0]:
+        histogram.observe(seconds)
+    assert histogram.percentile(0.5) == 0.01
+    assert histogram.percentile(0.95) == 0.1
+    assert histogram.percentile(1.0) == float("inf")
+
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.01, 0.1))
+    latency.observe(0.05, "read")
+    registry.counter("ops_total", "Ops.", ("op",)).inc('we"ird')
+    registry.gauge("depth", "Depth.", lambda: 3)
+    registry.gauge("broken", "Raises.", lambda: 1 / 0)
+    registry.counter_callback("replays_total", "Replays.", lambda: 7)
+    text = registry.render()
+    assert 'op_seconds_bucket{op="read",le="0.01"} 0' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 1' in text
+    assert 'op_seconds_count{op="read"} 1' in text
+    assert 'ops_total{op="we\\"ird"} 1' in text
+    assert "depth 3" in text and "broken" not in text
+    assert "# TYPE replays_total counter\nreplays_total 7" in text
+    # The skipped gauge is logged with its name and the error.
+    record, = [r for r in caplog.records if r.name == "Backend.metrics"]
+    assert record.getMessage() == "Skipping metric broken: reading it failed"
+    assert record.exc_info[0] is ZeroDivisionError
+
+
+def test_middleware_labels_requests_by_route_template():
+    registry = Registry()
+    requests = registry.counter("http_requests_total", "Requests.", ("method", "route", "status"))
+    seconds = registry.histogram("http_request_duration_seconds", "Latency.", ("method", "route"))
+
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware, requests=requests, seconds=seconds)
+
+    @app.get("/rides/{ride_id}")
+    async def ride(ride_id: str):
+        if ride_id == "missing":
+            raise HTTPException(404)
+        return {"ride_id": ride_id}
+
+    client = TestClient(app)
+    for ride_id in ("a", "b", "missing"):
+        client.get(f"/rides/{ride_id}")
+    client.get("/nowhere")
+
+    assert requests.value("GET", "/rides/{ride_id}", "200") == 2
+    assert requests.value("GET", "/rides/{ride_id}", "404") == 1
+    assert requests.value("GET", "unmatched", "404") == 1
+    assert seconds.labels("GET", "/rides/{ride_id}").count == 3
+
+
+def test_upstream_names_and_json_logs():
+    assert upstream_name("abcd.supabase.co") == "supabase"
+    assert upstream_name("https://overpass-api.de/api/interpreter") == "overpass"
+    assert upstream_name("localhost:8001") == "localhost"
+
+    stream = io.StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    logger = logging.getLogger("test_metrics.json")
+    logger.addHandler(handler)
+    logger.propagate = False
+    logger.warning("Reply for %s", "alice", extra={"user_id": "alice"})
+    line = json.loads(stream.getvalue())
+    assert line["msg"] == "Reply for alice" and line["user_id"] == "alice" and line["level"] == "WARNING"
+
+
+def test_outbound_calls_are_counted_by_upstream():
+    client = get_client()
+    before = UPSTREAM_REQUESTS.value("overpass", "ok"), UPSTREAM_REQUESTS.value("overpass", "error")
+    previous, client._client = client._client, httpx.Client(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200 if request.url.path == "/ok" else 500)))
+    try:
+        client.get("https://overpass-api.de/ok")
+        client.get("https://overpass-api.de/ok")
+        client.get("https://overpass-api.de/broken")
+    finally:
+        client._client.close()
+        client._client = previous
+
+    assert UPSTREAM_REQUESTS.value("overpass", "ok") == before[0] + 2
+    assert UPSTREAM_REQUESTS.value("overpass", "error") == before[1] + 1
+
+
+def test_counts_kept_by_subsystems_are_exposed_as_counters():
+    from Backend.controllers.metrics_controller import metrics_text
+
+    text = metrics_text()
+    for name in ("whatsapp_messages_total", "cache_hits_total", "cache_misses_total",
+                 "booking_replays_total", "log_records_dropped_total"):
+        assert f"# TYPE {name} counter" in text
+    assert 'cache_hits_total{cache="routing"}' in text
+    assert "# TYPE whatsapp_queue_depth gauge" in text
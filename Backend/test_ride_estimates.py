@@ -0,0 +1,77 @@
+import asyncio
+
+from Backend.ride_estimates import EstimateAggregator, StubProvider, location_cell
+
+FARES = [("Mini", 50, 20)]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_slow_and_failing_providers_give_partial_results():
+    fast = StubProvider("Uber", FARES, latency=0.01)
+    slow = StubProvider("Ola", FARES, latency=1.0)
+    broken = StubProvider("Rapido", FARES, fail=True)
+    aggregator = EstimateAggregator([fast, slow, broken], deadline=0.1)
+
+    result = asyncio.run(aggregator.fetch("Akurdi", "Hinjewadi"))
+
+    assert [row["service_provider"] for row in result.estimates] == ["Uber"]
+    assert result.statuses == {"Uber": "ok", "Ola": "timeout", "Rapido": "error"}
+    assert result.missing == ["Ola", "Rapido"]
+    # Partial answers are not cached
+    asyncio.run(aggregator.fetch("Akurdi", "Hinjewadi"))
+    assert fast.calls == 2
+
+
+def test_complete_results_are_cached_per_cell_and_time_bucket():
+    clock = FakeClock()
+    uber = StubProvider("Uber", FARES)
+    aggregator = EstimateAggregator([uber], bucket_seconds=60, clock=clock)
+
+    first = asyncio.run(aggregator.fetch("18.6298,73.7997", "Hinjewadi  Phase 1"))
+    second = asyncio.run(aggregator.fetch("18.6301,73.7999", "hinjewadi phase 1"))
+    assert second.statuses == {"Uber": "cached"}
+    assert second.estimates == first.estimates
+    assert uber.calls == 1
+
+    clock.now = 61
+    asyncio.run(aggregator.fetch("18.6298,73.7997", "Hinjewadi Phase 1"))
+    assert uber.calls == 2
+    assert location_cell("18.6298, 73.7997") == location_cell("18.63,73.80")
+
+
+def test_stream_route_emits_fastest_provider_first_then_summary(monkeypatch):
+    import json
+
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from Backend.controllers import rides_controller
+    from Backend.routes import rides_route
+
+    aggregator = EstimateAggregator([
+        StubProvider("Ola", [("Mini", 200, 20)], latency=0.2),
+        StubProvider("Uber", [("UberGo", 50, 20)], latency=0.01),
+    ])
+    monkeypatch.setattr(rides_controller, "estimate_aggregator", aggregator)
+    app = FastAPI()
+    app.include_router(rides_route.router, prefix="/api")
+    payload = {"source": "Akurdi", "destination": "PCMC"}
+
+    response = TestClient(app).post("/api/rides/estimates/stream", json=payload)
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert [e["type"] for e in events] == ["estimate", "provider", "estimate", "provider", "summary"]
+    assert events[0]["estimate"]["service_provider"] == "Uber"
+    assert events[-1]["cheapest"]["service_provider"] == "Uber"
+    assert events[-1]["count"] == 2 and events[-1]["missing"] == []
+
+    sse = TestClient(app).post("/api/rides/estimates/stream", json=payload,
+                               headers={"Accept": "text/event-stream"})
+    assert sse.text.startswith("event: estimate\ndata: ")
@@ -0,0 +1,45 @@
+import math
+
+from Backend.route_geometry import (
+    RouteGeometry, decode_polyline, encode_polyline, simplify, tolerance_for_zoom,
+)
+
+
+def wiggly_route(n=400):
+    # ~4 km heading north-east with small zig-zags
+    return [(18.50 + i * 0.0001, 73.80 + i * 0.00005 + 0.00002 * math.sin(i)) for i in range(n)]
+
+
+def test_polyline_round_trip_and_reference_value():
+    reference = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(reference) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+    assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == reference
+
+    points = [(round(lat, 5), round(lng, 5)) for lat, lng in wiggly_route()]
+    assert decode_polyline(encode_polyline(points)) == points
+
+
+def test_simplification_gets_coarser_at_low_zoom():
+    points = wiggly_route()
+    assert len(simplify(points, 0.0)) == len(points)
+    assert tolerance_for_zoom(10, 18.5) > tolerance_for_zoom(17, 18.5)
+
+    route = RouteGeometry(points)
+    counts = [len(route.kept_indices(zoom)) for zoom in (10, 14, 18)]
+    assert counts[0] <= counts[1] <= counts[2] <= len(points)
+    assert counts[0] == 2
+
+
+def test_remaining_segment_starts_at_snapped_driver():
+    points = [(18.50, 73.80), (18.51, 73.80), (18.51, 73.81)]
+    route = RouteGeometry(points)
+
+    ahead = route.remaining(18.505, 73.8001, zoom=18)
+    decoded = decode_polyline(ahead["polyline"])
+    assert decoded == [(18.505, 73.8), (18.51, 73.8), (18.51, 73.81)]
+    assert 0.2 < ahead["progress"] < 0.3
+    assert ahead["off_route_m"] == 11
+
+    later = route.remaining(18.51, 73.805, zoom=18)
+    assert decode_polyline(later["polyline"]) == [(18.51, 73.805), (18.51, 73.81)]
+    assert later["remaining_m"] < ahead["remaining_m"]
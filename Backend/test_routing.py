@@ -0,0 +1,104 @@
+import heapq
+
+from Backend.road_graph import RoadGraph
+from Backend import routing, tools
+from Backend.routing import RoutingEngine, astar
+
+
+def grid_city(n=6, step=0.002, origin=(18.50, 73.80)):
+    """Overpass-style ``n`` x ``n`` street grid; row 2 is a one-way street heading east."""
+    elements = []
+    ids = {}
+    for i in range(n):
+        for j in range(n):
+            ids[i, j] = len(ids) + 1
+            elements.append({"type": "node", "id": ids[i, j], "lat": origin[0] + i * step, "lon": origin[1] + j * step})
+    way_id = 1000
+    for i in range(n):
+        tags = {"highway": "primary" if i == 0 else "residential", "name": f"Row {i} Road"}
+        if i == 2:
+            tags["oneway"] = "yes"
+        elements.append({"type": "way", "id": way_id, "nodes": [ids[i, j] for j in range(n)], "tags": tags})
+        way_id += 1
+    for j in range(n):
+        elements.append({"type": "way", "id": way_id, "nodes": [ids[i, j] for i in range(n)],
+                         "tags": {"highway": "tertiary"}})
+        way_id += 1
+    return {"elements": elements}
+
+
+def dijkstra(graph, source, target):
+    best = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        cost, node = heapq.heappop(heap)
+        if node == target:
+            return cost
+        if cost > best[node]:
+            continue
+        for _, nxt, _, seconds in graph.edges(node):
+            if cost + seconds < best.get(nxt, float("inf")):
+                best[nxt] = cost + seconds
+                heapq.heappush(heap, (cost + seconds, nxt))
+    return None
+
+
+def test_astar_matches_dijkstra_and_respects_oneway():
+    graph = RoadGraph.from_overpass(grid_city())
+    assert len(graph) == 36
+    for source in range(0, 36, 5):
+        for target in range(0, 36, 7):
+            found = astar(graph, source, target)
+            assert abs(found[1] - dijkstra(graph, source, target)) < 1e-3
+
+    west, _ = graph.nearest_node(18.504, 73.800)
+    east, _ = graph.nearest_node(18.504, 73.802)
+    eastbound = [e for e, target, _, _ in graph.edges(west) if target == east]
+    westbound = [e for e, target, _, _ in graph.edges(east) if target == west]
+    assert eastbound and not westbound
+
+
+def test_engine_caches_and_falls_back(tmp_path):
+    path = tmp_path / "city.graph"
+    RoadGraph.from_overpass(grid_city()).save(str(path))
+    engine = RoutingEngine(path=str(path))
+    assert len(engine.graph) == 36 and engine.graph.names["row 0 road"] is not None
+
+    first = engine.route(18.5001, 73.8001, 18.5099, 73.8099, geometry=True)
+    again = engine.route(18.5001, 73.8001, 18.5099, 73.8099)
+    assert first.source == "graph" and first.distance_m == again.distance_m
+    assert first.points[0] == (18.5001, 73.8001) and len(first.points) > 2
+    assert engine.stats()["hits"] == 1 and engine.stats()["misses"] == 1
+
+    # Far outside the graph: straight-line estimate
+    far = engine.route(19.0, 72.8, 19.1, 72.9)
+    assert far.source == "estimate" and far.distance_m > 0
+
+    without_graph = RoutingEngine(path=str(tmp_path / "missing.graph"))
+    assert without_graph.route(18.5, 73.8, 18.51, 73.81).source == "estimate"
+    assert without_graph.route_between("Somewhere", "18.5,73.8") is None
+
+
+def test_find_route_reports_distance_and_eta(monkeypatch):
+    monkeypatch.setattr(tools, "routing_engine", RoutingEngine(RoadGraph.from_overpass(grid_city())))
+    reply = tools.find_route("18.5,73.8", "Row 5 Road")
+    assert reply.startswith("Alright we going from 18.5,73.8 to Row 5 Road and the distance is ")
+    assert " km and it will take " in reply
+
+
+def test_unreachable_pairs_are_cached(monkeypatch):
+    city = grid_city()
+    # An island road ~2 km north of the grid, not connected to it.
+    city["elements"] += [
+        {"type": "node", "id": 9001, "lat": 18.53, "lon": 73.80},
+        {"type": "node", "id": 9002, "lat": 18.53, "lon": 73.802},
+        {"type": "way", "id": 9100, "nodes": [9001, 9002], "tags": {"highway": "residential"}},
+    ]
+    engine = RoutingEngine(RoadGraph.from_overpass(city))
+    searches = []
+    monkeypatch.setattr(routing, "astar", lambda graph, s, t: searches.append((s, t)) or astar(graph, s, t))
+
+    for _ in range(3):
+        assert engine.route(18.5001, 73.8001, 18.53, 73.801).source == "estimate"
+    assert len(searches) == 1
+    assert engine.stats()["hits"] == 2
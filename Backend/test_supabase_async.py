@@ -0,0 +1,157 @@
+import asyncio
+import json
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from fastapi import FastAPI
+
+from Backend.routes import login_route, signup_route
+from Backend.supabase_async import AsyncSupabase, get_supabase_async
+
+
+def session_body(email):
+    user = {"id": "00000000-0000-0000-0000-000000000001", "aud": "authenticated", "email": email,
+            "app_metadata": {}, "user_metadata": {}, "created_at": "2024-01-01T00:00:00Z"}
+    return {"access_token": "access", "refresh_token": "refresh", "expires_in": 3600,
+            "expires_at": int(time.time()) + 3600, "token_type": "bearer", "user": user}
+
+
+class FakeAuthHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        with server.lock:
+            server.ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+        try:
+            time.sleep(server.delay)
+            if body.get("password") == "wrong":
+                status, payload = 400, {"code": 400, "error_code": "invalid_credentials",
+                                        "msg": "Invalid login credentials"}
+            else:
+                status, payload = 200, session_body(body.get("email"))
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def fake_auth_server(delay):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeAuthHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.in_flight = server.peak = 0
+    server.ports = set()
+    server.delay = delay
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def app_with(client):
+    app = FastAPI()
+    app.include_router(login_route.router, prefix="/api")
+    app.include_router(signup_route.router, prefix="/api")
+    app.dependency_overrides[get_supabase_async] = lambda: client
+
+    @app.get("/api/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def test_concurrent_logins_do_not_block_the_loop():
+    with fake_auth_server(delay=0.2) as (server, url):
+        supabase = AsyncSupabase(url, "anon-key", max_connections=10)
+        app = app_with(supabase)
+
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                logins = [asyncio.create_task(client.post(
+                    "/api/login", json={"email": f"u{i}@example.com", "password": "secret"}
+                )) for i in range(20)]
+                await asyncio.sleep(0.05)
+                started = time.perf_counter()
+                ping = await client.get("/api/ping")
+                ping_seconds = time.perf_counter() - started
+                responses = await asyncio.gather(*logins)
+                await supabase.aclose()
+                return ping, ping_seconds, responses
+
+        started = time.perf_counter()
+        ping, ping_seconds, responses = asyncio.run(main())
+        elapsed = time.perf_counter() - started
+
+    assert ping.status_code == 200 and ping_seconds < 0.1
+    assert [r.status_code for r in responses] == [200] * 20
+    assert responses[0].cookies.get("roadchal_access_token") == "access"
+    # 20 x 0.2 s serially; two waves through the 10-connection pool.
+    assert elapsed < 1.5
+    assert 1 < server.peak <= 10 and len(server.ports) <= 10
+    assert supabase.stats()["sign_in_with_password"]["count"] == 20
+
+
+def test_errors_and_timeouts_map_to_http_statuses():
+    with fake_auth_server(delay=0.3) as (_, url):
+        supabase = AsyncSupabase(url, "anon-key", timeout=0.1)
+        app = app_with(supabase)
+
+        async def main():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                timed_out = await client.post("/api/signup", json={
+                    "email": "a@example.com", "username": "a", "password": "secret"})
+                supabase.timeout = 5
+                wrong = await client.post("/api/login", json={"email": "a@example.com", "password": "wrong"})
+                await supabase.aclose()
+                return timed_out, wrong
+
+        timed_out, wrong = asyncio.run(main())
+
+    assert timed_out.status_code == 504
+    assert wrong.status_code == 400
+    stats = supabase.stats()
+    assert stats["sign_up"]["errors"] == 1 and stats["sign_in_with_password"]["errors"] == 1
+
+
+def test_a_new_event_loop_closes_the_previous_pool():
+    supabase = AsyncSupabase("http://127.0.0.1:9", "anon")
+    old_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=old_loop.run_forever, daemon=True)
+    thread.start()
+
+    async def auth():
+        return supabase.auth, supabase._http
+
+    try:
+        _, old_http = asyncio.run_coroutine_threadsafe(auth(), old_loop).result(5)
+        new_auth, new_http = asyncio.run(auth())
+        deadline = time.monotonic() + 5
+        while not old_http.is_closed and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert old_http.is_closed and not new_http.is_closed and new_auth is supabase._auth
+    finally:
+        old_loop.call_soon_threadsafe(old_loop.stop)
+        thread.join(5)
+        old_loop.close()
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+from Backend.controllers import tracking_controller
+from Backend.driver_matching import DriverIndex
+from Backend.route_geometry import RouteStore
+from Backend.routes import tracking_routes
+from Backend.tracking import TrackingHub
+
+
+def test_ring_buffer_keeps_latest_pings():
+    hub = TrackingHub(history=3)
+    for i in range(5):
+        hub.record("r1", "d1", 18.5 + i / 1000, 73.8)
+    assert [round(p.lat, 3) for p in hub.history_of("r1")] == [18.502, 18.503, 18.504]
+    assert hub.latest("r1").lat == 18.504
+
+
+def test_subscription_throttles_and_sends_deltas():
+    async def scenario():
+        hub = TrackingHub(min_interval=0.05, min_distance=5)
+        hub.record("r1", "d1", 18.5, 73.8, speed=5.0)
+        updates = hub.subscribe("r1")
+
+        first = await updates.__anext__()
+        # A burst of pings inside one throttle window becomes one delta
+        for i in range(1, 6):
+            hub.record("r1", "d1", 18.5 + i / 10_000, 73.8, speed=5.0)
+        second = await updates.__anext__()
+        # Moving less than min_distance with nothing else changed sends nothing
+        hub.record("r1", "d1", 18.50051, 73.8, speed=5.0)
+        hub.record("r1", "d1", 18.50051, 73.8, speed=8.0)
+        third = await updates.__anext__()
+        hub.end_ride("r1")
+        rest = [u async for u in updates]
+        return first, second, third, rest, hub
+
+    first, second, third, rest, hub = asyncio.run(scenario())
+    assert first["type"] == "snapshot" and first["lat"] == 18.5
+    assert second["type"] == "delta"
+    assert second["lat"] == 18.5005 and "speed" not in second and "driver_id" not in second
+    assert set(third) == {"type", "ride_id", "ts", "speed"}
+    assert rest == []
+    assert hub.stats()["subscribers"] == 0
+
+
+def test_ping_route_and_websocket(monkeypatch):
+    monkeypatch.setattr(tracking_controller, "tracking_hub", TrackingHub(min_interval=0))
+    app = FastAPI()
+    app.include_router(tracking_routes.router, prefix="/api")
+    client = TestClient(app)
+
+    ping = {"driver_id": "d1", "lat": 18.52, "lng": 73.85, "heading": 90}
+    assert client.post("/api/tracking/ride-1/ping", json=ping).status_code == 200
+    assert client.get("/api/tracking/map-data", params={"ride_id": "ride-1"}).json()["driver_location"] == {
+        "lat": 18.52, "lng": 73.85}
+    assert client.get("/api/tracking/map-data").json()["eta"] == "15 min"
+
+    route = {"points": [[18.52, 73.85], [18.53, 73.85], [18.53, 73.86]]}
+    assert client.put("/api/tracking/ride-1/route", json=route).json()["points"] == 3
+    data = client.get("/api/tracking/map-data", params={"ride_id": "ride-1", "zoom": 18}).json()
+    assert data["route_polyline"] and data["progress"] == 0.0
+
+    with client.websocket_connect("/api/tracking/ride-1/ws") as ws:
+        assert ws.receive_json()["type"] == "snapshot"
+        client.post("/api/tracking/ride-1/ping", json={**ping, "lat": 18.53})
+        assert ws.receive_json()["lat"] == 18.53
+        client.delete("/api/tracking/ride-1")
+
+
+def test_unknown_rides_cannot_be_subscribed(monkeypatch):
+    hub, drivers = TrackingHub(min_interval=0), DriverIndex()
+    monkeypatch.setattr(tracking_controller, "tracking_hub", hub)
+    monkeypatch.setattr(tracking_controller, "route_store", RouteStore())
+    monkeypatch.setattr(tracking_controller, "driver_index", drivers)
+    app = FastAPI()
+    app.include_router(tracking_routes.router, prefix="/api")
+    client = TestClient(app)
+
+    assert client.get("/api/tracking/made-up/stream").status_code == 404
+    with pytest.raises(WebSocketDisconnect) as rejected:
+        with client.websocket_connect("/api/tracking/made-up/ws"):
+            pass
+    assert rejected.value.code == 1008
+    assert len(hub) == 0
+
+    # A booked ride can be watched before its driver's first ping.
+    drivers.update("d1", 18.52, 73.85, vehicle_type="Auto", name="Ravi")
+    drivers.reserve(18.52, 73.85, "ride-1")
+    assert tracking_controller.subscribe("ride-1") is not None
+    assert tracking_controller.subscribe("ride-2") is None
+    assert len(hub) == 1
+
+
+class FakeWebSocket:
+    """Just enough of a WebSocket for the handler; ``leave()`` disconnects the rider."""
+
+    def __init__(self):
+        self.sent = []
+        self._left = asyncio.Event()
+
+    async def accept(self):
+        pass
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+    async def receive(self):
+        await self._left.wait()
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def close(self):
+        raise AssertionError("closing a socket the rider already left")
+
+    def leave(self):
+        self._left.set()
+
+
+def test_websocket_disconnect_ends_the_subscription_while_idle(monkeypatch):
+    hub = TrackingHub(min_interval=0)
+    monkeypatch.setattr(tracking_controller, "tracking_hub", hub)
+
+    async def scenario():
+        hub.record("ride-1", "d1", 18.52, 73.85)
+        ws = FakeWebSocket()
+        handler = asyncio.create_task(tracking_routes.tracking_ws(ws, "ride-1"))
+        while not ws.sent:
+            await asyncio.sleep(0)
+        assert hub.stats()["subscribers"] == 1
+
+        # No further pings: the disconnect alone must release the subscriber.
+        ws.leave()
+        await asyncio.wait_for(handler, 1)
+        return ws
+
+    ws = asyncio.run(scenario())
+    assert [update["type"] for update in ws.sent] == ["snapshot"]
+    assert hub.stats()["subscribers"] == 0
@@ -0,0 +1,100 @@
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from Backend.controllers import whatsapp_controller
+from Backend.routes import whatsapp_route
+from Backend.webhook_queue import MessageDeduper, WebhookDispatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_deduper_expires_ids():
+    clock = FakeClock()
+    deduper = MessageDeduper(ttl=10, clock=clock)
+    assert deduper.first_time("SM1")
+    assert not deduper.first_time("SM1")
+    clock.now = 11
+    assert deduper.first_time("SM1")
+
+
+def test_dispatcher_keeps_per_sender_order_and_rejects_when_full():
+    handled = []
+    dispatcher = WebhookDispatcher(lambda sender, body: handled.append((sender, body)), workers=3)
+    for i in range(20):
+        dispatcher.submit("whatsapp:+911", str(i), f"SM{i}")
+    assert dispatcher.submit("whatsapp:+911", "0", "SM0") == "duplicate"
+    dispatcher.join()
+    assert [body for _, body in handled] == [str(i) for i in range(20)]
+
+    release = threading.Event()
+    blocked = WebhookDispatcher(lambda sender, body: release.wait(), workers=1, maxsize=1)
+    blocked.submit("a", "first", "SMa")
+    while blocked.depth():
+        pass
+    assert blocked.submit("a", "second", "SMb") == "queued"
+    assert blocked.submit("a", "third", "SMc") == "busy"
+    release.set()
+    blocked.close()
+    assert blocked.submit("a", "third", "SMc") == "busy"
+
+
+def test_close_is_bounded_when_a_shard_is_full():
+    release = threading.Event()
+    dispatcher = WebhookDispatcher(lambda sender, body: release.wait(), workers=1, maxsize=1)
+    dispatcher.submit("a", "first")
+    while dispatcher.depth():
+        pass
+    assert dispatcher.submit("a", "second") == "queued"
+
+    started = time.monotonic()
+    dispatcher.close(timeout=0.2)
+    assert time.monotonic() - started < 1.0
+
+    # The busy handler finishes; what was still queued is dropped.
+    release.set()
+    dispatcher._threads[0].join(1.0)
+    dispatcher.join()
+    assert dispatcher.stats()["dropped"] == 1 and dispatcher.processed == 1
+
+
+def test_webhook_acks_with_twiml_and_ignores_retries(monkeypatch):
+    handled = []
+    dispatcher = WebhookDispatcher(lambda sender, body: handled.append(body), workers=1)
+    monkeypatch.setattr(whatsapp_controller, "dispatcher", dispatcher)
+    monkeypatch.setattr(whatsapp_controller, "TWILIO_CONFIGURED", True)
+    app = FastAPI()
+    app.include_router(whatsapp_route.router, prefix="/api")
+    client = TestClient(app)
+
+    form = {"Body": "hi", "From": "whatsapp:+911", "MessageSid": "SM123"}
+    first = client.post("/api/whatsapp", data=form)
+    retry = client.post("/api/whatsapp", data=form)
+    dispatcher.join()
+
+    assert first.status_code == retry.status_code == 200
+    assert first.headers["content-type"].startswith("application/xml")
+    assert "<Response" in first.text
+    assert handled == ["hi"]
+    assert client.get("/api/whatsapp/stats").json()["duplicates"] == 1
+
+
+def test_webhook_replies_inline_without_twilio_credentials(monkeypatch):
+    monkeypatch.setattr(whatsapp_controller, "TWILIO_CONFIGURED", False)
+    monkeypatch.setattr(whatsapp_controller, "reply_to", lambda sender, body: f"echo {body} & more")
+    app = FastAPI()
+    app.include_router(whatsapp_route.router, prefix="/api")
+
+    response = TestClient(app).post("/api/whatsapp", data={"Body": "hi", "From": "whatsapp:+911"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/xml")
+    assert "<Message>echo hi &amp; more</Message>" in response.text
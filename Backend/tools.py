@@ -1,10 +1,34 @@
 # tools.py
-import requests
 import os
 
+try:
+    from .http_client import get_client
+    from .driver_matching import PUNE, parse_lat_lng
+    from .controllers.drivers_controller import match_driver, release_driver
+    from .routing import routing_engine
+except ImportError:
+    from http_client import get_client
+    from driver_matching import PUNE, parse_lat_lng
+    from controllers.drivers_controller import match_driver, release_driver
+    from routing import routing_engine
+
 GOOGLE_API = os.getenv("GOOGLE_MAPS_API")
 
 def find_route(origin, destination):
+    """
+    Distance and ETA from the offline routing engine when both places can
+    be located locally ("lat,lng" or a known road name), otherwise from the
+    Google Directions API when a key is configured.
+    """
+    intro = "Alright we going from " + origin + " to " + destination
+
+    local = routing_engine.route_between(origin, destination)
+    if local is not None:
+        return intro + " and the distance is " + local.distance_text + " and it will take " + local.duration_text
+
+    if not GOOGLE_API:
+        return intro + "."
+
     url = "https://maps.googleapis.com/maps/api/directions/json"
 
     params = {
@@ -13,22 +37,41 @@ def find_route(origin, destination):
         "key": GOOGLE_API
     }
 
-    #res = requests.get(url, params=params).json()
-    res = "Alright we going from " + origin + " to " + destination + " and the distance is 5km and it will take 15 mins"
-    # if res["routes"]:
-    #     leg = res["routes"][0]["legs"][0]
-    #     return {
-    #         "distance": leg["distance"]["text"],
-    #         "duration": leg["duration"]["text"]
-    #     }
+    try:
+        res = get_client().get(url, params=params).json()
+    except Exception:
+        return intro + "."
 
-    return res
+    if res.get("routes"):
+        leg = res["routes"][0]["legs"][0]
+        return (
+            intro +
+            " and the distance is " + leg["distance"]["text"] +
+            " and it will take " + leg["duration"]["text"]
+        )
 
+    return intro + "."
 
-def book_ride(user_id, ride_type):
-    # mock booking
+
+def book_ride(user_id, ride_type, pickup=None):
+    """
+    Reserve the nearest available driver of ``ride_type`` for the pickup.
+    Pickups that are not "lat,lng" are matched from the city centre.
+    Returns None when no driver is available.
+    """
+    lat, lng = parse_lat_lng(pickup) or PUNE
+    driver = match_driver(lat, lng, ride_type)
+    if driver is None:
+        return None
     return {
-        "driver": "Ramesh",
+        "ride_id": driver["ride_id"],
+        "driver": driver["name"],
         "vehicle": ride_type,
-        "eta": "5 mins"
+        "eta": driver["eta"]
     }
+
+
+def release_ride(ride_id):
+    """Give back the driver reserved by ``book_ride``; a no-op for unknown rides."""
+    if ride_id:
+        release_driver(ride_id)
@@ -0,0 +1,233 @@
+# tracking.py
+"""
+In-memory live tracking: drivers post GPS pings per ride, riders subscribe.
+
+Each ride keeps its last ``history`` pings in a ring buffer.  A ping only
+flags the ride's subscribers as dirty; every subscriber then sends at most
+one update per ``min_interval`` seconds, built from the newest ping, so a
+burst of pings costs one message.  Updates after the first are deltas that
+carry only the fields that changed.
+
+All methods are meant to be called from the event loop thread.
+"""
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+try:
+    from .geo import METERS_PER_DEGREE
+except ImportError:
+    from geo import METERS_PER_DEGREE
+
+TRACKING_HISTORY = int(os.getenv("TRACKING_HISTORY", "120"))
+TRACKING_MIN_INTERVAL_SECONDS = float(os.getenv("TRACKING_MIN_INTERVAL_SECONDS", "1"))
+TRACKING_MIN_DISTANCE_METERS = float(os.getenv("TRACKING_MIN_DISTANCE_METERS", "5"))
+TRACKING_IDLE_SECONDS = float(os.getenv("TRACKING_IDLE_SECONDS", str(60 * 30)))
+
+class LocationPing(NamedTuple):
+    driver_id: str
+    lat: float
+    lng: float
+    heading: Optional[float] = None
+    speed: Optional[float] = None
+    status: str = "on_trip"
+    ts: float = 0.0
+
+    def snapshot(self) -> dict:
+        return {
+            "driver_id": self.driver_id,
+            "lat": round(self.lat, 6),
+            "lng": round(self.lng, 6),
+            "heading": None if self.heading is None else round(self.heading),
+            "speed": None if self.speed is None else round(self.speed, 1),
+            "status": self.status,
+            "ts": self.ts,
+        }
+
+
+def approx_meters(lat1, lng1, lat2, lng2) -> float:
+    """Equirectangular distance; plenty for the few metres between pings."""
+    x = (lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+    return math.hypot(x, lat2 - lat1) * METERS_PER_DEGREE
+
+
+class RideTrack:
+    __slots__ = ("ride_id", "pings", "subscribers", "updated")
+
+    def __init__(self, ride_id, history):
+        self.ride_id = ride_id
+        self.pings = deque(maxlen=history)
+        self.subscribers = set()
+        self.updated = 0.0
+
+    @property
+    def latest(self) -> Optional[LocationPing]:
+        return self.pings[-1] if self.pings else None
+
+
+class Subscription:
+    """
+    Async iterator of update dicts for one ride.  The first update is a full
+    snapshot (``"type": "snapshot"``); later ones are ``"delta"`` updates.
+    Iteration ends when the ride is ended.
+    """
+
+    def __init__(self, hub, track, min_interval, min_distance):
+        self._hub = hub
+        self._track = track
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self._dirty = asyncio.Event()
+        self._closed = False
+        self._sent = None  # last snapshot sent
+        self._sent_at = 0.0
+        if track.latest is not None:
+            self._dirty.set()
+
+    def notify(self):
+        self._dirty.set()
+
+    def close(self):
+        self._closed = True
+        self._dirty.set()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        while True:
+            if not self._closed:
+                await self._dirty.wait()
+            if self._closed:
+                self._hub._unsubscribe(self._track, self)
+                raise StopAsyncIteration
+
+            # Throttle: wait out the rest of the window, letting pings pile up.
+            wait = self._sent_at + self.min_interval - self._hub.clock()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._dirty.clear()
+            if self._closed:
+                continue
+
+            update = self._next_update()
+            if update is not None:
+                self._sent_at = self._hub.clock()
+                return update
+
+    def _next_update(self):
+        snapshot = self._track.latest.snapshot()
+        if self._sent is None:
+            self._sent = snapshot
+            return {"type": "snapshot", "ride_id": self._track.ride_id, **snapshot}
+
+        previous = self._sent
+        moved = approx_meters(previous["lat"], previous["lng"], snapshot["lat"], snapshot["lng"])
+        changed = {
+            key: value for key, value in snapshot.items()
+            if key not in ("lat", "lng", "ts") and previous.get(key) != value
+        }
+        if moved >= self.min_distance:
+            changed["lat"] = snapshot["lat"]
+            changed["lng"] = snapshot["lng"]
+        if not changed:
+            return None
+
+        self._sent = {**previous, **changed, "ts": snapshot["ts"]}
+        return {"type": "delta", "ride_id": self._track.ride_id, "ts": snapshot["ts"], **changed}
+
+    async def aclose(self):
+        self._hub._unsubscribe(self._track, self)
+
+
+class TrackingHub:
+    def __init__(self, history=TRACKING_HISTORY, min_interval=TRACKING_MIN_INTERVAL_SECONDS,
+                 min_distance=TRACKING_MIN_DISTANCE_METERS, idle_seconds=TRACKING_IDLE_SECONDS,
+                 clock=time.time):
+        self.history = history
+        self.min_interval = min_interval
+        self.min_distance = min_distance
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._rides = {}
+
+        self.pings = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self._rides)
+
+    def record(self, ride_id, driver_id, lat, lng, heading=None, speed=None, status="on_trip", ts=None):
+        track = self._rides.get(ride_id)
+        if track is None:
+            track = self._rides[ride_id] = RideTrack(ride_id, self.history)
+        now = self.clock()
+        ping = LocationPing(driver_id, lat, lng, heading, speed, status, now if ts is None else ts)
+        track.pings.append(ping)
+        track.updated = now
+        self.pings += 1
+        for subscriber in track.subscribers:
+            subscriber.notify()
+        # The idle scan walks every ride, so amortise it over many pings.
+        if self.pings % 10_000 == 0:
+            self.evict_idle()
+        return ping
+
+    def latest(self, ride_id) -> Optional[LocationPing]:
+        track = self._rides.get(ride_id)
+        return track.latest if track else None
+
+    def history_of(self, ride_id, limit=None):
+        track = self._rides.get(ride_id)
+        if track is None:
+            return []
+        pings = list(track.pings)
+        return pings[-limit:] if limit else pings
+
+    def subscribe(self, ride_id, min_interval=None, min_distance=None) -> Subscription:
+        track = self._rides.get(ride_id)
+        if track is None:
+            track = self._rides[ride_id] = RideTrack(ride_id, self.history)
+            track.updated = self.clock()
+        subscription = Subscription(
+            self,
+            track,
+            self.min_interval if min_interval is None else min_interval,
+            self.min_distance if min_distance is None else min_distance,
+        )
+        track.subscribers.add(subscription)
+        return subscription
+
+    def end_ride(self, ride_id):
+        track = self._rides.pop(ride_id, None)
+        if track is None:
+            return False
+        for subscriber in list(track.subscribers):
+            subscriber.close()
+        return True
+
+    def evict_idle(self):
+        """Drop rides with no pings for ``idle_seconds`` and nobody watching."""
+        cutoff = self.clock() - self.idle_seconds
+        idle = [
+            ride_id for ride_id, track in self._rides.items()
+            if track.updated < cutoff and not track.subscribers
+        ]
+        for ride_id in idle:
+            del self._rides[ride_id]
+        self.evicted += len(idle)
+        return len(idle)
+
+    def stats(self) -> dict:
+        return {
+            "rides": len(self._rides),
+            "subscribers": sum(len(t.subscribers) for t in self._rides.values()),
+            "pings": self.pings,
+            "evicted": self.evicted,
+        }
+
+    def _unsubscribe(self, track, subscription):
+        track.subscribers.discard(subscription)
@@ -0,0 +1,192 @@
+# webhook_queue.py
+"""
+Hand-off between the webhook route and the (blocking) chat handlers.
+
+The route acknowledges Twilio right away and submits the message here.
+Messages are sharded onto worker threads by sender, so one user's messages
+are still handled in order while different users run in parallel.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class MessageDeduper:
+    """
+    Remembers recently seen message ids for ``ttl`` seconds (at most
+    ``maxsize`` of them) so Twilio's webhook retries are only handled once.
+    """
+
+    def __init__(self, ttl=600.0, maxsize=100_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._clock = clock
+        self._seen = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def first_time(self, message_id):
+        """True the first time ``message_id`` is seen, False for repeats."""
+        now = self._clock()
+        with self._lock:
+            while self._seen:
+                oldest, seen_at = next(iter(self._seen.items()))
+                if now - seen_at <= self.ttl and len(self._seen) < self.maxsize:
+                    break
+                del self._seen[oldest]
+
+            if message_id in self._seen:
+                return False
+            self._seen[message_id] = now
+            return True
+
+    def forget(self, message_id):
+        with self._lock:
+            self._seen.pop(message_id, None)
+
+
+class WebhookDispatcher:
+    """
+    ``handle(sender, body)`` runs on one of ``workers`` threads.  ``submit``
+    never blocks: it returns "duplicate" for a repeated message id, "busy"
+    when the sender's queue is full (so the caller can ask Twilio to retry),
+    and "queued" otherwise.
+    """
+
+    def __init__(self, handle, workers=4, maxsize=1000, deduper=None):
+        self._handle = handle
+        self._queues = [queue.Queue(maxsize=maxsize) for _ in range(max(1, workers))]
+        self._threads = []
+        self._lock = threading.Lock()
+        self._closed = False
+        # Set when close() runs out of time: workers drop what is still queued.
+        self._abort = threading.Event()
+        self.deduper = deduper if deduper is not None else MessageDeduper()
+
+        self.received = 0
+        self.processed = 0
+        self.failed = 0
+        self.duplicates = 0
+        self.rejected = 0
+        self.dropped = 0
+
+    def submit(self, sender, body, message_id=None):
+        with self._lock:
+            self.received += 1
+            if self._closed:
+                self.rejected += 1
+                return "busy"
+        if message_id and not self.deduper.first_time(message_id):
+            with self._lock:
+                self.duplicates += 1
+            return "duplicate"
+
+        self._start()
+        shard = self._queues[hash(sender) % len(self._queues)]
+        try:
+            shard.put_nowait((sender, body))
+        except queue.Full:
+            # Let Twilio's retry through once there is room again.
+            if message_id:
+                self.deduper.forget(message_id)
+            with self._lock:
+                self.rejected += 1
+            return "busy"
+        return "queued"
+
+    def depth(self):
+        return sum(q.qsize() for q in self._queues)
+
+    def join(self):
+        """Block until every queued message has been handled."""
+        for q in self._queues:
+            q.join()
+
+    def close(self, timeout=5.0):
+        """Stop the workers after what is queued, waiting at most ``timeout`` seconds."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            threads = list(self._threads)
+        deadline = time.monotonic() + timeout
+        for q, thread in zip(self._queues, threads):
+            try:
+                q.put(_STOP, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                self._abort.set()
+        for thread in threads:
+            thread.join(max(0.0, deadline - time.monotonic()))
+        if any(thread.is_alive() for thread in threads):
+            self._abort.set()
+            logger.warning("Webhook workers did not stop within %.1fs; %d message(s) dropped",
+                           timeout, self.depth())
+
+    def stats(self):
+        return {
+            "workers": len(self._queues),
+            "depth": self.depth(),
+            "received": self.received,
+            "processed": self.processed,
+            "failed": self.failed,
+            "duplicates": self.duplicates,
+            "rejected": self.rejected,
+            "dropped": self.dropped,
+        }
+
+    def _start(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads or self._closed:
+                return
+            for i, q in enumerate(self._queues):
+                thread = threading.Thread(target=self._run, args=(q,), name=f"webhook-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        atexit.register(self.close)
+
+    def _run(self, q):
+        while not self._abort.is_set():
+            item = q.get()
+            try:
+                if item is _STOP:
+                    return
+                if self._abort.is_set():
+                    with self._lock:
+                        self.dropped += 1
+                    continue
+                sender, body = item
+                try:
+                    self._handle(sender, body)
+                except Exception:
+                    logger.exception("Webhook handler failed for %s", sender)
+                    with self._lock:
+                        self.failed += 1
+                else:
+                    with self._lock:
+                        self.processed += 1
+            finally:
+                q.task_done()
+        self._drop(q)
+
+    def _drop(self, q):
+        """Empty an aborted shard so ``join`` callers are not left waiting."""
+        while True:
+            try:
+                item = q.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP:
+                with self._lock:
+                    self.dropped += 1
+            q.task_done()
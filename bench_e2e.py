@@ -0,0 +1,356 @@
+"""
+End-to-end latency and throughput of both FastAPI apps, in-process.
+
+Every request goes through httpx's ASGI transport straight into the app, so
+no sockets are opened and runs are repeatable on one machine.  Upstreams are
+stubbed: Supabase is ``FakeSupabase``, Overpass, Twilio and the WhatsApp
+relay answer from an ``httpx.MockTransport``, and the /stark flow's driver
+matching calls the Backend app in-process.
+
+Each scenario runs at every concurrency level; results are compared with a
+saved baseline, and a p50/p95 (optionally p99) or throughput regression
+beyond the tolerance, or new errors, exits non-zero.
+
+    python bench_e2e.py                              # compare with bench_e2e_baseline.json
+    python bench_e2e.py --save-baseline              # record a new baseline
+    python bench_e2e.py --scenario chat --scenario stark_flow --concurrency 1 16 --requests 500
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+import httpx
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench_e2e_baseline.json")
+DEFAULT_CONCURRENCY = (1, 4, 16, 64)
+DEFAULT_REQUESTS = 300
+DEFAULT_REPEAT = 3
+# Latency may grow by this fraction (and throughput shrink by it) before a run fails.
+DEFAULT_TOLERANCE = 0.5
+# Absolute slack so sub-millisecond timings don't fail on scheduler noise.
+DEFAULT_SLACK_MS = 2.0
+# p99 of a few hundred requests is a handful of samples and swings with GC
+# and thread scheduling; it is reported always and gated with --gate-p99.
+GATED_PERCENTILES = ("p50_ms", "p95_ms")
+
+PUNE = (18.5204, 73.8567)
+TRACKED_RIDES = 50
+
+
+# =============================
+# STUBBED UPSTREAMS
+# =============================
+
+def stub_upstream(request: httpx.Request) -> httpx.Response:
+    host = request.url.host
+    if host.endswith("overpass-api.de"):
+        return httpx.Response(200, json={"elements": []})
+    if host.endswith("api.twilio.com"):
+        return httpx.Response(201, json={"sid": "SM" + "0" * 32, "status": "queued"})
+    if host.endswith("supabase.co"):
+        return httpx.Response(200, json=[])
+    if request.url.path == "/send":  # WhatsApp relay used by /stark
+        return httpx.Response(200, json={"ok": True})
+    return httpx.Response(404)
+
+
+def load_apps():
+    """Import both apps with every upstream stubbed; returns (backend, llm, stark module)."""
+    # Read at import time by the modules below.
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Enough drivers that the legs still in flight at 64-way concurrency never empty a pickup area.
+    os.environ.setdefault("DRIVER_DEMO_COUNT", "10000")
+    os.environ["TWILIO_ACCOUNT_SID"] = "AC" + "0" * 32
+    os.environ["TWILIO_AUTH_TOKEN"] = "bench"
+    os.environ["TWILIO_WHATSAPP_FROM"] = "whatsapp:+10000000000"
+
+    from fastapi import FastAPI
+
+    from Backend import http_client as backend_http
+    from Backend.main import app as backend_app
+
+    sys.path.insert(0, os.path.join(ROOT, "llm"))
+    import llm as stark
+    from components import http_client as llm_http
+    from components.fake_supabase import FakeSupabase
+    from components.supabase_setup import set_supabase
+
+    set_supabase(FakeSupabase())
+
+    mock = httpx.MockTransport(stub_upstream)
+    backend_http.get_client()._client = httpx.Client(transport=mock)
+    llm_http.get_client()._client = httpx.Client(transport=mock)
+    # /stark books drivers through the Backend's matching endpoint.
+    llm_http.get_client()._async_client = httpx.AsyncClient(transport=httpx.ASGITransport(app=backend_app))
+    # Legs finish almost at once so drivers are released for the next flows.
+    stark.TRACKING_SIMULATION_SECONDS = 0
+
+    llm_app = FastAPI()
+    llm_app.include_router(stark.router)
+    return backend_app, llm_app, stark
+
+
+# =============================
+# SCENARIOS
+# =============================
+
+def near_pune(rng, spread=0.05):
+    return round(PUNE[0] + rng.uniform(-spread, spread), 6), round(PUNE[1] + rng.uniform(-spread, spread), 6)
+
+
+async def chat(client, i, rng, stark):
+    response = await client.post("/api/chat", json={"message": f"what is the metro fare, trip {i}"})
+    return response.status_code == 200
+
+
+async def rides_estimates(client, i, rng, stark):
+    # A new source each time, so the estimate cache doesn't answer for the providers.
+    (lat1, lng1), (lat2, lng2) = near_pune(rng), near_pune(rng)
+    response = await client.post("/api/rides/estimates",
+                                 json={"source": f"{lat1},{lng1}", "destination": f"{lat2},{lng2}"})
+    return response.status_code == 200 and bool(response.json())
+
+
+async def tracking_map_data(client, i, rng, stark):
+    response = await client.get("/api/tracking/map-data", params={"ride_id": f"bench-ride-{i % TRACKED_RIDES}"})
+    return response.status_code == 200
+
+
+async def whatsapp(client, i, rng, stark):
+    response = await client.post("/api/whatsapp", data={
+        "Body": "hi", "From": f"whatsapp:+91{9000000000 + i}", "MessageSid": f"SMbench{time.monotonic_ns()}{i}",
+    })
+    return response.status_code == 200
+
+
+async def stark_flow(client, i, rng, stark):
+    """Greeting, destination with live location, then YES: three requests per operation."""
+    username = f"bench-{time.monotonic_ns()}-{i}"
+    lat, lng = near_pune(rng)
+    greeting = await client.post("/stark/", json={"username": username, "message": "hi"})
+    if greeting.status_code != 200 or greeting.json().get("status") != "awaiting_destination":
+        return False
+    booked = await client.post("/stark/", json={"username": username, "message": "Hinjewadi",
+                                                 "latitude": lat, "longitude": lng})
+    if booked.status_code != 200 or "status" in booked.json():
+        return False  # no_driver or missing_location
+    confirmed = await client.post("/stark/", json={"username": username, "message": "yes"})
+    return confirmed.status_code == 200 and confirmed.json().get("status") == stark.StateEnum.INTRANSIT1.value
+
+
+async def setup_tracking(client, rng):
+    for k in range(TRACKED_RIDES):
+        ride_id = f"bench-ride-{k}"
+        origin, destination = near_pune(rng), near_pune(rng)
+        await client.put(f"/api/tracking/{ride_id}/route", json={"origin": origin, "destination": destination})
+        await client.post(f"/api/tracking/{ride_id}/ping",
+                          json={"driver_id": f"bench-driver-{k}", "lat": origin[0], "lng": origin[1]})
+
+
+# name -> (app, operation, setup)
+SCENARIOS = {
+    "chat": ("backend", chat, None),
+    "rides_estimates": ("backend", rides_estimates, None),
+    "tracking_map_data": ("backend", tracking_map_data, setup_tracking),
+    "whatsapp": ("backend", whatsapp, None),
+    "stark_flow": ("llm", stark_flow, None),
+}
+
+
+# =============================
+# RUNNER
+# =============================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+async def run_level(client, operation, requests, concurrency, rng, stark):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            try:
+                ok = await operation(client, i, rng, stark)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            if not ok:
+                errors += 1
+            # In-process requests may finish without ever suspending; yield so
+            # the other workers and background tasks (legs, flushes) get a turn.
+            await asyncio.sleep(0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+async def settle(stark, timeout=10.0):
+    """Let journey legs started by one level finish (and free their drivers) before the next."""
+    deadline = time.monotonic() + timeout
+    while stark.journey_engine.active and time.monotonic() < deadline:
+        await asyncio.sleep(0.01)
+
+
+def median_of(runs):
+    """Per-metric median of repeated runs of one level; errors are summed."""
+    row = {}
+    for key in runs[0]:
+        values = sorted(run[key] for run in runs)
+        row[key] = sum(values) if key in ("requests", "errors") else values[len(values) // 2]
+    return row
+
+
+async def run(scenarios, levels, requests, warmup, seed, repeat=1):
+    backend_app, llm_app, stark = load_apps()
+    clients = {
+        "backend": httpx.AsyncClient(transport=httpx.ASGITransport(app=backend_app), base_url="http://backend"),
+        "llm": httpx.AsyncClient(transport=httpx.ASGITransport(app=llm_app), base_url="http://llm"),
+    }
+    rng = random.Random(seed)
+    results = {}
+    try:
+        for name in scenarios:
+            app, operation, setup = SCENARIOS[name]
+            client = clients[app]
+            if setup is not None:
+                await setup(client, rng)
+            # Warm up at full concurrency so thread pools and caches exist before timing.
+            await run_level(client, operation, warmup, max(levels), rng, stark)
+            await settle(stark)
+            results[name] = {}
+            for level in levels:
+                runs = []
+                for _ in range(repeat):
+                    runs.append(await run_level(client, operation, requests, level, rng, stark))
+                    await settle(stark)
+                results[name][str(level)] = median_of(runs)
+                report_row(name, level, results[name][str(level)])
+    finally:
+        await stark.journey_engine.shutdown()
+        for client in clients.values():
+            await client.aclose()
+    return results
+
+
+def report_row(name, level, row):
+    print(f"{name:<18} c={level:<4} {row['requests']:>6} req  {row['errors']:>4} err  "
+          f"p50 {row['p50_ms']:>8.2f}  p95 {row['p95_ms']:>8.2f}  p99 {row['p99_ms']:>8.2f} ms  "
+          f"{row['rps']:>9.1f} req/s", flush=True)
+
+
+# =============================
+# BASELINE
+# =============================
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, slack_ms=DEFAULT_SLACK_MS,
+            percentiles=GATED_PERCENTILES):
+    """Regressions of ``results`` against ``baseline`` results, as readable lines."""
+    regressions = []
+    for name, levels in results.items():
+        for level, row in levels.items():
+            base = baseline.get(name, {}).get(level)
+            if base is None:
+                continue
+            where = f"{name} c={level}"
+            for key in percentiles:
+                limit = base[key] * (1 + tolerance) + slack_ms
+                if row[key] > limit:
+                    regressions.append(f"{where}: {key} {row[key]:.2f} > {limit:.2f} (baseline {base[key]:.2f})")
+            floor = base["rps"] / (1 + tolerance)
+            if row["rps"] < floor:
+                regressions.append(f"{where}: rps {row['rps']:.1f} < {floor:.1f} (baseline {base['rps']:.1f})")
+            if row["errors"] > base["errors"]:
+                regressions.append(f"{where}: errors {row['errors']} > baseline {base['errors']}")
+    return regressions
+
+
+def environment():
+    return {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Run only this scenario (repeatable); default all")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Operations per concurrency level")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="Runs per level; the median of each metric is reported")
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--slack-ms", type=float, default=DEFAULT_SLACK_MS)
+    parser.add_argument("--gate-p99", action="store_true", help="Fail on p99 regressions too")
+    parser.add_argument("--output", help="Also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    scenarios = args.scenario or list(SCENARIOS)
+    results = asyncio.run(run(scenarios, sorted(args.concurrency), args.requests, args.warmup,
+                              args.seed, args.repeat))
+    run_data = {
+        "environment": environment(),
+        "requests": args.requests,
+        "repeat": args.repeat,
+        "concurrency": sorted(args.concurrency),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(run_data, f, indent=2)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(run_data, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("environment") != run_data["environment"]:
+        print(f"note: baseline was recorded on {baseline.get('environment')}")
+
+    percentiles = GATED_PERCENTILES + ("p99_ms",) if args.gate_p99 else GATED_PERCENTILES
+    regressions = compare(results, baseline["results"], args.tolerance, args.slack_ms, percentiles)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} check(s) worse than the baseline "
+              f"(tolerance {args.tolerance:.0%} + {args.slack_ms} ms)")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print("\nno regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Cold-start cost of both apps, from ``python -X importtime``.
+
+Each target is imported in a fresh interpreter with no Supabase
+credentials in the environment (importing must not need them), several
+times; the median cumulative import time is reported with the heaviest
+top-level packages.  Modules that must stay lazy (the Supabase SDKs) fail
+the run if an import pulls them in, and times are compared with a saved
+baseline like bench_e2e.py.
+
+    python bench_import.py                   # compare with bench_import_baseline.json
+    python bench_import.py --save-baseline
+    python bench_import.py --runs 9 --top 15
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(ROOT, "bench_import_baseline.json")
+DEFAULT_RUNS = 5
+DEFAULT_TOLERANCE = 0.5
+DEFAULT_SLACK_MS = 50.0
+
+# name -> (working directory, module imported there)
+TARGETS = {
+    "backend": (ROOT, "Backend.main"),
+    "llm": (os.path.join(ROOT, "llm"), "llm"),
+}
+# Created on first use; an import-time dependency on them is a regression.
+LAZY_MODULES = ("supabase", "supabase_auth", "postgrest", "storage3", "realtime", "gotrue")
+CREDENTIALS = ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_ANON_KEY")
+
+
+def parse_importtime(stderr):
+    """``{module: (self us, cumulative us)}`` from ``-X importtime`` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        try:
+            modules[name.strip()] = (int(self_us), int(cumulative_us))
+        except ValueError:
+            continue  # the header line
+    return modules
+
+
+def by_package(modules):
+    """Self time summed per top-level package, in ms, heaviest first."""
+    totals = {}
+    for name, (self_us, _) in modules.items():
+        package = name.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return sorted(((package, us / 1000) for package, us in totals.items()), key=lambda item: -item[1])
+
+
+def import_once(cwd, module):
+    env = {k: v for k, v in os.environ.items() if k not in CREDENTIALS}
+    code = f"import sys, {module}; print(','.join(sorted(sys.modules)))"
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                          cwd=cwd, env=env, capture_output=True, text=True)
+    if proc.returncode != 0:
+        tail = "\n".join(proc.stderr.strip().splitlines()[-5:])
+        raise SystemExit(f"importing {module} failed:\n{tail}")
+    loaded = set(proc.stdout.strip().split(","))
+    return parse_importtime(proc.stderr), loaded
+
+
+def measure(name, runs):
+    cwd, module = TARGETS[name]
+    import_once(cwd, module)  # writes the .pyc files so every timed run is a warm-disk start
+    totals, own = [], []
+    modules = loaded = None
+    for _ in range(runs):
+        modules, loaded = import_once(cwd, module)
+        totals.append(sum(self_us for self_us, _ in modules.values()) / 1000)
+        own.append(modules.get(module, (0, 0))[1] / 1000)
+    return {
+        "total_ms": round(sorted(totals)[runs // 2], 1),
+        "target_ms": round(sorted(own)[runs // 2], 1),
+        "modules": len(modules),
+        "lazy_loaded": sorted(m for m in LAZY_MODULES if m in loaded),
+    }, by_package(modules)
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, slack_ms=DEFAULT_SLACK_MS):
+    regressions = []
+    for name, row in results.items():
+        if row["lazy_loaded"]:
+            regressions.append(f"{name}: imports {', '.join(row['lazy_loaded'])} at startup")
+        base = baseline.get(name)
+        if base is None:
+            continue
+        limit = base["total_ms"] * (1 + tolerance) + slack_ms
+        if row["total_ms"] > limit:
+            regressions.append(f"{name}: total_ms {row['total_ms']:.1f} > {limit:.1f} "
+                               f"(baseline {base['total_ms']:.1f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS))
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    parser.add_argument("--top", type=int, default=10, help="Heaviest packages to list")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument("--slack-ms", type=float, default=DEFAULT_SLACK_MS)
+    args = parser.parse_args()
+
+    results = {}
+    for name in args.target or list(TARGETS):
+        row, packages = measure(name, args.runs)
+        results[name] = row
+        print(f"{name:<8} {row['total_ms']:>8.1f} ms total  ({row['target_ms']:.1f} ms in "
+              f"{TARGETS[name][1]}, {row['modules']} modules, median of {args.runs})")
+        for package, ms in packages[:args.top]:
+            print(f"    {package:<24} {ms:>8.1f} ms")
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"environment": {"python": platform.python_version(), "platform": platform.platform()},
+                       "results": results}, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}")
+        return
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    regressions = compare(results, baseline, args.tolerance, args.slack_ms)
+    if regressions:
+        print(f"\nREGRESSION: {len(regressions)} check(s) failed")
+        for line in regressions:
+            print(f"  {line}")
+        raise SystemExit(1)
+    print("\nno regressions" + (" against the baseline" if baseline else " (no baseline to compare with)"))
+
+
+if __name__ == "__main__":
+    main()
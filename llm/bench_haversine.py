@@ -0,0 +1,65 @@
+"""
+Nearest-candidate search over 10k points: the old scalar math.haversine loop
+vs the vectorized one-to-many, top-k and many-to-many helpers.
+
+    python bench_haversine.py --points 10000
+"""
+import argparse
+import math
+import random
+import timeit
+
+import numpy as np
+
+from components.dhelper import haversine, haversine_matrix, nearest, top_k
+
+
+def scalar_haversine(lat1, lon1, lat2, lon2):
+    R = 6371000
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = math.radians(lat2 - lat1)
+    dlambda = math.radians(lon2 - lon1)
+
+    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
+    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+
+def scalar_nearest(lat, lng, points):
+    best, closest = float("inf"), None
+    for i, (plat, plng) in enumerate(points):
+        dist = scalar_haversine(lat, lng, plat, plng)
+        if dist < best:
+            best, closest = dist, i
+    return closest, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--points", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    points = [(rng.uniform(18.40, 18.70), rng.uniform(73.70, 74.00)) for _ in range(args.points)]
+    lats = np.array([p[0] for p in points])
+    lngs = np.array([p[1] for p in points])
+    lat, lng = 18.5204, 73.8567
+
+    assert scalar_nearest(lat, lng, points)[0] == nearest(lat, lng, lats, lngs)[0]
+
+    def per_call(fn, repeat=args.repeat):
+        return timeit.timeit(fn, number=repeat) / repeat * 1e3
+
+    print(f"candidates                 {args.points}")
+    print(f"scalar loop + min          {per_call(lambda: scalar_nearest(lat, lng, points)):9.3f} ms")
+    print(f"vectorized one-to-many     {per_call(lambda: haversine(lat, lng, lats, lngs)):9.3f} ms")
+    print(f"vectorized argmin          {per_call(lambda: nearest(lat, lng, lats, lngs)):9.3f} ms")
+    print(f"vectorized top-10          {per_call(lambda: top_k(lat, lng, lats, lngs, 10)):9.3f} ms")
+
+    sample = 1000
+    print(f"matrix {sample}x{sample}           "
+          f"{per_call(lambda: haversine_matrix(lats[:sample], lngs[:sample], lats[:sample], lngs[:sample]), 3):9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Concurrent journeys through the real /stark handler and journey engine.
+
+Every simulated rider sends "hi", a destination somewhere in Pune and "yes"
+to the /stark router in-process (httpx ASGITransport), and "ok" at the metro
+station when the plan has a second leg.  Legs end through the simulated
+tracker after ``--leg-seconds``; journeyDetails writes go to FakeSupabase;
+driver matching and WhatsApp delivery are stubbed, since they belong to
+other services.
+
+While thousands of legs are parked on the event loop, each message should
+still be answered in about a millisecond; the old handler held a threadpool
+thread (40 by default) for the whole leg, so a worker could not run more
+than that many journeys at once.
+
+    python bench_journey_engine.py --journeys 2000 --leg-seconds 0.5
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import httpx
+from fastapi import FastAPI
+
+import llm
+from components.fake_supabase import FakeSupabase
+from components.supabase_setup import set_supabase
+
+# AnyIO's default thread limiter, which FastAPI uses for sync endpoints.
+DEFAULT_THREADPOOL_SIZE = 40
+PUNE = (18.5204, 73.8567)
+
+
+def stub_services(latency: float, rng):
+    db = FakeSupabase(latency=latency)
+    set_supabase(db)
+    rides = itertools.count()
+
+    async def booking_agent_request(start, end):
+        return {"ride_id": f"ride-{next(rides)}", "driver": "Ravi", "eta": "4 mins"}
+
+    async def release_ride(ride_id):
+        pass
+
+    def llm_extract_destination(message):
+        # Spread across the city so both direct cabs and metro journeys are planned.
+        return {"name": message.title(), "lat": PUNE[0] + rng.uniform(-0.12, 0.12),
+                "lng": PUNE[1] + rng.uniform(-0.12, 0.12)}
+
+    llm.llm_extract_destination = llm_extract_destination
+    llm.booking_agent_request = booking_agent_request
+    llm.release_ride = release_ride
+    llm.send_message = lambda username, message: None
+    return db
+
+
+async def ride(client, username, rng, latencies, poll):
+    async def send(message, **location):
+        started = time.perf_counter()
+        response = await client.post("/stark/", json={"username": username, "message": message, **location})
+        latencies.append(time.perf_counter() - started)
+        response.raise_for_status()
+        return response.json()
+
+    await send("hi")
+    await send("Hinjewadi Phase 3", latitude=PUNE[0] + rng.uniform(-0.1, 0.1),
+               longitude=PUNE[1] + rng.uniform(-0.1, 0.1))
+    await send("yes")
+
+    legs = 1
+    while True:
+        ctx = llm.JOURNEY_CONTEXT.for_user(username)
+        if ctx is None:
+            return legs
+        if ctx["state"] == llm.StateEnum.MID:
+            await send("ok")
+            legs += 1
+        await asyncio.sleep(poll)
+
+
+async def run(journeys: int, leg_seconds: float, rng):
+    llm.TRACKING_SIMULATION_SECONDS = leg_seconds
+    app = FastAPI()
+    app.include_router(llm.router)
+    latencies = []
+    peak = 0
+
+    async def watch():
+        nonlocal peak
+        while True:
+            peak = max(peak, llm.journey_engine.active)
+            await asyncio.sleep(leg_seconds / 20)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        watcher = asyncio.create_task(watch())
+        started = time.perf_counter()
+        legs = await asyncio.gather(*(
+            ride(client, f"rider-{i}", rng, latencies, leg_seconds / 10) for i in range(journeys)
+        ))
+        elapsed = time.perf_counter() - started
+        watcher.cancel()
+    await llm.journey_engine.shutdown()
+    return elapsed, sum(legs), peak, sorted(latencies)
+
+
+def percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--journeys", type=int, default=2000)
+    parser.add_argument("--leg-seconds", type=float, default=0.5)
+    parser.add_argument("--latency", type=float, default=0.02, help="FakeSupabase round trip, seconds")
+    parser.add_argument("--threads", type=int, default=DEFAULT_THREADPOOL_SIZE)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    db = stub_services(args.latency, rng)
+    elapsed, legs, peak, latencies = asyncio.run(run(args.journeys, args.leg_seconds, rng))
+    llm.journey_writer.close()
+
+    print(f"{args.journeys} journeys ({legs} legs) in {elapsed:.2f}s, "
+          f"{peak} legs in flight at peak, effective concurrency {legs * args.leg_seconds / elapsed:.1f}")
+    print(f"/stark latency over {len(latencies)} messages: p50 {percentile(latencies, 0.5):.2f} ms  "
+          f"p95 {percentile(latencies, 0.95):.2f} ms  p99 {percentile(latencies, 0.99):.2f} ms")
+    print(f"journeyDetails: {len(db.tables.get('journeyDetails', {}))} rows in {db.round_trips} round trips")
+    blocking = legs * args.leg_seconds / args.threads
+    print(f"blocking legs would need >= {blocking:.2f}s with {args.threads} threadpool threads")
+
+
+if __name__ == "__main__":
+    main()
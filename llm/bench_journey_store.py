@@ -0,0 +1,55 @@
+"""
+Per-message journey lookup with 100k active journeys: the old linear scan over
+JOURNEY_CONTEXT vs the JourneyStore username index.
+
+    python bench_journey_store.py --journeys 100000
+"""
+import argparse
+import random
+import timeit
+
+from components.journey_store import JourneyStore
+
+STATES = ("start", "intransit1", "mid", "intransit2")
+
+
+def build(journeys: int):
+    flat = {}
+    store = JourneyStore()
+    for i in range(journeys):
+        journey_id = f"journey-{i}"
+        ctx = {"username": f"user-{i}", "state": STATES[i % len(STATES)]}
+        flat[journey_id] = dict(ctx)
+        store.add(journey_id, ctx)
+    return flat, store
+
+
+def scan(flat: dict, username: str):
+    for jid, ctx in list(flat.items()):
+        if ctx["username"] == username:
+            return jid, ctx
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--journeys", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    flat, store = build(args.journeys)
+    users = [f"user-{random.randrange(args.journeys)}" for _ in range(args.lookups)]
+
+    scan_s = timeit.timeit(lambda: [scan(flat, u) for u in users], number=1)
+    index_s = timeit.timeit(lambda: [store.for_user(u) for u in users], number=1)
+    by_state_s = timeit.timeit(lambda: store.list_by_state("mid"), number=10) / 10
+
+    per = 1e6 / args.lookups
+    print(f"active journeys       {args.journeys}")
+    print(f"linear scan           {scan_s * per:12.1f} us/lookup")
+    print(f"username index        {index_s * per:12.3f} us/lookup")
+    print(f"list_by_state('mid')  {by_state_s * 1e3:12.2f} ms ({len(store.list_by_state('mid'))} journeys)")
+
+
+if __name__ == "__main__":
+    main()
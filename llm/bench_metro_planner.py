@@ -0,0 +1,47 @@
+"""
+Journey planning throughput on the bundled Pune stations: one trip at a
+time through ``JourneyPlanner.plan`` vs the vectorised ``plan_many`` batch.
+
+    python bench_metro_planner.py --trips 200000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from components.metro_planner import JourneyPlanner
+from components.station_index import StationDirectory
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--trips", type=int, default=200_000)
+    parser.add_argument("--single", type=int, default=2_000, help="trips planned one at a time")
+    args = parser.parse_args()
+
+    planner = JourneyPlanner(StationDirectory())
+    started = time.perf_counter()
+    network = planner.network
+    print(f"network        {(time.perf_counter() - started) * 1000:8.1f} ms "
+          f"({len(network)} stations, {len(network.lines)} lines)")
+
+    rng = np.random.default_rng(1)
+    n = args.trips
+    od = [rng.uniform(18.45, 18.65, n), rng.uniform(73.75, 73.95, n),
+          rng.uniform(18.45, 18.65, n), rng.uniform(73.75, 73.95, n)]
+
+    started = time.perf_counter()
+    for i in range(args.single):
+        planner.plan({"lat": od[0][i], "lng": od[1][i]}, {"lat": od[2][i], "lng": od[3][i]}, k=3)
+    single = (time.perf_counter() - started) / args.single
+    print(f"plan()         {single * 1e6:8.1f} us/trip  ({1 / single:,.0f} trips/s)")
+
+    started = time.perf_counter()
+    _, entry, _ = planner.plan_many(*od)
+    batch = (time.perf_counter() - started) / n
+    print(f"plan_many()    {batch * 1e6:8.1f} us/trip  ({1 / batch:,.0f} trips/s, "
+          f"{(entry >= 0).mean():.1%} by metro)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+journeyDetails writes for two-leg metro journeys: one upsert round trip per
+state transition vs the write-behind buffer, against FakeSupabase.
+
+    python bench_write_behind.py --journeys 2000 --latency 0.02
+"""
+import argparse
+import time
+import uuid
+
+from components.fake_supabase import FakeSupabase
+from components.write_behind import WriteBehindBuffer
+
+STATES = ("start", "intransit1", "mid", "intransit2", "end")
+
+
+def journey_rows(journey_id):
+    yield {
+        "journey_id": journey_id,
+        "username": "bench",
+        "start_lat": 18.52, "start_lng": 73.85,
+        "end_lat": 18.62, "end_lng": 73.80,
+        "state": STATES[0],
+    }
+    for state in STATES[1:]:
+        yield {"journey_id": journey_id, "state": state}
+
+
+def run_direct(journeys, latency):
+    db = FakeSupabase(latency=latency)
+    started = time.perf_counter()
+    for _ in range(journeys):
+        for row in journey_rows(str(uuid.uuid4())):
+            db.table("journeyDetails").upsert(row).execute()
+    return time.perf_counter() - started, 0.0, db
+
+
+def run_write_behind(journeys, latency, max_rows, interval):
+    db = FakeSupabase(latency=latency)
+    writer = WriteBehindBuffer(
+        lambda rows: db.table("journeyDetails").upsert(rows).execute(),
+        key="journey_id", max_rows=max_rows, interval=interval,
+    )
+    started = time.perf_counter()
+    for _ in range(journeys):
+        for row in journey_rows(str(uuid.uuid4())):
+            writer.upsert(row)
+    caller = time.perf_counter() - started
+    writer.close()
+    return caller, time.perf_counter() - started, db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--journeys", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.02)
+    parser.add_argument("--max-rows", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=1.0)
+    args = parser.parse_args()
+
+    caller, _, db = run_direct(args.journeys, args.latency)
+    print(f"direct        caller time {caller:8.3f}s  round trips {db.round_trips:>7}")
+
+    caller, total, db = run_write_behind(args.journeys, args.latency, args.max_rows, args.interval)
+    rows = db.tables["journeyDetails"]
+    assert len(rows) == args.journeys
+    assert all(row["state"] == STATES[-1] and row["username"] for row in rows.values())
+    print(f"write-behind  caller time {caller:8.3f}s  round trips {db.round_trips:>7}  "
+          f"(flushed by {total:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
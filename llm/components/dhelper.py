@@ -1,17 +1,55 @@
-import math
-
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371000  # meters
-
-    phi1 = math.radians(lat1)
-    phi2 = math.radians(lat2)
-
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
-
-    a = (
-        math.sin(dphi / 2) ** 2
-        + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
-    )
-
-    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
\ No newline at end of file
+import numpy as np
+
+EARTH_RADIUS = 6371000  # meters
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in meters.
+
+    Arguments may be scalars or arrays and broadcast like any numpy
+    expression; a plain float is returned when every argument is a scalar.
+    """
+    phi1 = np.radians(lat1)
+    phi2 = np.radians(lat2)
+
+    dphi = phi2 - phi1
+    dlambda = np.radians(np.subtract(lon2, lon1))
+
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    a = np.clip(a, 0.0, 1.0)
+
+    distance = 2 * EARTH_RADIUS * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return float(distance) if np.ndim(distance) == 0 else distance
+
+
+def haversine_matrix(lats1, lngs1, lats2, lngs2):
+    """Pairwise distances, shape ``(len(lats1), len(lats2))``."""
+    lats1 = np.asarray(lats1, dtype=float)[:, None]
+    lngs1 = np.asarray(lngs1, dtype=float)[:, None]
+    return haversine(lats1, lngs1, np.asarray(lats2, dtype=float), np.asarray(lngs2, dtype=float))
+
+
+def nearest(lat, lng, lats, lngs):
+    """Return ``(index, meters)`` of the closest candidate, or None if there are none."""
+    if len(lats) == 0:
+        return None
+    distances = haversine(lat, lng, np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float))
+    i = int(np.argmin(distances))
+    return i, float(distances[i])
+
+
+def top_k(lat, lng, lats, lngs, k: int):
+    """Return ``(indices, meters)`` of the ``k`` closest candidates, closest first."""
+    distances = haversine(lat, lng, np.asarray(lats, dtype=float), np.asarray(lngs, dtype=float))
+    distances = np.atleast_1d(distances)
+    k = min(k, len(distances))
+    if k <= 0:
+        return np.empty(0, dtype=int), np.empty(0)
+
+    if k < len(distances):
+        idx = np.argpartition(distances, k - 1)[:k]
+    else:
+        idx = np.arange(len(distances))
+    idx = idx[np.argsort(distances[idx], kind="stable")]
+    return idx, distances[idx]
@@ -0,0 +1,56 @@
+import threading
+import time
+
+
+class FakeSupabase:
+    """
+    In-memory stand-in for the parts of the Supabase client the backend uses
+    (``table(name).upsert(rows).execute()``), for offline tests and
+    benchmarks.  Every ``execute`` sleeps ``latency`` seconds to model the
+    network round trip and is counted in ``round_trips``.
+    """
+
+    def __init__(self, latency: float = 0.0, primary_keys=None):
+        self.latency = latency
+        self.primary_keys = {"journeyDetails": "journey_id", **(primary_keys or {})}
+        self.tables = {}
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def table(self, name: str):
+        return _FakeTable(self, name)
+
+    def _execute(self, name, rows):
+        time.sleep(self.latency)
+        key = self.primary_keys.get(name, "id")
+        with self._lock:
+            self.round_trips += 1
+            table = self.tables.setdefault(name, {})
+            for row in rows:
+                table.setdefault(row[key], {}).update(row)
+        return _FakeResponse(rows)
+
+
+class _FakeTable:
+    def __init__(self, client, name):
+        self._client = client
+        self._name = name
+
+    def upsert(self, data, **kwargs):
+        rows = data if isinstance(data, list) else [data]
+        return _FakeQuery(self._client, self._name, rows)
+
+
+class _FakeQuery:
+    def __init__(self, client, name, rows):
+        self._client = client
+        self._name = name
+        self._rows = rows
+
+    def execute(self):
+        return self._client._execute(self._name, self._rows)
+
+
+class _FakeResponse:
+    def __init__(self, data):
+        self.data = data
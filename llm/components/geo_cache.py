@@ -0,0 +1,124 @@
+import threading
+import time
+from collections import OrderedDict
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_MISSING = object()
+
+
+def geohash(lat: float, lng: float, precision: int = 7) -> str:
+    """Standard base32 geohash; precision 6 is ~1.2 x 0.6 km, 7 is ~150 m."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                value = value << 1 | 1
+                lng_lo = mid
+            else:
+                value <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                value = value << 1 | 1
+                lat_lo = mid
+            else:
+                value <<= 1
+                lat_hi = mid
+        even = not even
+
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits = 0
+            value = 0
+
+    return "".join(chars)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries also expire ``ttl`` seconds after
+    they were stored.  Hits and misses are counted for the stats endpoints.
+    """
+
+    def __init__(self, maxsize: int = 10_000, ttl: float = 3600.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires = entry
+                if expires > self._clock():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self._clock() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_set(self, key, compute):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+        return default if entry is _MISSING else entry[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+class GeoCache(TTLCache):
+    """
+    ``TTLCache`` keyed by the geohash cell of a point, so lookups from
+    anywhere in the same ~``precision`` cell share one cached answer.
+    """
+
+    def __init__(self, precision: int = 7, maxsize: int = 10_000, ttl: float = 3600.0, clock=time.monotonic):
+        super().__init__(maxsize=maxsize, ttl=ttl, clock=clock)
+        self.precision = precision
+
+    def get_point(self, lat: float, lng: float, compute):
+        return self.get_or_set(geohash(lat, lng, self.precision), compute)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "precision": self.precision}
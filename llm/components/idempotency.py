@@ -0,0 +1,66 @@
+import asyncio
+import os
+import time
+
+from components.geo_cache import TTLCache
+
+IDEMPOTENCY_TTL_SECONDS = float(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(60 * 60)))
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+
+_MISSING = object()
+
+
+class IdempotentRequests:
+    """
+    Responses of completed requests by idempotency key, for replaying
+    duplicates.
+
+    A key is either client supplied (an ``Idempotency-Key`` header) or names
+    one step of a journey, ``(username, journey_id, step)``.  The first
+    request with a key runs and its response is kept in a ``TTLCache``;
+    repeats within the TTL get that response back without running again, and
+    repeats that arrive while it is still running wait for it.  ``None``
+    means nothing was done, so it is not kept and the next request retries.
+    """
+
+    def __init__(self, maxsize: int = IDEMPOTENCY_CACHE_SIZE, ttl: float = IDEMPOTENCY_TTL_SECONDS,
+                 clock=time.monotonic):
+        self.responses = TTLCache(maxsize=maxsize, ttl=ttl, clock=clock)
+        self._inflight = {}  # key -> Future resolved when the running request finishes
+        self.runs = 0
+        self.replays = 0
+
+    def get(self, key, default=None):
+        return self.responses.get(key, default)
+
+    async def run(self, key, operation):
+        """The response of ``await operation()`` for ``key``, run at most once per TTL."""
+        while True:
+            response = self.responses.get(key, _MISSING)
+            if response is not _MISSING:
+                self.replays += 1
+                return response
+            running = self._inflight.get(key)
+            if running is None:
+                break
+            await asyncio.shield(running)
+
+        running = asyncio.get_running_loop().create_future()
+        self._inflight[key] = running
+        try:
+            response = await operation()
+            self.runs += 1
+            if response is not None:
+                self.responses.set(key, response)
+            return response
+        finally:
+            del self._inflight[key]
+            running.set_result(None)
+
+    def stats(self) -> dict:
+        return {
+            **self.responses.stats(),
+            "in_flight": len(self._inflight),
+            "runs": self.runs,
+            "replays": self.replays,
+        }
@@ -0,0 +1,98 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRACKING_REACHED = "reached"
+
+
+class JourneyEngine:
+    """
+    Runs the in-transit legs of journeys as background tasks on the event loop.
+
+    A leg started with ``start_leg`` waits for a tracking event for its
+    journey, pushed in through ``notify``.  When a ``tracker`` coroutine is
+    configured it races the pushed events, so a simulated tracker can stand in
+    until a real tracking feed exists.  Once the leg ends ``on_arrival`` is
+    awaited with the journey id and the event that ended it.
+    """
+
+    def __init__(self, tracker=None):
+        self._tracker = tracker
+        self._waiters = {}
+        self._tasks = {}
+
+    @property
+    def active(self) -> int:
+        return len(self._tasks)
+
+    def is_tracking(self, journey_id) -> bool:
+        return journey_id in self._tasks
+
+    def start_leg(self, journey_id, on_arrival):
+        """Start waiting for the current leg of ``journey_id`` to finish."""
+        self.cancel(journey_id)
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        task = loop.create_task(self._run_leg(journey_id, waiter, on_arrival))
+
+        self._waiters[journey_id] = waiter
+        self._tasks[journey_id] = task
+        task.add_done_callback(lambda t: self._forget(journey_id, t))
+        return task
+
+    def notify(self, journey_id, event: str = TRACKING_REACHED) -> bool:
+        """Feed a tracking event to the leg waiting on ``journey_id``."""
+        waiter = self._waiters.get(journey_id)
+        if waiter is None or waiter.done():
+            return False
+        waiter.set_result(event)
+        return True
+
+    def cancel(self, journey_id) -> bool:
+        task = self._tasks.get(journey_id)
+        if task is None:
+            return False
+        task.cancel()
+        # A task cancelled before its first step never reaches _run_leg's
+        # cleanup, so drop the waiter here or notify() would still accept it.
+        waiter = self._waiters.pop(journey_id, None)
+        if waiter is not None:
+            waiter.cancel()
+        return True
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_leg(self, journey_id, waiter, on_arrival):
+        try:
+            event = await self._wait_for_event(journey_id, waiter)
+        finally:
+            if self._waiters.get(journey_id) is waiter:
+                del self._waiters[journey_id]
+
+        try:
+            await on_arrival(journey_id, event)
+        except Exception:
+            logger.exception("Journey %s failed while handling %r", journey_id, event)
+
+    async def _wait_for_event(self, journey_id, waiter):
+        if self._tracker is None:
+            return await waiter
+
+        tracker = asyncio.ensure_future(self._tracker(journey_id))
+        try:
+            done, _ = await asyncio.wait(
+                {waiter, tracker}, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            tracker.cancel()
+        return waiter.result() if waiter in done else tracker.result()
+
+    def _forget(self, journey_id, task):
+        if self._tasks.get(journey_id) is task:
+            del self._tasks[journey_id]
@@ -0,0 +1,294 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+JOURNEY_STORE_BACKEND = os.getenv("JOURNEY_STORE_BACKEND", "memory")
+JOURNEY_STORE_DB_PATH = os.getenv("JOURNEY_STORE_DB_PATH", "journeys.db")
+
+_ANY = object()
+
+
+class JourneyStore:
+    """
+    Active journeys keyed by username, with secondary indexes by journey id
+    and by state, plus the journey id each user is planning while we wait
+    for their destination.
+
+    Each user has at most one active journey; adding a new one replaces the
+    old.  The state index is only kept in sync through ``set_state``, so
+    callers must not assign ``ctx["state"]`` directly; other fields change
+    through ``update`` so the shared stores see them too.
+
+    ``add``, ``set_state`` and ``remove`` are compare-and-set: they return
+    ``None`` instead of acting when the journey is not in the expected state,
+    so of several requests racing on one user's journey only one moves it.
+    This store lives in one process and nothing in it awaits, so each call is
+    atomic on the event loop; ``SQLiteJourneyStore`` shares the same
+    operations between worker processes.
+    """
+
+    def __init__(self):
+        self._by_user = {}
+        self._by_id = {}
+        self._by_state = {}
+        self._awaiting = {}  # username -> id of the journey being planned
+
+    def __len__(self):
+        return len(self._by_id)
+
+    def __contains__(self, journey_id):
+        return journey_id in self._by_id
+
+    # ---- destination being awaited ----
+
+    def await_destination(self, username, journey_id) -> str:
+        """The journey id ``username`` is planning, starting ``journey_id`` if none is."""
+        return self._awaiting.setdefault(username, journey_id)
+
+    def awaiting_destination(self, username):
+        return self._awaiting.get(username)
+
+    def clear_destination(self, username):
+        return self._awaiting.pop(username, None)
+
+    # ---- active journeys ----
+
+    def add(self, journey_id, ctx: dict):
+        """Start tracking ``journey_id``; ``None`` if it is already tracked."""
+        if journey_id in self._by_id:
+            return None
+
+        previous = self._by_user.get(ctx["username"])
+        if previous is not None:
+            self.remove(previous["journey_id"])
+
+        ctx["journey_id"] = journey_id
+        self._by_user[ctx["username"]] = ctx
+        self._by_id[journey_id] = ctx
+        self._by_state.setdefault(ctx["state"], {})[journey_id] = ctx
+        return ctx
+
+    def get(self, journey_id):
+        return self._by_id.get(journey_id)
+
+    def for_user(self, username):
+        return self._by_user.get(username)
+
+    def set_state(self, journey_id, state, expected=_ANY):
+        """Move the journey to ``state`` if it is in ``expected``; ``None`` if it was not."""
+        ctx = self._by_id.get(journey_id)
+        if ctx is None or (expected is not _ANY and ctx["state"] != expected):
+            return None
+        if ctx["state"] == state:
+            return ctx
+
+        self._unindex_state(journey_id, ctx["state"])
+        ctx["state"] = state
+        self._by_state.setdefault(state, {})[journey_id] = ctx
+        return ctx
+
+    def update(self, journey_id, **fields):
+        ctx = self._by_id.get(journey_id)
+        if ctx is None:
+            return None
+        ctx.update(fields)
+        return ctx
+
+    def remove(self, journey_id, expected=_ANY):
+        ctx = self._by_id.get(journey_id)
+        if ctx is None or (expected is not _ANY and ctx["state"] != expected):
+            return None
+
+        del self._by_id[journey_id]
+        if self._by_user.get(ctx["username"]) is ctx:
+            del self._by_user[ctx["username"]]
+        self._unindex_state(journey_id, ctx["state"])
+        return ctx
+
+    def list_by_state(self, state) -> list:
+        return list(self._by_state.get(state, {}).values())
+
+    def count_by_state(self) -> dict:
+        return {state: len(journeys) for state, journeys in self._by_state.items()}
+
+    def _unindex_state(self, journey_id, state):
+        journeys = self._by_state.get(state)
+        if journeys is None:
+            return
+        journeys.pop(journey_id, None)
+        if not journeys:
+            del self._by_state[state]
+
+
+class SQLiteJourneyStore:
+    """
+    ``JourneyStore`` backed by a SQLite file in WAL mode, so every uvicorn
+    worker on one host sees the same journeys: a "yes" reaching a different
+    worker than the destination still finds the journey.
+
+    Each thread gets its own connection.  Every operation runs in one
+    ``BEGIN IMMEDIATE`` transaction, which makes the compare-and-set calls
+    atomic across processes.  Contexts are stored as JSON and come back as
+    copies, so changes must go through ``update``.  ``state_type`` turns
+    stored states back into the caller's type (e.g. an enum).
+    """
+
+    def __init__(self, path=JOURNEY_STORE_DB_PATH, state_type=str):
+        self.path = path
+        self._state_type = state_type
+        self._local = threading.local()
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS journeys ("
+                " journey_id TEXT PRIMARY KEY,"
+                " username TEXT NOT NULL UNIQUE,"
+                " state TEXT NOT NULL,"
+                " ctx TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_journeys_state ON journeys (state)")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS awaiting_destination ("
+                " username TEXT PRIMARY KEY,"
+                " journey_id TEXT NOT NULL)"
+            )
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM journeys").fetchone()[0]
+
+    def __contains__(self, journey_id):
+        row = self._connect().execute(
+            "SELECT 1 FROM journeys WHERE journey_id = ?", (journey_id,)).fetchone()
+        return row is not None
+
+    # ---- destination being awaited ----
+
+    def await_destination(self, username, journey_id) -> str:
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO awaiting_destination (username, journey_id) VALUES (?, ?)",
+                (username, journey_id),
+            )
+            return conn.execute(
+                "SELECT journey_id FROM awaiting_destination WHERE username = ?", (username,)
+            ).fetchone()[0]
+
+    def awaiting_destination(self, username):
+        row = self._connect().execute(
+            "SELECT journey_id FROM awaiting_destination WHERE username = ?", (username,)).fetchone()
+        return row[0] if row else None
+
+    def clear_destination(self, username):
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT journey_id FROM awaiting_destination WHERE username = ?", (username,)).fetchone()
+            conn.execute("DELETE FROM awaiting_destination WHERE username = ?", (username,))
+        return row[0] if row else None
+
+    # ---- active journeys ----
+
+    def add(self, journey_id, ctx: dict):
+        ctx = {**ctx, "journey_id": journey_id}
+        with self._transaction() as conn:
+            if conn.execute("SELECT 1 FROM journeys WHERE journey_id = ?", (journey_id,)).fetchone():
+                return None
+            conn.execute("DELETE FROM journeys WHERE username = ?", (ctx["username"],))
+            conn.execute(
+                "INSERT INTO journeys (journey_id, username, state, ctx) VALUES (?, ?, ?, ?)",
+                (journey_id, ctx["username"], _state_value(ctx["state"]), _dump(ctx)),
+            )
+        return ctx
+
+    def get(self, journey_id):
+        return self._load(self._connect().execute(
+            "SELECT journey_id, state, ctx FROM journeys WHERE journey_id = ?", (journey_id,)).fetchone())
+
+    def for_user(self, username):
+        return self._load(self._connect().execute(
+            "SELECT journey_id, state, ctx FROM journeys WHERE username = ?", (username,)).fetchone())
+
+    def set_state(self, journey_id, state, expected=_ANY):
+        with self._transaction() as conn:
+            if expected is _ANY:
+                cursor = conn.execute("UPDATE journeys SET state = ? WHERE journey_id = ?",
+                                      (_state_value(state), journey_id))
+            else:
+                cursor = conn.execute("UPDATE journeys SET state = ? WHERE journey_id = ? AND state = ?",
+                                      (_state_value(state), journey_id, _state_value(expected)))
+            if cursor.rowcount == 0:
+                return None
+            return self._load(conn.execute(
+                "SELECT journey_id, state, ctx FROM journeys WHERE journey_id = ?", (journey_id,)).fetchone())
+
+    def update(self, journey_id, **fields):
+        with self._transaction() as conn:
+            ctx = self._load(conn.execute(
+                "SELECT journey_id, state, ctx FROM journeys WHERE journey_id = ?", (journey_id,)).fetchone())
+            if ctx is None:
+                return None
+            ctx.update(fields)
+            conn.execute("UPDATE journeys SET ctx = ? WHERE journey_id = ?", (_dump(ctx), journey_id))
+        return ctx
+
+    def remove(self, journey_id, expected=_ANY):
+        with self._transaction() as conn:
+            ctx = self._load(conn.execute(
+                "SELECT journey_id, state, ctx FROM journeys WHERE journey_id = ?", (journey_id,)).fetchone())
+            if ctx is None or (expected is not _ANY and ctx["state"] != expected):
+                return None
+            conn.execute("DELETE FROM journeys WHERE journey_id = ?", (journey_id,))
+        return ctx
+
+    def list_by_state(self, state) -> list:
+        rows = self._connect().execute(
+            "SELECT journey_id, state, ctx FROM journeys WHERE state = ?", (_state_value(state),))
+        return [self._load(row) for row in rows]
+
+    def count_by_state(self) -> dict:
+        rows = self._connect().execute("SELECT state, COUNT(*) FROM journeys GROUP BY state")
+        return {self._state_type(state): count for state, count in rows}
+
+    def _load(self, row):
+        if row is None:
+            return None
+        journey_id, state, ctx = row
+        return {**json.loads(ctx), "journey_id": journey_id, "state": self._state_type(state)}
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit; writes take the database lock up front in _transaction.
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+
+def _state_value(state):
+    return getattr(state, "value", state)
+
+
+def _dump(ctx: dict) -> str:
+    return json.dumps({k: v for k, v in ctx.items() if k not in ("journey_id", "state")})
+
+
+def create_journey_store(backend=JOURNEY_STORE_BACKEND, state_type=str):
+    if backend == "sqlite":
+        return SQLiteJourneyStore(state_type=state_type)
+    if backend == "memory":
+        return JourneyStore()
+    raise ValueError(f"Unknown JOURNEY_STORE_BACKEND: {backend!r}")
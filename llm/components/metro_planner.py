@@ -0,0 +1,315 @@
+"""
+Cab + metro + cab journey planning.
+
+``MetroNetwork`` turns the station list into a line graph and precomputes
+the in-metro travel time between every pair of stations.  ``JourneyPlanner``
+then scores a trip as first-mile cab + metro + last-mile cab for each
+(entry, exit) pair drawn from the few stations nearest each end, and
+compares that with a direct cab.  ``plan_many`` does the same for a whole
+batch of origin/destination pairs with numpy, one matrix per chunk.
+"""
+import heapq
+import math
+import os
+import threading
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from components.dhelper import haversine, haversine_matrix
+
+# Running speed between stations; stops are added per station as dwell time.
+METRO_SPEED_KMH = float(os.getenv("METRO_SPEED_KMH", "45"))
+METRO_DWELL_SECONDS = float(os.getenv("METRO_DWELL_SECONDS", "30"))
+# Waiting on the platform (half the headway) plus getting through the gates.
+METRO_BOARDING_SECONDS = float(os.getenv("METRO_BOARDING_SECONDS", "360"))
+METRO_TRANSFER_SECONDS = float(os.getenv("METRO_TRANSFER_SECONDS", "300"))
+# A station with no line tag is linked on foot to line stations this close.
+METRO_WALK_LINK_METERS = float(os.getenv("METRO_WALK_LINK_METERS", "300"))
+WALK_SPEED_KMH = float(os.getenv("WALK_SPEED_KMH", "4.5"))
+CAB_SPEED_KMH = float(os.getenv("CAB_SPEED_KMH", "22"))
+CAB_PICKUP_SECONDS = float(os.getenv("CAB_PICKUP_SECONDS", "300"))
+# Roads are ~30% longer than the straight line.
+CAB_DETOUR_FACTOR = float(os.getenv("CAB_DETOUR_FACTOR", "1.3"))
+# Stations considered at each end of a trip.
+PLANNER_CANDIDATES = int(os.getenv("PLANNER_CANDIDATES", "4"))
+PLANNER_SEARCH_RADIUS = float(os.getenv("PLANNER_SEARCH_RADIUS", "5000"))
+
+DIRECT = "direct"
+METRO = "metro"
+
+_CAB_MPS = CAB_SPEED_KMH / 3.6
+_METRO_MPS = METRO_SPEED_KMH / 3.6
+_WALK_MPS = WALK_SPEED_KMH / 3.6
+
+
+def cab_seconds(meters):
+    """Door-to-door cab time for a straight-line distance (scalar or array)."""
+    return CAB_PICKUP_SECONDS + np.asarray(meters) * CAB_DETOUR_FACTOR / _CAB_MPS
+
+
+def station_lines(station):
+    return [line.strip() for line in station.line.split(";") if line.strip()]
+
+
+def line_order(points):
+    """
+    Running order of one line's stations, given only their positions: start
+    at one end of the line (the station furthest from an arbitrary one) and
+    keep stepping to the closest unvisited station.
+    """
+    if len(points) < 3:
+        return list(range(len(points)))
+    lats = np.array([p[0] for p in points])
+    lngs = np.array([p[1] for p in points])
+    current = int(np.argmax(haversine(lats[0], lngs[0], lats, lngs)))
+    order = [current]
+    left = np.ones(len(points), dtype=bool)
+    left[current] = False
+    while left.any():
+        distances = np.where(left, haversine(lats[current], lngs[current], lats, lngs), np.inf)
+        current = int(np.argmin(distances))
+        order.append(current)
+        left[current] = False
+    return order
+
+
+class Plan(NamedTuple):
+    mode: str  # DIRECT | METRO
+    total_s: float
+    first_mile_s: float = 0.0
+    metro_s: float = 0.0
+    last_mile_s: float = 0.0
+    entry: Optional[object] = None  # Station
+    exit: Optional[object] = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "mode": self.mode,
+            "total_min": round(self.total_s / 60),
+            "first_mile_min": round(self.first_mile_s / 60),
+            "metro_min": round(self.metro_s / 60),
+            "last_mile_min": round(self.last_mile_s / 60),
+        }
+        for key, station in (("entry", self.entry), ("exit", self.exit)):
+            if station is not None:
+                data[key] = {"name": station.name, "lat": station.lat, "lng": station.lng}
+        return data
+
+
+class MetroNetwork:
+    """
+    Station-to-station metro times over the lines in a station list.
+
+    Each (station, line) is a platform; consecutive stations on a line are
+    linked by run time plus dwell, and platforms of the same station by the
+    transfer time.  A station without a line tag has no known neighbours, so
+    it is never chained into a line; it is only linked, by a walk plus the
+    transfer time, to line stations within ``METRO_WALK_LINK_METERS``.  With
+    a few hundred stations at most, all pairs are computed up front and
+    queries are array lookups.
+    """
+
+    def __init__(self, stations):
+        self.stations = tuple(stations)
+        n = len(self.stations)
+        self.lats = np.array([s.lat for s in self.stations], dtype=float)
+        self.lngs = np.array([s.lng for s in self.stations], dtype=float)
+
+        platforms = {}  # (station index, line) -> platform id
+        adjacency = []
+        platform_station = []
+
+        def platform(i, line):
+            key = (i, line)
+            if key not in platforms:
+                platforms[key] = len(platform_station)
+                platform_station.append(i)
+                adjacency.append([])
+            return platforms[key]
+
+        by_line = {}
+        unlined = []
+        for i, station in enumerate(self.stations):
+            lines = station_lines(station)
+            if not lines:
+                unlined.append(i)
+            for line in lines:
+                by_line.setdefault(line, []).append(i)
+
+        self.lines = {}
+        for line, members in by_line.items():
+            order = [members[j] for j in line_order([(self.lats[i], self.lngs[i]) for i in members])]
+            self.lines[line] = order
+            for a, b in zip(order, order[1:]):
+                run = float(haversine(self.lats[a], self.lngs[a], self.lats[b], self.lngs[b])) / _METRO_MPS
+                pa, pb = platform(a, line), platform(b, line)
+                adjacency[pa].append((pb, run + METRO_DWELL_SECONDS))
+                adjacency[pb].append((pa, run + METRO_DWELL_SECONDS))
+            for i in order:
+                platform(i, line)
+
+        at_station = {}
+        for (i, _), p in platforms.items():
+            at_station.setdefault(i, []).append(p)
+        for group in at_station.values():
+            for p in group:
+                adjacency[p].extend((q, METRO_TRANSFER_SECONDS) for q in group if q != p)
+
+        # Line-less stations: on foot to the platforms of nearby line stations.
+        lined = dict(at_station)
+        for i in unlined:
+            p = platform(i, None)
+            at_station[i] = [p]
+            meters = haversine(self.lats[i], self.lngs[i], self.lats, self.lngs)
+            for j in np.flatnonzero(meters <= METRO_WALK_LINK_METERS):
+                walk = METRO_TRANSFER_SECONDS + float(meters[j]) / _WALK_MPS
+                for q in lined.get(int(j), ()):
+                    adjacency[p].append((q, walk))
+                    adjacency[q].append((p, walk))
+
+        times = np.full((n, n), np.inf)
+        np.fill_diagonal(times, 0.0)
+        for i, group in at_station.items():
+            best = _dijkstra(adjacency, group)
+            for p, seconds in best.items():
+                j = platform_station[p]
+                if seconds < times[i, j]:
+                    times[i, j] = seconds
+        self.times = times
+        self._index_of = {station: i for i, station in enumerate(self.stations)}
+
+    def __len__(self):
+        return len(self.stations)
+
+    def index_of(self, station) -> Optional[int]:
+        return self._index_of.get(station)
+
+
+def _dijkstra(adjacency, sources):
+    best = {p: 0.0 for p in sources}
+    heap = [(0.0, p) for p in sources]
+    while heap:
+        cost, p = heapq.heappop(heap)
+        if cost > best[p]:
+            continue
+        for q, seconds in adjacency[p]:
+            if cost + seconds < best.get(q, math.inf):
+                best[q] = cost + seconds
+                heapq.heappush(heap, (cost + seconds, q))
+    return best
+
+
+class JourneyPlanner:
+    """
+    Plans trips over the stations in a ``StationDirectory``.  The metro
+    network is rebuilt whenever the directory swaps in a new index, in the
+    thread doing the swap, so requests find it ready.
+    """
+
+    def __init__(self, directory, candidates: int = PLANNER_CANDIDATES,
+                 search_radius: float = PLANNER_SEARCH_RADIUS):
+        self.directory = directory
+        self.candidates = candidates
+        self.search_radius = search_radius
+        self._built = (None, None)  # (station index, network built from it)
+        self._lock = threading.Lock()
+        directory.on_replace(self.warm)
+
+    def warm(self) -> MetroNetwork:
+        """Build the network for the current stations now rather than on the first plan."""
+        return self.network
+
+    @property
+    def network(self) -> MetroNetwork:
+        return self.snapshot()[1]
+
+    def snapshot(self):
+        """
+        ``(station index, network built from it)`` as one immutable pair, so
+        a reload between reading one and the other cannot mix two versions.
+        """
+        index = self.directory.index
+        built = self._built
+        if built[0] is not index:
+            with self._lock:
+                built = self._built
+                if built[0] is not index:
+                    built = self._built = (index, MetroNetwork(index.stations))
+        return built
+
+    def plan(self, start, end, k: int = 3):
+        """
+        Up to ``k`` plans from ``start`` to ``end`` (``{"lat", "lng"}``),
+        fastest first: the direct cab and the best (entry, exit) pairs.
+        """
+        index, network = self.snapshot()
+        direct_s = float(cab_seconds(haversine(start["lat"], start["lng"], end["lat"], end["lng"])))
+        plans = [Plan(DIRECT, direct_s, first_mile_s=direct_s)]
+
+        entries = index.k_nearest(start["lat"], start["lng"], self.candidates, self.search_radius)
+        exits = index.k_nearest(end["lat"], end["lng"], self.candidates, self.search_radius)
+        if entries and exits:
+            entry_idx = np.array([network.index_of(s) for s, _ in entries])
+            exit_idx = np.array([network.index_of(s) for s, _ in exits])
+            first = cab_seconds([d for _, d in entries])
+            last = cab_seconds([d for _, d in exits])
+            metro = network.times[np.ix_(entry_idx, exit_idx)] + METRO_BOARDING_SECONDS
+            total = first[:, None] + metro + last[None, :]
+            # Riding the metro from a station to itself is not a plan.
+            total[entry_idx[:, None] == exit_idx[None, :]] = np.inf
+
+            for flat in np.argsort(total, axis=None)[:k]:
+                a, b = divmod(int(flat), len(exits))
+                if not np.isfinite(total[a, b]):
+                    break
+                plans.append(Plan(METRO, float(total[a, b]), float(first[a]), float(metro[a, b]),
+                                  float(last[b]), entries[a][0], exits[b][0]))
+
+        plans.sort(key=lambda plan: plan.total_s)
+        return plans[:k]
+
+    def plan_many(self, start_lats, start_lngs, end_lats, end_lngs, chunk: int = 4096):
+        """
+        Best plan for every origin/destination pair, vectorised.  Returns
+        ``(total_s, entry, exit)`` arrays; entry/exit are station indices
+        into ``network.stations``, or -1 where the direct cab wins.
+        """
+        network = self.network
+        start_lats, start_lngs = np.asarray(start_lats, dtype=float), np.asarray(start_lngs, dtype=float)
+        end_lats, end_lngs = np.asarray(end_lats, dtype=float), np.asarray(end_lngs, dtype=float)
+        n = len(start_lats)
+        total = cab_seconds(haversine(start_lats, start_lngs, end_lats, end_lngs)).astype(float)
+        entry = np.full(n, -1, dtype=np.intp)
+        exit_ = np.full(n, -1, dtype=np.intp)
+        c = min(self.candidates, len(network))
+        if c == 0:
+            return total, entry, exit_
+
+        metro_times = network.times + METRO_BOARDING_SECONDS
+        np.fill_diagonal(metro_times, np.inf)
+        for lo in range(0, n, chunk):
+            hi = min(n, lo + chunk)
+            first_m = haversine_matrix(start_lats[lo:hi], start_lngs[lo:hi], network.lats, network.lngs)
+            last_m = haversine_matrix(end_lats[lo:hi], end_lngs[lo:hi], network.lats, network.lngs)
+            # The c nearest stations at each end, as in the single-trip planner.
+            near_first = np.argpartition(first_m, c - 1, axis=1)[:, :c]
+            near_last = np.argpartition(last_m, c - 1, axis=1)[:, :c]
+            first_d = np.take_along_axis(first_m, near_first, axis=1)
+            last_d = np.take_along_axis(last_m, near_last, axis=1)
+            first_s = np.where(first_d <= self.search_radius, cab_seconds(first_d), np.inf)
+            last_s = np.where(last_d <= self.search_radius, cab_seconds(last_d), np.inf)
+
+            scores = (first_s[:, :, None]
+                      + metro_times[near_first[:, :, None], near_last[:, None, :]]
+                      + last_s[:, None, :])
+            flat = scores.reshape(hi - lo, -1)
+            best = np.argmin(flat, axis=1)
+            best_s = flat[np.arange(hi - lo), best]
+            a, b = np.divmod(best, c)
+            rows = np.arange(hi - lo)
+            wins = best_s < total[lo:hi]
+            total[lo:hi] = np.where(wins, best_s, total[lo:hi])
+            entry[lo:hi] = np.where(wins, near_first[rows, a], -1)
+            exit_[lo:hi] = np.where(wins, near_last[rows, b], -1)
+        return total, entry, exit_
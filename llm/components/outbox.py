@@ -0,0 +1,133 @@
+import atexit
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class Outbox:
+    """
+    Bounded fire-and-forget queue drained by a background thread.
+
+    ``enqueue`` never blocks: when the queue is full the message is dropped
+    and counted.  A single worker drains messages in FIFO order, so messages
+    to the same user keep their order.  Drained messages go to
+    ``deliver_batch`` in batches of up to ``batch_size`` when the receiver
+    accepts arrays, otherwise to ``deliver`` one at a time.
+
+    ``close`` waits at most ``timeout`` in total: when the queue is too full
+    to take the stop marker (e.g. the relay hangs), the worker is told to
+    stop after its current delivery and the rest of the queue is abandoned.
+    """
+
+    def __init__(self, deliver, deliver_batch=None, maxsize: int = 1000,
+                 batch_size: int = 50):
+        self._deliver = deliver
+        self._deliver_batch = deliver_batch
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._batch_size = batch_size
+        self._lock = threading.Lock()
+        self._worker = None
+        self._abort = threading.Event()
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth,
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+    def enqueue(self, item) -> bool:
+        self._ensure_worker()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """Stop the worker after everything already queued is delivered."""
+        worker = self._worker
+        if worker is None or not worker.is_alive():
+            return
+        deadline = time.monotonic() + timeout
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            self._abort.set()
+        worker.join(max(0.0, deadline - time.monotonic()))
+        if worker.is_alive():
+            self._abort.set()
+            logger.warning("Outbox worker did not stop within %.1fs; %d message(s) not delivered",
+                           timeout, self.depth)
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="outbox", daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while not self._abort.is_set():
+            item = self._queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stop = False
+            while len(batch) < self._batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            self._flush(batch)
+            if stop:
+                return
+
+    def _flush(self, batch):
+        if self._deliver_batch is not None:
+            self._send(self._deliver_batch, batch, len(batch))
+        else:
+            for item in batch:
+                if self._abort.is_set():
+                    return
+                self._send(self._deliver, item, 1)
+
+        with self._lock:
+            self.batches += 1
+
+    def _send(self, deliver, payload, count):
+        try:
+            deliver(payload)
+        except Exception:
+            logger.exception("Outbox failed to deliver %d message(s)", count)
+            with self._lock:
+                self.failed += count
+        else:
+            with self._lock:
+                self.sent += count
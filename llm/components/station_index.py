@@ -0,0 +1,243 @@
+import json
+import math
+import threading
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+from components.dhelper import haversine, top_k
+
+DEFAULT_STATIONS_PATH = Path(__file__).resolve().parents[1] / "data" / "pune_metro_stations.geojson"
+
+# ~1.1 km cells; small enough that a nearest query touches a handful of cells.
+DEFAULT_CELL_DEGREES = 0.01
+METERS_PER_DEGREE = 111_320
+
+# Below this many stations one vectorized pass over all of them beats
+# walking the grid.
+SCAN_ALL_BELOW = 256
+
+_EMPTY_IDX = np.empty(0, dtype=np.intp)
+_EMPTY_DIST = np.empty(0)
+
+
+class Station(NamedTuple):
+    name: str
+    lat: float
+    lng: float
+    line: str = ""
+
+
+class StationIndex:
+    """
+    Immutable grid index over metro stations.
+
+    Stations are bucketed into ``cell_degrees`` square cells.  Nearest and
+    radius queries only look at cells around the query point, widening ring
+    by ring until no unvisited cell can hold anything closer; distances for
+    each ring are computed in one vectorized pass.
+    """
+
+    def __init__(self, stations, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.stations = tuple(stations)
+        self.cell_degrees = cell_degrees
+        self._lats = np.array([s.lat for s in self.stations], dtype=float)
+        self._lngs = np.array([s.lng for s in self.stations], dtype=float)
+
+        cells = {}
+        for i, station in enumerate(self.stations):
+            cells.setdefault(self._cell(station.lat, station.lng), []).append(i)
+        self._cells = {cell: np.array(idx, dtype=np.intp) for cell, idx in cells.items()}
+
+        if self._cells:
+            rows = [row for row, _ in self._cells]
+            cols = [col for _, col in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+            self._max_lat = float(np.abs(self._lats).max())
+        else:
+            self._bounds = None
+            self._max_lat = 0.0
+
+    def __len__(self):
+        return len(self.stations)
+
+    def nearest(self, lat: float, lng: float, max_distance: Optional[float] = None):
+        """Return ``(station, meters)`` for the closest station, or None."""
+        hits = self.k_nearest(lat, lng, 1, max_distance)
+        return hits[0] if hits else None
+
+    def k_nearest(self, lat: float, lng: float, k: int, max_distance: Optional[float] = None):
+        """Return up to ``k`` ``(station, meters)`` pairs, closest first."""
+        if not self._cells or k <= 0:
+            return []
+
+        if len(self.stations) < SCAN_ALL_BELOW:
+            idx, dist = top_k(lat, lng, self._lats, self._lngs, k)
+            if max_distance is not None:
+                keep = dist <= max_distance
+                idx, dist = idx[keep], dist[keep]
+            return self._hits(idx, dist)
+
+        idx, dist = _EMPTY_IDX, _EMPTY_DIST
+        cell_meters = self._cell_meters(lat)
+        for ring, ring_idx in self._rings(lat, lng):
+            if len(ring_idx):
+                idx = np.concatenate((idx, ring_idx))
+                dist = np.concatenate((dist, haversine(lat, lng, self._lats[ring_idx], self._lngs[ring_idx])))
+
+            reach = ring * cell_meters
+            if len(dist) >= k and np.partition(dist, k - 1)[k - 1] <= reach:
+                break
+            if max_distance is not None and reach > max_distance:
+                break
+
+        if max_distance is not None:
+            keep = dist <= max_distance
+            idx, dist = idx[keep], dist[keep]
+        order = np.argsort(dist, kind="stable")[:k]
+        return self._hits(idx[order], dist[order])
+
+    def within(self, lat: float, lng: float, radius: float):
+        """Return every ``(station, meters)`` within ``radius`` meters, closest first."""
+        if not self._cells:
+            return []
+
+        idx, dist = _EMPTY_IDX, _EMPTY_DIST
+        cell_meters = self._cell_meters(lat)
+        for ring, ring_idx in self._rings(lat, lng):
+            if len(ring_idx):
+                ring_dist = haversine(lat, lng, self._lats[ring_idx], self._lngs[ring_idx])
+                keep = ring_dist <= radius
+                idx = np.concatenate((idx, ring_idx[keep]))
+                dist = np.concatenate((dist, ring_dist[keep]))
+            if ring * cell_meters > radius:
+                break
+
+        order = np.argsort(dist, kind="stable")
+        return self._hits(idx[order], dist[order])
+
+    def _hits(self, idx, dist):
+        return [(self.stations[i], float(d)) for i, d in zip(idx, dist)]
+
+    def _cell_meters(self, lat):
+        """Shortest cell side between the query and any station, in meters.
+
+        Everything outside ring ``n`` is at least ``n`` of these away, which
+        is what lets the ring search stop early.
+        """
+        widest_lat = min(max(abs(lat), self._max_lat) + self.cell_degrees, 89.0)
+        return self.cell_degrees * METERS_PER_DEGREE * math.cos(math.radians(widest_lat))
+
+    def _cell(self, lat, lng):
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def _rings(self, lat, lng):
+        """Yield ``(ring, station indices)`` for square rings of cells around the point.
+
+        Rings that have not reached the grid yet hold nothing and are
+        skipped, and only the part of a ring inside the grid is looked at,
+        so a query far from every station costs no more than the grid does.
+        """
+        row, col = self._cell(lat, lng)
+        min_row, max_row, min_col, max_col = self._bounds
+        first_ring = max(min_row - row, row - max_row, min_col - col, col - max_col, 0)
+        last_ring = max(row - min_row, max_row - row, col - min_col, max_col - col, 0)
+
+        for ring in range(first_ring, last_ring + 1):
+            found = []
+            top, bottom, left, right = row - ring, row + ring, col - ring, col + ring
+            for r in range(max(top, min_row), min(bottom, max_row) + 1):
+                if r in (top, bottom):
+                    cols = range(max(left, min_col), min(right, max_col) + 1)
+                else:
+                    cols = (left, right)
+                for c in cols:
+                    cell = self._cells.get((r, c))
+                    if cell is not None:
+                        found.append(cell)
+            yield ring, np.concatenate(found) if found else _EMPTY_IDX
+
+
+def stations_from_geojson(data: dict):
+    stations = []
+    for feature in data.get("features", []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") != "Point":
+            continue
+        lng, lat = geometry["coordinates"][:2]
+        props = feature.get("properties") or {}
+        stations.append(Station(props.get("name", "Metro Station"), lat, lng, props.get("line", "")))
+    return stations
+
+
+def stations_from_overpass(data: dict):
+    return [
+        Station(
+            element.get("tags", {}).get("name", "Metro Station"),
+            element["lat"],
+            element["lon"],
+            element.get("tags", {}).get("line", ""),
+        )
+        for element in data.get("elements", [])
+        if "lat" in element and "lon" in element
+    ]
+
+
+def load_stations(path) -> list:
+    with open(path, encoding="utf-8") as fh:
+        data = json.load(fh)
+    if "elements" in data:
+        return stations_from_overpass(data)
+    return stations_from_geojson(data)
+
+
+class StationDirectory:
+    """
+    Holds the current ``StationIndex`` and swaps it on reload.
+
+    The index is loaded from ``path`` on first use.  ``reload`` and
+    ``replace`` build a new index and publish it in one assignment, so
+    requests in flight keep using the index they started with.  Callbacks
+    registered with ``on_replace`` run after every swap, e.g. to drop caches
+    built from the old data.
+    """
+
+    def __init__(self, path=DEFAULT_STATIONS_PATH, cell_degrees: float = DEFAULT_CELL_DEGREES):
+        self.path = Path(path)
+        self.cell_degrees = cell_degrees
+        self._index = None
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    @property
+    def index(self) -> StationIndex:
+        index = self._index
+        if index is None:
+            with self._lock:
+                if self._index is None:
+                    self._index = StationIndex(self._load(self.path), self.cell_degrees)
+                index = self._index
+        return index
+
+    def reload(self, path=None) -> StationIndex:
+        if path is not None:
+            self.path = Path(path)
+        return self.replace(self._load(self.path))
+
+    def replace(self, stations) -> StationIndex:
+        index = StationIndex(stations, self.cell_degrees)
+        with self._lock:
+            self._index = index
+        for listener in self._listeners:
+            listener()
+        return index
+
+    def on_replace(self, callback):
+        self._listeners.append(callback)
+
+    @staticmethod
+    def _load(path):
+        if not Path(path).exists():
+            return []
+        return load_stations(path)
@@ -1,7 +1,9 @@
 import os
+import threading
 from pathlib import Path
 
-from supabase import Client, create_client
+_client = None
+_lock = threading.Lock()
 
 
 def _load_env_file() -> None:
@@ -25,7 +27,7 @@ def _load_env_file() -> None:
             os.environ.setdefault(key, value)
 
 
-def _create_supabase_client() -> Client:
+def _create_supabase_client():
     _load_env_file()
 
     supabase_url = os.getenv("SUPABASE_URL")
@@ -37,8 +39,34 @@ def _create_supabase_client() -> Client:
             "Set them in environment or .env."
         )
 
+    # Imported here so importing the app doesn't pull in the supabase stack.
+    from supabase import create_client
+
     return create_client(supabase_url, supabase_key)
 
 
-supabase = _create_supabase_client()
+def get_supabase():
+    """
+    The shared Supabase client, created on first use.  Importing this module
+    needs no credentials; a missing configuration fails the first call.
+    """
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = _create_supabase_client()
+    return _client
+
+
+def set_supabase(client) -> None:
+    """Replace the shared client, e.g. with ``FakeSupabase`` in tests and benchmarks."""
+    global _client
+    with _lock:
+        _client = client
+
 
+def __getattr__(name):
+    # ``from components.supabase_setup import supabase`` still works, lazily.
+    if name == "supabase":
+        return get_supabase()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,117 @@
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """
+    Coalesces row upserts per key and writes them in bulk off the request path.
+
+    ``upsert`` merges the row into the pending row for the same key, so a
+    journey that changes state several times between flushes is written once
+    with its latest values.  A background thread flushes when ``max_rows``
+    keys are pending or ``interval`` seconds have passed; ``close`` flushes
+    whatever is left and is registered to run at interpreter exit.
+
+    Rows are grouped by column set before being handed to ``write_rows`` so
+    every bulk upsert has uniform columns.  If a write fails the rows are put
+    back, under any newer values, and retried on the next flush.
+    """
+
+    def __init__(self, write_rows, key: str, max_rows: int = 100, interval: float = 1.0):
+        self._write_rows = write_rows
+        self._key = key
+        self._max_rows = max_rows
+        self._interval = interval
+
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._worker = None
+        self._closed = False
+
+        self.upserts = 0
+        self.rows_written = 0
+        self.round_trips = 0
+        self.failures = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def stats(self) -> dict:
+        return {
+            "pending": self.pending,
+            "upserts": self.upserts,
+            "rows_written": self.rows_written,
+            "round_trips": self.round_trips,
+            "failures": self.failures,
+        }
+
+    def upsert(self, row: dict):
+        self._ensure_worker()
+        with self._cond:
+            self._pending.setdefault(row[self._key], {}).update(row)
+            self.upserts += 1
+            if len(self._pending) >= self._max_rows:
+                self._cond.notify()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                rows, self._pending = self._pending, {}
+            if not rows:
+                return
+
+            groups = {}
+            for row in rows.values():
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+
+            for group in groups.values():
+                try:
+                    self._write_rows(group)
+                except Exception:
+                    logger.exception("Failed to write %d row(s); will retry", len(group))
+                    self._restore(group)
+                    self.failures += 1
+                else:
+                    self.rows_written += len(group)
+                finally:
+                    self.round_trips += 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        if self._worker is not None:
+            self._worker.join()
+        self.flush()
+
+    def _restore(self, rows):
+        with self._cond:
+            for row in rows:
+                newer = self._pending.get(row[self._key])
+                if newer is not None:
+                    row = {**row, **newer}
+                self._pending[row[self._key]] = row
+
+    def _ensure_worker(self):
+        if self._worker is not None:
+            return
+        with self._cond:
+            if self._worker is None and not self._closed:
+                self._worker = threading.Thread(target=self._run, name="write-behind", daemon=True)
+                self._worker.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._pending) < self._max_rows:
+                    self._cond.wait(self._interval)
+                closed = self._closed
+            if closed:
+                return
+            self.flush()
@@ -1,20 +1,51 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import Optional
 from enum import Enum
+import asyncio
+import logging
+import os
 import uuid
-import math
-import requests
+
+from components.geo_cache import GeoCache, geohash
+from components.http_client import get_client
+from components.idempotency import IdempotentRequests
+from components.outbox import Outbox
+from components.station_index import DEFAULT_STATIONS_PATH, StationDirectory, stations_from_overpass
+from components.write_behind import WriteBehindBuffer
+from components.journey_engine import JourneyEngine, TRACKING_REACHED
+from components.journey_store import create_journey_store
+from components.metro_planner import METRO, JourneyPlanner
+from components.supabase_setup import get_supabase
 
 # =============================
 # CONFIG
 # =============================
 
 OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+METRO_SEARCH_RADIUS = 5000  # meters
+# south, west, north, east of the area refreshed from Overpass (Pune)
+METRO_REFRESH_BBOX = (18.40, 73.70, 18.70, 74.00)
+# Geohash precision of the nearest-station cache; 7 is a ~150 m cell.
+METRO_CACHE_PRECISION = int(os.getenv("METRO_CACHE_PRECISION", "7"))
+METRO_CACHE_SIZE = int(os.getenv("METRO_CACHE_SIZE", "10000"))
+METRO_CACHE_TTL = float(os.getenv("METRO_CACHE_TTL_SECONDS", "86400"))
 WHATSAPP_API = "http://localhost:8001/send"
+# Set when the relay accepts a JSON array of messages in one request.
+WHATSAPP_BATCH_SEND = os.getenv("WHATSAPP_BATCH_SEND", "").lower() in {"1", "true", "yes", "on"}
+WHATSAPP_OUTBOX_SIZE = int(os.getenv("WHATSAPP_OUTBOX_SIZE", "1000"))
+
+JOURNEY_FLUSH_ROWS = int(os.getenv("JOURNEY_FLUSH_ROWS", "100"))
+JOURNEY_FLUSH_SECONDS = float(os.getenv("JOURNEY_FLUSH_SECONDS", "1"))
+
+TRACKING_SIMULATION_SECONDS = 5
 
-SUPABASE_URL = "YOUR_URL"
-SUPABASE_KEY = "YOUR_KEY"
+# Driver matching runs in the Backend service
+BACKEND_API = os.getenv("BACKEND_API", "http://localhost:8000/api")
+RIDE_VEHICLE_TYPE = os.getenv("RIDE_VEHICLE_TYPE", "Mini")
+
+logger = logging.getLogger(__name__)
 
 # =============================
 # ROUTER
@@ -45,12 +76,18 @@ class LLMModel(BaseModel):
     longitude: Optional[float] = None
 
 
+class TrackingEvent(BaseModel):
+    event: str = TRACKING_REACHED
+
+
 # =============================
-# MEMORY (Hackathon only)
+# JOURNEY STATE
 # =============================
 
-AWAITING_DESTINATION = set()
-JOURNEY_CONTEXT = {}
+# Journeys and the destinations being awaited.  In-process by default; with
+# JOURNEY_STORE_BACKEND=sqlite every uvicorn worker on the host shares them
+# (see components/journey_store.py).
+JOURNEY_CONTEXT = create_journey_store(state_type=StateEnum)
 
 GREETING_MESSAGES = {"hi", "hello", "hey", "start"}
 
@@ -59,40 +96,53 @@ GREETING_MESSAGES = {"hi", "hello", "hey", "start"}
 # SUPABASE
 # =============================
 
-from supabase import create_client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# The client is created on the first flush, from SUPABASE_URL/SUPABASE_KEY
+# (see components/supabase_setup.py); set_supabase() swaps it in tests.
+
+def write_journey_rows(rows: list):
+    get_supabase().table("journeyDetails").upsert(rows).execute()
+
+
+# Upserts are coalesced per journey and written in bulk by a background
+# thread, so state transitions never wait on a Supabase round trip.
+journey_writer = WriteBehindBuffer(
+    write_journey_rows,
+    key="journey_id",
+    max_rows=JOURNEY_FLUSH_ROWS,
+    interval=JOURNEY_FLUSH_SECONDS,
+)
 
 
 def insert_journey_details(data: dict):
-    supabase.table("journeyDetails").upsert(data).execute()
+    journey_writer.upsert(data)
 
 
 # =============================
 # WHATSAPP MESSAGE
 # =============================
 
-def send_message(username: str, message: str):
-    try:
-        requests.post(WHATSAPP_API, json={
-            "username": username,
-            "message": message
-        })
-    except Exception:
-        pass
+def deliver_message(item: dict):
+    get_client().post(WHATSAPP_API, json=item).raise_for_status()
 
 
-# =============================
-# DISTANCE
-# =============================
+def deliver_messages(batch: list):
+    get_client().post(WHATSAPP_API, json=batch).raise_for_status()
+
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371000
-    phi1, phi2 = math.radians(lat1), math.radians(lat2)
-    dphi = math.radians(lat2 - lat1)
-    dlambda = math.radians(lon2 - lon1)
+# Messages are sent by a background worker so a slow relay never adds
+# latency to /stark; per-user order is kept.
+whatsapp_outbox = Outbox(
+    deliver_message,
+    deliver_batch=deliver_messages if WHATSAPP_BATCH_SEND else None,
+    maxsize=WHATSAPP_OUTBOX_SIZE,
+)
 
-    a = math.sin(dphi/2)**2 + math.cos(phi1)*math.cos(phi2)*math.sin(dlambda/2)**2
-    return 2 * R * math.atan2(math.sqrt(a), math.sqrt(1-a))
+
+def send_message(username: str, message: str):
+    whatsapp_outbox.enqueue({
+        "username": username,
+        "message": message
+    })
 
 
 # =============================
@@ -112,66 +162,102 @@ def llm_extract_destination(message: str):
 # METRO FINDER (OSM)
 # =============================
 
-def find_nearest_metro_or_direct(start, end):
+# Stations come from a local OSM/GeoJSON extract loaded once into a grid
+# index; Overpass is only used to refresh that extract.
+metro_stations = StationDirectory(os.getenv("METRO_STATIONS_PATH", DEFAULT_STATIONS_PATH))
+
+# Best plan per (start cell, destination cell); riders travelling between the
+# same neighbourhoods share one answer until the station data is reloaded.
+metro_cache = GeoCache(
+    precision=METRO_CACHE_PRECISION,
+    maxsize=METRO_CACHE_SIZE,
+    ttl=METRO_CACHE_TTL,
+)
+metro_stations.on_replace(metro_cache.clear)
+
+journey_planner = JourneyPlanner(metro_stations, search_radius=METRO_SEARCH_RADIUS)
+
+
+def refresh_stations_from_overpass():
+    south, west, north, east = METRO_REFRESH_BBOX
 
     query = f"""
     [out:json];
     node["railway"="station"]["station"="subway"]
-    (around:5000,{start['lat']},{start['lng']});
+    ({south},{west},{north},{east});
     out;
     """
 
-    try:
-        res = requests.post(OVERPASS_URL, data={"data": query})
-        data = res.json()
-    except:
-        return end
-
-    if not data.get("elements"):
-        return end
-
-    closest = None
-    best = float("inf")
-
-    for s in data["elements"]:
-        dist = haversine(start["lat"], start["lng"], s["lat"], s["lon"])
-        if dist < best:
-            best = dist
-            closest = {
-                "name": s.get("tags", {}).get("name", "Metro Station"),
-                "lat": s["lat"],
-                "lng": s["lon"]
-            }
-
-    direct_dist = haversine(
-        start["lat"], start["lng"],
-        end["lat"], end["lng"]
+    res = get_client().post(OVERPASS_URL, data={"data": query}, idempotent=True)
+    res.raise_for_status()
+    return metro_stations.replace(stations_from_overpass(res.json()))
+
+
+def plan_journey(start, end):
+    """Fastest plan between two points: a direct cab, or cab + metro + cab."""
+    key = (
+        geohash(start["lat"], start["lng"], metro_cache.precision),
+        geohash(end["lat"], end["lng"], metro_cache.precision),
     )
+    return metro_cache.get_or_set(key, lambda: journey_planner.plan(start, end, k=1)[0])
+
 
-    return end if direct_dist <= best else closest
+def station_point(station):
+    return {"name": station.name, "lat": station.lat, "lng": station.lng}
 
 
 # =============================
 # BOOKING AGENT (SIMULATION)
 # =============================
 
-def booking_agent_request(start, end):
+async def booking_agent_request(start, end):
+    """
+    Reserve the nearest available driver at ``start``.  Returns None when no
+    driver is free or the matching service cannot be reached.
+    """
+    ride_id = str(uuid.uuid4())
+    try:
+        # The ride_id makes a retried match return the same reservation.
+        response = await get_client().apost(
+            f"{BACKEND_API}/drivers/match",
+            json={"lat": start["lat"], "lng": start["lng"],
+                  "vehicle_type": RIDE_VEHICLE_TYPE, "ride_id": ride_id},
+            idempotent=True,
+        )
+    except Exception:
+        logger.exception("Driver matching request failed")
+        return None
+    if response.status_code == 404:
+        return None
+    if response.is_error:
+        logger.warning("Driver matching returned %s", response.status_code)
+        return None
+
+    driver = response.json()
     return {
-        "ride_id": str(uuid.uuid4()),
-        "driver": "Rahul",
-        "eta": "5 mins"
+        "ride_id": ride_id,
+        "driver": driver["name"],
+        "eta": driver["eta"]
     }
 
 
+async def release_ride(ride_id):
+    if ride_id is None:
+        return
+    try:
+        await get_client().apost(f"{BACKEND_API}/drivers/release/{ride_id}", idempotent=True)
+    except Exception:
+        logger.exception("Releasing driver for ride %s failed", ride_id)
+
+
 def confirm_booking(journey_id):
     return True
 
 
-def listen_live_tracking(journey_id):
+async def listen_live_tracking(journey_id):
     # simulate waiting
-    import time
-    time.sleep(5)
-    return "reached"
+    await asyncio.sleep(TRACKING_SIMULATION_SECONDS)
+    return TRACKING_REACHED
 
 
 def get_metro_ticket(start, end):
@@ -194,12 +280,142 @@ def set_state(journey_id, username, state, message):
     send_message(username, message)
 
 
+# =============================
+# JOURNEY ENGINE
+# =============================
+
+# Legs run in the background; tracking events (or the simulated tracker)
+# move the journey forward once the rider reaches the leg's endpoint.
+journey_engine = JourneyEngine(tracker=listen_live_tracking)
+
+# Responses by idempotency key, so a double-tapped or redelivered message
+# never books a second driver or repeats a state change.
+stark_requests = IdempotentRequests()
+
+
+# Arrival handlers move the journey on before acting, and do nothing when it
+# has already moved: the tracking event and the simulated tracker of the
+# worker running the leg may both report the same arrival.
+
+async def on_first_leg_arrival(journey_id, event):
+    ctx = JOURNEY_CONTEXT.get(journey_id)
+    if ctx is None:
+        return
+
+    username = ctx["username"]
+
+    if ctx["uses_metro"]:
+        if JOURNEY_CONTEXT.set_state(journey_id, StateEnum.MID, expected=StateEnum.INTRANSIT1) is None:
+            return
+        await release_ride(ctx.get("ride_id"))
+        set_state(journey_id, username, StateEnum.MID,
+                  "Reached metro station.")
+
+        qr = generate_qr(get_metro_ticket(ctx["endpoint"]["name"], ctx["metro_exit"]["name"]))
+        send_message(username, f"Metro Ticket:\n{qr}")
+
+    else:
+        if JOURNEY_CONTEXT.remove(journey_id, expected=StateEnum.INTRANSIT1) is None:
+            return
+        await release_ride(ctx.get("ride_id"))
+        set_state(journey_id, username, StateEnum.END,
+                  "You reached destination. Thank you!")
+
+
+async def on_final_leg_arrival(journey_id, event):
+    ctx = JOURNEY_CONTEXT.remove(journey_id, expected=StateEnum.INTRANSIT2)
+    if ctx is None:
+        return
+
+    await release_ride(ctx.get("ride_id"))
+    set_state(journey_id, ctx["username"], StateEnum.END,
+              "Journey completed. Thank you for using RoadChal!")
+
+
+@router.get("/journeys")
+async def list_journeys(state: Optional[StateEnum] = None):
+    if state is None:
+        return {"counts": {s.value: n for s, n in JOURNEY_CONTEXT.count_by_state().items()}}
+
+    journeys = JOURNEY_CONTEXT.list_by_state(state)
+    return {"state": state.value, "count": len(journeys), "journeys": journeys}
+
+
+@router.get("/outbox")
+async def outbox_stats():
+    return whatsapp_outbox.stats()
+
+
+@router.post("/stations/reload")
+async def reload_stations(source: str = "file"):
+    if source == "overpass":
+        try:
+            index = await run_in_threadpool(refresh_stations_from_overpass)
+        except Exception:
+            raise HTTPException(502, "overpass refresh failed")
+    elif source == "file":
+        index = await run_in_threadpool(metro_stations.reload)
+    else:
+        raise HTTPException(400, "source must be 'file' or 'overpass'")
+
+    return {"source": source, "stations": len(index)}
+
+
+@router.get("/plan")
+async def plan(start_lat: float, start_lng: float, end_lat: float, end_lng: float, k: int = 3):
+    plans = await run_in_threadpool(
+        journey_planner.plan,
+        {"lat": start_lat, "lng": start_lng},
+        {"lat": end_lat, "lng": end_lng},
+        max(1, min(k, 10)),
+    )
+    return {"plans": [p.to_dict() for p in plans]}
+
+
+@router.get("/idempotency")
+async def idempotency_stats():
+    return stark_requests.stats()
+
+
+@router.get("/stations/cache")
+async def station_cache_stats():
+    return metro_cache.stats()
+
+
+@router.post("/tracking/{journey_id}")
+async def tracking_event(journey_id: str, payload: Optional[TrackingEvent] = None):
+    event = payload.event if payload else TRACKING_REACHED
+
+    if not journey_engine.notify(journey_id, event):
+        # With a shared journey store the leg may be running in another
+        # worker.  Handle the arrival here; that worker's handler will find
+        # the journey already moved on.
+        ctx = JOURNEY_CONTEXT.get(journey_id)
+        if ctx is None or ctx["state"] not in (StateEnum.INTRANSIT1, StateEnum.INTRANSIT2):
+            raise HTTPException(404, "no journey leg in transit")
+        on_arrival = on_first_leg_arrival if ctx["state"] == StateEnum.INTRANSIT1 else on_final_leg_arrival
+        await on_arrival(journey_id, event)
+
+    return {"status": "accepted"}
+
+
 # =============================
 # MAIN WORKFLOW
 # =============================
 
 @router.post("/")
-def stark(payload: LLMModel):
+async def stark(payload: LLMModel, idempotency_key: Optional[str] = Header(None)):
+    """
+    One chat message.  With an ``Idempotency-Key`` header (e.g. the WhatsApp
+    message id) a redelivered message gets the stored response back.
+    """
+    if idempotency_key:
+        return await stark_requests.run((payload.username, "client", idempotency_key),
+                                        lambda: handle_message(payload))
+    return await handle_message(payload)
+
+
+async def handle_message(payload: LLMModel):
 
     username = payload.username
     message = payload.message.strip().lower()
@@ -209,102 +425,140 @@ def stark(payload: LLMModel):
 
     # ---- Greeting ----
     if message in GREETING_MESSAGES:
-        AWAITING_DESTINATION.add(username)
+        # A repeated greeting keeps the journey id, so a destination sent
+        # twice still books once.
+        JOURNEY_CONTEXT.await_destination(username, str(uuid.uuid4()))
         send_message(username, "Welcome to RoadChal! Where do you want to go?")
         return {"status": "awaiting_destination"}
 
     # ---- Destination input ----
-    if username in AWAITING_DESTINATION:
+    journey_id = JOURNEY_CONTEXT.awaiting_destination(username)
+    if journey_id is not None:
 
         if payload.latitude is None or payload.longitude is None:
             send_message(username, "Please share your live location.")
             return {"status": "missing_location"}
 
-        dest = llm_extract_destination(payload.message)
-
-        start = {"lat": payload.latitude, "lng": payload.longitude}
-        journey_id = str(uuid.uuid4())
-
-        endpoint = find_nearest_metro_or_direct(start, dest)
-
-        uses_metro = endpoint != dest
-
-        insert_journey_details({
-            "username": username,
-            "journey_id": journey_id,
-            "start_lat": start["lat"],
-            "start_lng": start["lng"],
-            "end_lat": endpoint["lat"],
-            "end_lng": endpoint["lng"],
-            "state": StateEnum.START.value,
-        })
-
-        JOURNEY_CONTEXT[journey_id] = {
-            "username": username,
-            "start": start,
-            "destination": dest,
-            "endpoint": endpoint,
-            "uses_metro": uses_metro,
-            "state": StateEnum.START
-        }
-
-        ride = booking_agent_request(start, endpoint)
-
-        send_message(
-            username,
-            f"Ride found to {endpoint['name']}.\n"
-            f"Driver {ride['driver']} arriving in {ride['eta']}.\n"
-            "Reply YES to confirm."
-        )
-
-        AWAITING_DESTINATION.remove(username)
-        return {"journey_id": journey_id}
+        return await stark_requests.run((username, journey_id, "book"),
+                                        lambda: start_journey(payload, journey_id))
 
     # ---- Continue journey ----
-    for jid, ctx in list(JOURNEY_CONTEXT.items()):
-        if ctx["username"] != username:
-            continue
+    ctx = JOURNEY_CONTEXT.for_user(username)
+
+    if ctx is not None:
+        jid = ctx["journey_id"]
 
         if ctx["state"] == StateEnum.START and message == "yes":
+            response = await stark_requests.run((username, jid, "confirm"),
+                                                lambda: confirm_journey(jid, username))
+            return response or {"status": StateEnum.INTRANSIT1.value, "journey_id": jid}
 
-            confirm_booking(jid)
-            set_state(jid, username, StateEnum.INTRANSIT1,
-                      "Ride confirmed. Heading to metro.")
+        if ctx["state"] == StateEnum.MID:
+            response = await stark_requests.run((username, jid, "final_ride"),
+                                                lambda: book_final_ride(jid, ctx))
+            return response or {"status": StateEnum.MID.value, "journey_id": jid}
 
-            listen_live_tracking(jid)
+        if ctx["state"] in (StateEnum.INTRANSIT1, StateEnum.INTRANSIT2):
+            return {"status": ctx["state"].value, "journey_id": jid}
 
-            if ctx["uses_metro"]:
-                set_state(jid, username, StateEnum.MID,
-                          "Reached metro station.")
+    send_message(username, "Say HI to begin.")
+    return {"status": "idle"}
 
-                qr = generate_qr(get_metro_ticket("A", "B"))
-                send_message(username, f"Metro Ticket:\n{qr}")
 
-                ctx["state"] = StateEnum.MID
-                return {"status": "metro_phase"}
+async def start_journey(payload: LLMModel, journey_id):
+    username = payload.username
+    dest = llm_extract_destination(payload.message)
+    start = {"lat": payload.latitude, "lng": payload.longitude}
+
+    # A cache miss plans with numpy (and builds the metro network on first
+    # use), so keep it off the event loop.
+    plan = await run_in_threadpool(plan_journey, start, dest)
+    uses_metro = plan.mode == METRO
+    endpoint = station_point(plan.entry) if uses_metro else dest
+
+    previous = JOURNEY_CONTEXT.for_user(username)
+    added = JOURNEY_CONTEXT.add(journey_id, {
+        "username": username,
+        "start": start,
+        "destination": dest,
+        "endpoint": endpoint,
+        "metro_exit": station_point(plan.exit) if uses_metro else None,
+        "uses_metro": uses_metro,
+        "state": StateEnum.START
+    })
+    if added is None:
+        # The same destination is being booked by another worker.
+        return {"status": "duplicate", "journey_id": journey_id}
 
-            else:
-                set_state(jid, username, StateEnum.END,
-                          "You reached destination. Thank you!")
-                JOURNEY_CONTEXT.pop(jid)
-                return {"status": "completed"}
+    if previous is not None and previous["journey_id"] != journey_id:
+        # The new journey replaced one still under way: stop its leg and
+        # free its driver rather than leaving them to the reservation TTL.
+        journey_engine.cancel(previous["journey_id"])
+        insert_journey_details({"journey_id": previous["journey_id"], "state": StateEnum.END.value})
+        await release_ride(previous.get("ride_id"))
 
-        if ctx["state"] == StateEnum.MID:
+    insert_journey_details({
+        "username": username,
+        "journey_id": journey_id,
+        "start_lat": start["lat"],
+        "start_lng": start["lng"],
+        "end_lat": endpoint["lat"],
+        "end_lng": endpoint["lng"],
+        "state": StateEnum.START.value,
+    })
 
-            ride = booking_agent_request(
-                ctx["endpoint"], ctx["destination"]
-            )
+    ride = await booking_agent_request(start, endpoint)
+    JOURNEY_CONTEXT.clear_destination(username)
 
-            set_state(jid, username, StateEnum.INTRANSIT2,
-                      "Final ride started.")
+    if ride is None:
+        set_state(journey_id, username, StateEnum.END,
+                  "No driver is available near you right now. Say HI to try again.")
+        JOURNEY_CONTEXT.remove(journey_id)
+        return {"status": "no_driver", "journey_id": journey_id}
 
-            listen_live_tracking(jid)
+    JOURNEY_CONTEXT.update(journey_id, ride_id=ride["ride_id"])
+    route = (
+        f"Ride found to {endpoint['name']}, then metro to {plan.exit.name} "
+        f"(about {round(plan.total_s / 60)} min in total).\n"
+        if uses_metro else f"Ride found to {endpoint['name']}.\n"
+    )
+    send_message(
+        username,
+        route
+        + f"Driver {ride['driver']} arriving in {ride['eta']}.\n"
+        "Reply YES to confirm."
+    )
 
-            set_state(jid, username, StateEnum.END,
-                      "Journey completed. Thank you for using RoadChal!")
+    return {"journey_id": journey_id}
 
-            JOURNEY_CONTEXT.pop(jid)
-            return {"status": "completed"}
 
-    send_message(username, "Say HI to begin.")
-    return {"status": "idle"}
\ No newline at end of file
+async def confirm_journey(jid, username):
+    if JOURNEY_CONTEXT.set_state(jid, StateEnum.INTRANSIT1, expected=StateEnum.START) is None:
+        # Confirmed by another worker (or the journey ended) meanwhile.
+        return None
+    confirm_booking(jid)
+    set_state(jid, username, StateEnum.INTRANSIT1,
+              "Ride confirmed. Heading to metro.")
+
+    journey_engine.start_leg(jid, on_first_leg_arrival)
+    return {"status": StateEnum.INTRANSIT1.value, "journey_id": jid}
+
+
+async def book_final_ride(jid, ctx):
+    username = ctx["username"]
+    ride = await booking_agent_request(
+        ctx["metro_exit"], ctx["destination"]
+    )
+    if ride is None:
+        send_message(username, "No driver is free at the station yet. Send any message to retry.")
+        return None
+    if JOURNEY_CONTEXT.set_state(jid, StateEnum.INTRANSIT2, expected=StateEnum.MID) is None:
+        # Another worker started the final ride first; keep its driver only.
+        await release_ride(ride["ride_id"])
+        return None
+    JOURNEY_CONTEXT.update(jid, ride_id=ride["ride_id"])
+    set_state(jid, username, StateEnum.INTRANSIT2,
+              "Final ride started.")
+
+    journey_engine.start_leg(jid, on_final_leg_arrival)
+    return {"status": StateEnum.INTRANSIT2.value, "journey_id": jid}
@@ -0,0 +1,53 @@
+from components.geo_cache import GeoCache, TTLCache, geohash
+from components.station_index import Station, StationDirectory
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_geohash_known_value():
+    assert geohash(57.64911, 10.40744, 11) == "u4pruydqqvj"
+    assert geohash(18.5204, 73.8567, 7).startswith(geohash(18.5204, 73.8567, 5))
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=2, ttl=10, clock=clock)
+
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 2
+
+
+def test_nearby_points_share_a_cell_and_reload_invalidates():
+    directory = StationDirectory(path="/nonexistent")
+    directory.replace([Station("PCMC", 18.6296, 73.7997)])
+    cache = GeoCache(precision=6)
+    directory.on_replace(cache.clear)
+    calls = []
+
+    def lookup(lat, lng):
+        def compute():
+            calls.append((lat, lng))
+            return directory.index.nearest(lat, lng)[0].name
+        return cache.get_point(lat, lng, compute)
+
+    assert lookup(18.6200, 73.8000) == "PCMC"
+    assert lookup(18.6201, 73.8001) == "PCMC"
+    assert len(calls) == 1
+
+    directory.replace([Station("Sant Tukaram Nagar", 18.6197, 73.8093)])
+    assert lookup(18.6201, 73.8001) == "Sant Tukaram Nagar"
+    assert len(calls) == 2
@@ -0,0 +1,154 @@
+import asyncio
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+
+from components.http_client import OutboundClient
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        with server.lock:
+            server.hits += 1
+            server.ports.add(self.client_address[1])
+            server.in_flight += 1
+            server.peak = max(server.peak, server.in_flight)
+            status = server.statuses.pop(0) if server.statuses else 200
+        try:
+            time.sleep(server.delay)
+            body = b'{"ok": true}'
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+    do_POST = do_GET
+
+    def log_message(self, *args):
+        pass
+
+
+@contextmanager
+def stub_server(delay=0.0, statuses=()):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.hits = server.in_flight = server.peak = 0
+    server.ports = set()
+    server.delay = delay
+    server.statuses = list(statuses)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_reuses_keepalive_connection():
+    client = OutboundClient()
+    with stub_server() as (server, url):
+        for _ in range(5):
+            assert client.get(url).json() == {"ok": True}
+    client.close()
+
+    assert server.hits == 5
+    assert len(server.ports) == 1
+
+
+def test_retries_with_backoff_then_succeeds():
+    client = OutboundClient(retries=2, backoff=0.01)
+    with stub_server(statuses=[503, 503]) as (server, url):
+        response = client.get(url)
+    client.close()
+
+    stats = client.stats[url.split("//")[1]]
+    assert response.status_code == 200
+    assert server.hits == 3
+    assert stats.retries == 2
+    assert stats.requests == 3
+    assert stats.errors == 2
+
+
+def test_post_does_not_retry_gateway_errors():
+    client = OutboundClient(retries=2, backoff=0.01)
+    with stub_server(statuses=[502]) as (server, url):
+        response = client.post(url, json={})
+        assert client.post(url, json={}, idempotent=True).status_code == 200
+    client.close()
+
+    assert response.status_code == 502
+    assert server.hits == 2
+
+
+def test_timeout_raises():
+    client = OutboundClient(timeout=0.05, retries=0)
+    with stub_server(delay=0.5) as (_, url):
+        with pytest.raises(httpx.TimeoutException):
+            client.get(url)
+    client.close()
+
+
+def test_per_host_limit_caps_concurrency():
+    client = OutboundClient(per_host_limit=2)
+    with stub_server(delay=0.05) as (server, url):
+        threads = [threading.Thread(target=client.get, args=(url,)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    client.close()
+
+    assert server.hits == 8
+    assert server.peak <= 2
+
+
+def test_async_requests_share_limit_and_stats():
+    client = OutboundClient(per_host_limit=3)
+
+    async def run(url):
+        responses = await asyncio.gather(*(client.aget(url) for _ in range(9)))
+        await client.aclose()
+        return responses
+
+    with stub_server(delay=0.05) as (server, url):
+        responses = asyncio.run(run(url))
+
+    assert all(r.status_code == 200 for r in responses)
+    assert server.peak <= 3
+    assert client.stats[url.split("//")[1]].requests == 9
+
+
+def test_backoff_releases_the_host_slot_and_observes_attempts():
+    observed = []
+    client = OutboundClient(per_host_limit=1, retries=1, backoff=0.5,
+                            observe=lambda host, seconds, failed: observed.append(failed))
+    with stub_server(statuses=[503]) as (server, url):
+        retrying = threading.Thread(target=client.get, args=(url,))
+        retrying.start()
+        while server.hits == 0:
+            time.sleep(0.005)
+
+        # The first call is sleeping through its backoff, not holding the slot.
+        started = time.perf_counter()
+        assert client.get(url).status_code == 200
+        assert time.perf_counter() - started < 0.4
+        retrying.join()
+    client.close()
+
+    assert server.hits == 3
+    assert sorted(observed) == [False, False, True]
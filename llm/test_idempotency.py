@@ -0,0 +1,119 @@
+import asyncio
+
+import httpx
+from fastapi import FastAPI
+
+import llm
+from components.idempotency import IdempotentRequests
+from components.journey_store import JourneyStore
+
+
+def test_concurrent_duplicates_run_once_and_none_is_retried():
+    requests = IdempotentRequests()
+    calls = []
+
+    async def book():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"journey_id": "j1"}
+
+    async def main():
+        results = await asyncio.gather(*(requests.run("k", book) for _ in range(5)))
+        assert results == [{"journey_id": "j1"}] * 5
+        assert await requests.run("k", book) == {"journey_id": "j1"}
+
+        async def nothing():
+            calls.append(0)
+
+        assert await requests.run("none", nothing) is None
+        assert await requests.run("none", nothing) is None
+
+    asyncio.run(main())
+    assert calls == [1, 0, 0]
+    assert requests.stats()["replays"] == 5
+
+
+def test_double_tapped_destination_books_one_driver(monkeypatch):
+    booked = []
+
+    async def booking_agent_request(start, end):
+        booked.append(start)
+        await asyncio.sleep(0.01)
+        return {"ride_id": f"ride-{len(booked)}", "driver": "Ravi", "eta": "4 mins"}
+
+    monkeypatch.setattr(llm, "booking_agent_request", booking_agent_request)
+    monkeypatch.setattr(llm, "send_message", lambda username, message: None)
+    monkeypatch.setattr(llm, "insert_journey_details", lambda data: None)
+    monkeypatch.setattr(llm, "stark_requests", IdempotentRequests())
+    monkeypatch.setattr(llm, "JOURNEY_CONTEXT", JourneyStore())
+
+    app = FastAPI()
+    app.include_router(llm.router)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            destination = {"username": "u1", "message": "Hinjewadi", "latitude": 18.52, "longitude": 73.85}
+            await client.post("/stark/", json={"username": "u1", "message": "hi"})
+            await client.post("/stark/", json={"username": "u1", "message": "hi"})
+            first, second = await asyncio.gather(client.post("/stark/", json=destination),
+                                                 client.post("/stark/", json=destination))
+            assert first.json() == second.json() and "journey_id" in first.json()
+
+            # A client key replays the stored response for a redelivered message.
+            headers = {"Idempotency-Key": "wamid.1"}
+            yes = {"username": "u1", "message": "yes"}
+            confirmed = await client.post("/stark/", json=yes, headers=headers)
+            replayed = await client.post("/stark/", json=yes, headers=headers)
+            assert confirmed.json() == replayed.json() == {
+                "status": llm.StateEnum.INTRANSIT1.value, "journey_id": first.json()["journey_id"]}
+            await llm.journey_engine.shutdown()
+
+    asyncio.run(main())
+    assert len(booked) == 1
+
+
+def test_a_new_journey_releases_the_one_it_replaces(monkeypatch):
+    rides, released = [], []
+
+    async def booking_agent_request(start, end):
+        rides.append(f"ride-{len(rides) + 1}")
+        return {"ride_id": rides[-1], "driver": "Ravi", "eta": "4 mins"}
+
+    async def release_ride(ride_id):
+        released.append(ride_id)
+
+    monkeypatch.setattr(llm, "booking_agent_request", booking_agent_request)
+    monkeypatch.setattr(llm, "release_ride", release_ride)
+    monkeypatch.setattr(llm, "send_message", lambda username, message: None)
+    monkeypatch.setattr(llm, "insert_journey_details", lambda data: None)
+    monkeypatch.setattr(llm, "stark_requests", IdempotentRequests())
+    monkeypatch.setattr(llm, "JOURNEY_CONTEXT", JourneyStore())
+    monkeypatch.setattr(llm, "TRACKING_SIMULATION_SECONDS", 60)
+
+    app = FastAPI()
+    app.include_router(llm.router)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            async def send(message):
+                return (await client.post("/stark/", json={
+                    "username": "u1", "message": message, "latitude": 18.52, "longitude": 73.85})).json()
+
+            await send("hi")
+            first = (await send("Hinjewadi"))["journey_id"]
+            await send("hi")
+            second = (await send("Kothrud"))["journey_id"]
+            # A journey replaced while waiting for YES frees its driver.
+            assert released == ["ride-1"]
+
+            assert (await send("yes"))["status"] == llm.StateEnum.INTRANSIT1.value
+            assert llm.journey_engine.is_tracking(second)
+            await send("hi")
+            third = (await send("Baner"))["journey_id"]
+            # One replaced mid-ride also stops its leg.
+            assert released == ["ride-1", "ride-2"]
+            assert not llm.journey_engine.notify(second)
+            assert llm.JOURNEY_CONTEXT.for_user("u1")["journey_id"] == third not in (first, second)
+            await llm.journey_engine.shutdown()
+
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+import asyncio
+
+from components.journey_engine import JourneyEngine, TRACKING_REACHED
+
+
+def test_notify_ends_the_leg_and_only_once():
+    arrivals = []
+
+    async def on_arrival(journey_id, event):
+        arrivals.append((journey_id, event))
+
+    async def main():
+        engine = JourneyEngine()
+        assert not engine.notify("j1")  # no leg yet
+
+        task = engine.start_leg("j1", on_arrival)
+        # The waiter exists as soon as start_leg returns, before the task runs.
+        assert engine.notify("j1", "dropped")
+        assert not engine.notify("j1")
+        await task
+
+        assert not engine.is_tracking("j1") and engine.active == 0
+        assert not engine.notify("j1")
+
+    asyncio.run(main())
+    assert arrivals == [("j1", "dropped")]
+
+
+def test_restarting_or_cancelling_a_leg_drops_the_old_one():
+    arrivals = []
+
+    async def on_arrival(journey_id, event):
+        arrivals.append((journey_id, event))
+
+    async def main():
+        engine = JourneyEngine()
+        first = engine.start_leg("j1", on_arrival)
+        second = engine.start_leg("j1", on_arrival)
+        await asyncio.sleep(0)
+        assert first.cancelled() and engine.active == 1
+
+        engine.notify("j1")
+        await second
+
+        # Cancelled before its task ever ran.
+        cancelled = engine.start_leg("j2", on_arrival)
+        assert engine.cancel("j2") and not engine.cancel("missing")
+        assert not engine.notify("j2")
+        await asyncio.gather(cancelled, return_exceptions=True)
+        assert engine.active == 0
+
+    asyncio.run(main())
+    assert arrivals == [("j1", TRACKING_REACHED)]
+
+
+def test_tracker_races_pushed_events_and_is_cleaned_up():
+    arrivals, tracked, stopped = [], [], []
+
+    async def main():
+        hold = asyncio.Event()
+
+        async def tracker(journey_id):
+            tracked.append(journey_id)
+            try:
+                if journey_id == "fast":
+                    return "tracked"
+                await hold.wait()
+            except asyncio.CancelledError:
+                stopped.append(journey_id)
+                raise
+
+        async def on_arrival(journey_id, event):
+            arrivals.append((journey_id, event))
+            if journey_id == "broken":
+                raise RuntimeError("handler failed")
+
+        engine = JourneyEngine(tracker=tracker)
+        await engine.start_leg("fast", on_arrival)
+
+        pushed = engine.start_leg("pushed", on_arrival)
+        await asyncio.sleep(0)
+        engine.notify("pushed", TRACKING_REACHED)
+        await pushed
+
+        # A failing handler is logged; the engine keeps working.
+        broken = engine.start_leg("broken", on_arrival)
+        await asyncio.sleep(0)
+        engine.notify("broken")
+        await broken
+
+        engine.start_leg("pending", on_arrival)
+        await asyncio.sleep(0)
+        await engine.shutdown()
+        assert engine.active == 0
+
+    asyncio.run(main())
+    assert arrivals == [("fast", "tracked"), ("pushed", TRACKING_REACHED), ("broken", TRACKING_REACHED)]
+    assert tracked == ["fast", "pushed", "broken", "pending"]
+    assert stopped == ["pushed", "broken", "pending"]
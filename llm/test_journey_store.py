@@ -0,0 +1,127 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+import llm
+from components.idempotency import IdempotentRequests
+from components.journey_store import JourneyStore, SQLiteJourneyStore
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return JourneyStore()
+    return SQLiteJourneyStore(str(tmp_path / "journeys.db"), state_type=llm.StateEnum)
+
+
+def test_indexes_and_compare_and_set(store):
+    assert store.add("j1", {"username": "alice", "state": llm.StateEnum.START, "uses_metro": True})
+    assert store.add("j1", {"username": "alice", "state": llm.StateEnum.START}) is None
+    store.add("j2", {"username": "bob", "state": llm.StateEnum.START})
+
+    assert store.for_user("alice")["journey_id"] == "j1"
+    assert store.set_state("j1", llm.StateEnum.INTRANSIT1, expected=llm.StateEnum.START)["state"] is \
+        llm.StateEnum.INTRANSIT1
+    assert store.set_state("j1", llm.StateEnum.INTRANSIT1, expected=llm.StateEnum.START) is None
+    assert store.remove("j1", expected=llm.StateEnum.MID) is None
+
+    assert store.update("j1", ride_id="r1")["ride_id"] == "r1"
+    assert store.get("j1")["ride_id"] == "r1" and store.get("j1")["uses_metro"] is True
+    assert store.count_by_state() == {llm.StateEnum.START: 1, llm.StateEnum.INTRANSIT1: 1}
+    assert [ctx["journey_id"] for ctx in store.list_by_state(llm.StateEnum.START)] == ["j2"]
+
+    # A new journey replaces the user's previous one.
+    store.add("j3", {"username": "alice", "state": llm.StateEnum.START})
+    assert "j1" not in store and store.for_user("alice")["journey_id"] == "j3"
+    assert len(store) == 2
+
+    assert store.await_destination("carol", "j4") == "j4"
+    assert store.await_destination("carol", "j5") == "j4"
+    assert store.clear_destination("carol") == "j4"
+    assert store.awaiting_destination("carol") is None
+
+
+def test_state_index_follows_transitions_replacements_and_removals(store):
+    for i in range(6):
+        store.add(f"j{i}", {"username": f"user-{i}", "state": llm.StateEnum.START})
+    for i in range(0, 6, 2):
+        store.set_state(f"j{i}", llm.StateEnum.INTRANSIT1)
+    store.set_state("j2", llm.StateEnum.MID)
+    store.set_state("j1", llm.StateEnum.START)  # same state: nothing moves
+
+    def ids(state):
+        return sorted(ctx["journey_id"] for ctx in store.list_by_state(state))
+
+    assert ids(llm.StateEnum.START) == ["j1", "j3", "j5"]
+    assert ids(llm.StateEnum.INTRANSIT1) == ["j0", "j4"]
+    assert ids(llm.StateEnum.MID) == ["j2"]
+
+    # Replacing a user's journey and removing one leave no stale entries,
+    # and states with no journeys left drop out of the counts.
+    store.add("j6", {"username": "user-2", "state": llm.StateEnum.START})
+    store.remove("j0")
+    store.remove("j4")
+    assert ids(llm.StateEnum.MID) == [] and ids(llm.StateEnum.INTRANSIT1) == []
+    assert store.count_by_state() == {llm.StateEnum.START: 4}
+    assert store.get("j2") is None and store.for_user("user-2")["journey_id"] == "j6"
+    assert store.set_state("j0", llm.StateEnum.MID) is None and store.remove("j0") is None
+
+
+def test_sqlite_store_is_shared_and_transitions_once(tmp_path):
+    path = str(tmp_path / "journeys.db")
+    worker_a, worker_b = SQLiteJourneyStore(path), SQLiteJourneyStore(path)
+
+    assert worker_a.await_destination("alice", "j1") == "j1"
+    assert worker_b.await_destination("alice", "j2") == "j1"
+    worker_a.add("j1", {"username": "alice", "state": "start", "start": {"lat": 18.5, "lng": 73.8}})
+    assert worker_b.for_user("alice")["start"] == {"lat": 18.5, "lng": 73.8}
+
+    won = []
+
+    def confirm(store):
+        if store.set_state("j1", "intransit1", expected="start") is not None:
+            won.append(store)
+
+    threads = [threading.Thread(target=confirm, args=(s,)) for s in (worker_a, worker_b) * 4]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(won) == 1
+    assert worker_a.get("j1")["state"] == "intransit1"
+
+
+def test_tracking_event_for_a_leg_in_another_worker(monkeypatch, tmp_path):
+    released, messages = [], []
+
+    async def release_ride(ride_id):
+        released.append(ride_id)
+
+    store = SQLiteJourneyStore(str(tmp_path / "journeys.db"), state_type=llm.StateEnum)
+    monkeypatch.setattr(llm, "JOURNEY_CONTEXT", store)
+    monkeypatch.setattr(llm, "release_ride", release_ride)
+    monkeypatch.setattr(llm, "send_message", lambda username, message: messages.append(message))
+    monkeypatch.setattr(llm, "insert_journey_details", lambda data: None)
+    monkeypatch.setattr(llm, "stark_requests", IdempotentRequests())
+
+    store.add("j1", {"username": "alice", "state": llm.StateEnum.INTRANSIT1, "uses_metro": False,
+                     "ride_id": "r1"})
+
+    app = FastAPI()
+    app.include_router(llm.router)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            assert (await client.post("/stark/tracking/j1")).json() == {"status": "accepted"}
+            assert (await client.post("/stark/tracking/j1")).status_code == 404
+        # The worker running the leg reports the same arrival later.
+        await llm.on_first_leg_arrival("j1", "reached")
+
+    asyncio.run(main())
+    assert released == ["r1"]
+    assert messages == ["You reached destination. Thank you!"]
+    assert len(store) == 0
@@ -0,0 +1,109 @@
+import random
+
+import numpy as np
+import pytest
+
+from components.metro_planner import DIRECT, METRO, JourneyPlanner, MetroNetwork, line_order
+from components.station_index import Station, StationDirectory, StationIndex
+
+# Two straight lines crossing at "Centre"; stations listed out of running order.
+STATIONS = [
+    Station("Centre", 18.50, 73.85, "Red;Blue"),
+    Station("North 2", 18.56, 73.85, "Red"),
+    Station("North 1", 18.53, 73.85, "Red"),
+    Station("South 1", 18.47, 73.85, "Red"),
+    Station("West 1", 18.50, 73.82, "Blue"),
+    Station("East 1", 18.50, 73.88, "Blue"),
+    Station("East 2", 18.50, 73.91, "Blue"),
+]
+
+
+def planner(stations=STATIONS):
+    directory = StationDirectory(path="missing.geojson")
+    directory.replace(stations)
+    return JourneyPlanner(directory), directory
+
+
+def test_lines_are_ordered_and_linked_through_the_interchange():
+    network = MetroNetwork(STATIONS)
+    names = [network.stations[i].name for i in network.lines["Red"]]
+    assert names in (["North 2", "North 1", "Centre", "South 1"], ["South 1", "Centre", "North 1", "North 2"])
+    assert line_order([(0, 0), (0, 2), (0, 1)]) in ([0, 2, 1], [1, 2, 0])
+
+    north2, east2, north1 = 1, 6, 2
+    assert np.isfinite(network.times).all()
+    # Changing lines costs more than riding the same distance on one line.
+    assert network.times[north2, east2] > network.times[north2, 3]
+    assert network.times[north2, north1] < network.times[north2, east2]
+    assert network.times[north2, east2] == pytest.approx(network.times[east2, north2])
+
+
+def test_plans_are_ranked_and_metro_needs_distinct_stations():
+    jp, _ = planner()
+    far = jp.plan({"lat": 18.561, "lng": 73.851}, {"lat": 18.501, "lng": 73.911}, k=3)
+    assert [p.total_s for p in far] == sorted(p.total_s for p in far)
+    metro = [p for p in far if p.mode == METRO]
+    assert metro and metro[0].entry.name == "North 2" and metro[0].exit.name == "East 2"
+    assert metro[0].total_s == pytest.approx(metro[0].first_mile_s + metro[0].metro_s + metro[0].last_mile_s)
+
+    near = jp.plan({"lat": 18.561, "lng": 73.851}, {"lat": 18.562, "lng": 73.852}, k=3)
+    assert near[0].mode == DIRECT
+    assert all(p.entry != p.exit for p in near if p.mode == METRO)
+
+
+def test_batch_matches_single_plans_and_follows_reloads():
+    jp, directory = planner()
+    rng = random.Random(3)
+    od = np.array([[rng.uniform(18.44, 18.58), rng.uniform(73.80, 73.93),
+                    rng.uniform(18.44, 18.58), rng.uniform(73.80, 73.93)] for _ in range(300)])
+    total, entry, exit_ = jp.plan_many(od[:, 0], od[:, 1], od[:, 2], od[:, 3], chunk=64)
+    assert (entry >= 0).any() and (entry < 0).any()
+    for i, (a, b, c, d) in enumerate(od):
+        best = jp.plan({"lat": a, "lng": b}, {"lat": c, "lng": d}, k=1)[0]
+        assert total[i] == pytest.approx(best.total_s)
+        if best.mode == METRO:
+            assert jp.network.stations[entry[i]] == best.entry and jp.network.stations[exit_[i]] == best.exit
+
+    directory.replace(STATIONS[:1])
+    assert jp._built[0] is directory.index  # built by the reload, not the next plan
+    assert len(jp.network) == 1
+    assert jp.plan({"lat": 18.561, "lng": 73.851}, {"lat": 18.501, "lng": 73.911})[0].mode == DIRECT
+
+
+def test_stations_without_a_line_are_only_reached_on_foot():
+    stations = STATIONS + [
+        Station("Centre Gate", 18.5010, 73.8510, ""),  # ~150 m from Centre
+        Station("Far Away", 18.60, 73.70, ""),
+        Station("Other Far", 18.40, 73.99, ""),
+    ]
+    network = MetroNetwork(stations)
+    gate, far, other, centre, east2 = 7, 8, 9, 0, 6
+
+    assert "" not in network.lines and None not in network.lines
+    # No made-up line between unrelated untagged stations.
+    assert np.isinf(network.times[far, other]) and np.isinf(network.times[far, centre])
+    # The gate reaches the network through a walk to Centre.
+    assert network.times[gate, east2] > network.times[centre, east2]
+    assert network.times[gate, east2] == pytest.approx(network.times[east2, gate])
+
+
+
+def test_a_reload_during_planning_does_not_mix_station_versions():
+    reloaded = [Station(f"{s.name} (new)", s.lat, s.lng, s.line) for s in STATIONS]
+
+    class ReloadingDirectory:
+        """Hands out the old index once, then the reloaded one, as if a reload ran mid-plan."""
+
+        def __init__(self):
+            self.indexes = [StationIndex(STATIONS), StationIndex(reloaded)]
+
+        @property
+        def index(self):
+            return self.indexes.pop(0) if len(self.indexes) > 1 else self.indexes[0]
+
+        def on_replace(self, callback):
+            pass
+
+    jp = JourneyPlanner(ReloadingDirectory())
+    metro = [p for p in jp.plan({"lat": 18.561, "lng": 73.851}, {"lat": 18.501, "lng": 73.911}) if p.mode == METRO]
+    assert (metro[0].entry.name, metro[0].exit.name) == ("North 2", "East 2")
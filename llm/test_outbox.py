@@ -0,0 +1,79 @@
+import threading
+import time
+
+from components.outbox import Outbox
+
+
+def test_keeps_per_user_order():
+    delivered = []
+    outbox = Outbox(delivered.append)
+
+    for i in range(100):
+        outbox.enqueue({"username": f"user-{i % 3}", "message": str(i)})
+    outbox.close()
+
+    for user in ("user-0", "user-1", "user-2"):
+        messages = [int(m["message"]) for m in delivered if m["username"] == user]
+        assert messages == sorted(messages)
+    assert outbox.stats()["sent"] == 100
+
+
+def test_batches_when_receiver_accepts_arrays():
+    batches = []
+    release = threading.Event()
+
+    def deliver_batch(batch):
+        release.wait(1)
+        batches.append(batch)
+
+    outbox = Outbox(None, deliver_batch=deliver_batch, batch_size=10)
+    for i in range(25):
+        outbox.enqueue(i)
+    release.set()
+    outbox.close()
+
+    assert [item for batch in batches for item in batch] == list(range(25))
+    assert all(len(batch) <= 10 for batch in batches)
+    assert len(batches) < 25
+
+
+def test_drops_when_full_and_counts_failures():
+    release = threading.Event()
+
+    def deliver(item):
+        release.wait(1)
+        if item == "bad":
+            raise RuntimeError("relay down")
+
+    outbox = Outbox(deliver, maxsize=2)
+    accepted = [outbox.enqueue(item) for item in ("bad", "a", "b", "c", "d")]
+    release.set()
+    outbox.close()
+
+    stats = outbox.stats()
+    assert accepted.count(False) == stats["dropped"] > 0
+    assert stats["failed"] == 1
+    assert stats["sent"] + stats["failed"] + stats["dropped"] == 5
+    assert stats["depth"] == 0
+
+
+def test_close_is_bounded_when_the_relay_hangs():
+    hung = threading.Event()
+    delivered = []
+
+    def deliver(item):
+        hung.wait(5)
+        delivered.append(item)
+
+    outbox = Outbox(deliver, maxsize=1)
+    for item in ("a", "b", "c"):
+        outbox.enqueue(item)  # "a" is being delivered, "b" fills the queue
+
+    started = time.monotonic()
+    outbox.close(timeout=0.2)
+    assert time.monotonic() - started < 1
+
+    hung.set()
+    outbox._worker.join(1)
+    assert not outbox._worker.is_alive()
+    assert delivered == ["a"]  # the rest is abandoned, not delivered after close
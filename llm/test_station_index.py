@@ -0,0 +1,77 @@
+import json
+import random
+
+import pytest
+
+from components.dhelper import haversine
+from components.station_index import Station, StationDirectory, StationIndex
+
+
+def brute_force(stations, lat, lng):
+    distances = haversine(lat, lng, [s.lat for s in stations], [s.lng for s in stations])
+    return sorted(zip(stations, distances.tolist()), key=lambda hit: hit[1])
+
+
+def assert_hits(actual, expected):
+    assert [s for s, _ in actual] == [s for s, _ in expected]
+    assert [d for _, d in actual] == pytest.approx([d for _, d in expected])
+
+
+@pytest.mark.parametrize("count", [20, 3000])
+def test_queries_match_brute_force(count):
+    rng = random.Random(7)
+    stations = [
+        Station(f"s{i}", rng.uniform(18.40, 18.70), rng.uniform(73.70, 74.00))
+        for i in range(count)
+    ]
+    index = StationIndex(stations)
+
+    for _ in range(300):
+        lat, lng = rng.uniform(18.30, 18.80), rng.uniform(73.60, 74.10)
+        radius = rng.uniform(100, 8000)
+        expected = brute_force(stations, lat, lng)
+
+        assert_hits(index.k_nearest(lat, lng, 5), expected[:5])
+        assert_hits(index.within(lat, lng, radius), [h for h in expected if h[1] <= radius])
+        nearest = index.nearest(lat, lng, max_distance=radius)
+        assert_hits([nearest] if nearest else [], expected[:1] if expected[0][1] <= radius else [])
+
+
+def test_far_queries_only_walk_the_grid():
+    rng = random.Random(3)
+    stations = [Station(f"s{i}", rng.uniform(18.40, 18.70), rng.uniform(73.70, 74.00)) for i in range(300)]
+    index = StationIndex(stations)
+
+    for lat, lng in [(0.0, 0.0), (51.5, -0.1), (18.55, 120.0)]:
+        assert_hits(index.k_nearest(lat, lng, 3), brute_force(stations, lat, lng)[:3])
+        # About 30 x 30 cells hold every station; a query thousands of
+        # cells away still visits no more rings than the grid is wide.
+        assert len(list(index._rings(lat, lng))) <= 31
+
+
+def test_empty_index():
+    index = StationIndex([])
+    assert index.nearest(18.5, 73.8) is None
+    assert index.within(18.5, 73.8, 5000) == []
+
+
+def test_directory_reloads_without_restart(tmp_path):
+    path = tmp_path / "stations.geojson"
+
+    def write(*stations):
+        path.write_text(json.dumps({"type": "FeatureCollection", "features": [
+            {"type": "Feature", "geometry": {"type": "Point", "coordinates": [lng, lat]},
+             "properties": {"name": name}}
+            for name, lat, lng in stations
+        ]}))
+
+    write(("PCMC", 18.6296, 73.7997))
+    directory = StationDirectory(path)
+    old = directory.index
+    assert old.nearest(18.52, 73.85)[0].name == "PCMC"
+
+    write(("PCMC", 18.6296, 73.7997), ("District Court", 18.5275, 73.8560))
+    directory.reload()
+
+    assert directory.index.nearest(18.52, 73.85)[0].name == "District Court"
+    assert len(old) == 1
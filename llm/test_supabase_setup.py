@@ -0,0 +1,26 @@
+import os
+import subprocess
+import sys
+
+from components import supabase_setup
+from components.fake_supabase import FakeSupabase
+
+LLM_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_llm_imports_without_credentials():
+    env = {k: v for k, v in os.environ.items() if k not in ("SUPABASE_URL", "SUPABASE_KEY", "SUPABASE_ANON_KEY")}
+    code = "import sys, llm; print('supabase' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=LLM_DIR, env=env,
+                         capture_output=True, text=True, check=True).stdout
+    assert out.strip() == "False"
+
+
+def test_set_supabase_replaces_the_shared_client():
+    fake = FakeSupabase()
+    supabase_setup.set_supabase(fake)
+    try:
+        supabase_setup.get_supabase().table("journeyDetails").upsert({"journey_id": "j1", "state": "start"}).execute()
+        assert fake.tables["journeyDetails"]["j1"]["state"] == "start"
+    finally:
+        supabase_setup.set_supabase(None)
@@ -0,0 +1,58 @@
+from components.fake_supabase import FakeSupabase
+from components.write_behind import WriteBehindBuffer
+
+
+def make_writer(db, **kwargs):
+    return WriteBehindBuffer(
+        lambda rows: db.table("journeyDetails").upsert(rows).execute(),
+        key="journey_id", **kwargs,
+    )
+
+
+def test_coalesces_to_latest_state_and_flushes_on_close():
+    db = FakeSupabase()
+    writer = make_writer(db, interval=60)
+
+    writer.upsert({"journey_id": "j1", "username": "alice", "state": "start"})
+    for state in ("intransit1", "mid", "intransit2", "end"):
+        writer.upsert({"journey_id": "j1", "state": state})
+    writer.close()
+
+    assert db.tables["journeyDetails"]["j1"] == {
+        "journey_id": "j1", "username": "alice", "state": "end",
+    }
+    assert db.round_trips == 1
+
+
+def test_groups_rows_by_columns():
+    written = []
+    writer = WriteBehindBuffer(written.append, key="journey_id", interval=60)
+
+    writer.upsert({"journey_id": "j1", "username": "alice", "state": "start"})
+    writer.upsert({"journey_id": "j2", "state": "mid"})
+    writer.upsert({"journey_id": "j3", "state": "end"})
+    writer.close()
+
+    assert sorted(len(group) for group in written) == [1, 2]
+    for group in written:
+        assert len({tuple(sorted(row)) for row in group}) == 1
+
+
+def test_failed_write_is_retried_without_losing_newer_state():
+    db = FakeSupabase()
+    calls = []
+
+    def flaky(rows):
+        calls.append(rows)
+        if len(calls) == 1:
+            raise ConnectionError("supabase down")
+        db.table("journeyDetails").upsert(rows).execute()
+
+    writer = WriteBehindBuffer(flaky, key="journey_id", interval=60)
+    writer.upsert({"journey_id": "j1", "state": "start"})
+    writer.flush()
+    writer.upsert({"journey_id": "j1", "state": "mid"})
+    writer.close()
+
+    assert writer.failures == 1
+    assert db.tables["journeyDetails"]["j1"]["state"] == "mid"
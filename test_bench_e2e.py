@@ -0,0 +1,41 @@
+from bench_e2e import compare, median_of, summarize
+
+BASE = {"chat": {"1": {"requests": 100, "errors": 0, "p50_ms": 1.0, "p95_ms": 2.0, "p99_ms": 3.0, "rps": 1000.0}}}
+
+
+def row(**changes):
+    return {"chat": {"1": {**BASE["chat"]["1"], **changes}}}
+
+
+def test_within_tolerance_passes():
+    assert compare(row(p50_ms=1.4, p95_ms=2.9, rps=700.0), BASE, tolerance=0.5, slack_ms=0) == []
+
+
+def test_slower_percentile_fails():
+    regressions = compare(row(p95_ms=3.5), BASE, tolerance=0.5, slack_ms=0)
+    assert len(regressions) == 1 and "chat c=1: p95_ms" in regressions[0]
+
+
+def test_p99_only_gated_on_request():
+    assert compare(row(p99_ms=30.0), BASE, tolerance=0.5, slack_ms=0) == []
+    assert compare(row(p99_ms=30.0), BASE, tolerance=0.5, slack_ms=0,
+                   percentiles=("p50_ms", "p95_ms", "p99_ms"))
+
+
+def test_throughput_drop_and_new_errors_fail():
+    regressions = compare(row(rps=500.0, errors=1), BASE, tolerance=0.5, slack_ms=0)
+    assert [line.split(": ")[1].split()[0] for line in regressions] == ["rps", "errors"]
+
+
+def test_scenarios_missing_from_baseline_are_skipped():
+    assert compare({"new": {"1": BASE["chat"]["1"]}}, BASE) == []
+
+
+def test_summary_and_median():
+    summary = summarize([0.001 * i for i in range(1, 101)], errors=2, elapsed=0.5)
+    assert summary["requests"] == 100 and summary["rps"] == 200.0
+    assert summary["p50_ms"] == 51.0 and summary["p99_ms"] == 100.0
+
+    runs = [dict(summary, p95_ms=v, errors=1) for v in (5.0, 1.0, 3.0)]
+    merged = median_of(runs)
+    assert merged["p95_ms"] == 3.0 and merged["errors"] == 3 and merged["requests"] == 300